@@ -1,5 +1,5 @@
 from django.contrib import admin
-from .models import Category, MenuItem, Cart, CartItem, Contact
+from .models import Category, MenuItem, Cart, CartItem, Contact, DiningTable, SlotOccupancy, Task
 
 @admin.register(Category)
 class CategoryAdmin(admin.ModelAdmin):
@@ -27,3 +27,26 @@ class ContactAdmin(admin.ModelAdmin):
     list_display = ('name', 'email', 'subject', 'created_at')
     list_filter = ('created_at',)
     search_fields = ('name', 'email', 'subject', 'message')
+
+@admin.register(Task)
+class TaskAdmin(admin.ModelAdmin):
+    list_display = ('name', 'status', 'attempts', 'run_at', 'created_at')
+    list_filter = ('status', 'name')
+    readonly_fields = ('last_error',)
+
+@admin.register(DiningTable)
+class DiningTableAdmin(admin.ModelAdmin):
+    list_display = ('name', 'seats', 'is_active')
+    list_filter = ('is_active',)
+
+@admin.register(SlotOccupancy)
+class SlotOccupancyAdmin(admin.ModelAdmin):
+    # Tenu à jour par ecomm.capacity : consultation seulement
+    list_display = ('date', 'time', 'seats')
+    date_hierarchy = 'date'
+
+    def has_add_permission(self, request):
+        return False
+
+    def has_change_permission(self, request, obj=None):
+        return False
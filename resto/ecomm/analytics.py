@@ -0,0 +1,170 @@
+from datetime import datetime, time, timedelta
+from decimal import Decimal
+
+from django.db import transaction
+from django.db.models import Count, F, Sum
+from django.db.models.functions import ExtractHour, TruncDate
+from django.utils import timezone
+
+from .db import increment_rows
+from .models import ItemSalesRollup, Order, OrderItem, SalesRollup
+
+# Analyse des ventes : cumuls journaliers par heure (SalesRollup) et par plat
+# (ItemSalesRollup), ajustés dans la transaction de chaque commande et de
+# chaque annulation. Les rapports du tableau de bord ne lisent que ces tables,
+# dont la taille dépend du nombre de jours et de plats, pas du nombre de
+# commandes. Une commande compte tant qu'elle n'est pas annulée, au jour et à
+# l'heure (locaux) où elle a été passée.
+
+CANCELLED = 'cancelled'
+
+
+def _slot(order):
+    local = timezone.localtime(order.created_at)
+    return local.date(), local.hour
+
+
+def _apply(order, lines, sign):
+    # lines : (plat, catégorie, quantité, prix unitaire) ; sign : 1 ou -1
+    day, hour = _slot(order)
+    increment_rows(SalesRollup, [{
+        'date': day, 'hour': hour, 'order_count': sign, 'revenue': sign * order.total_amount,
+    }], ['date', 'hour'], ['order_count', 'revenue'])
+    items = {}
+    for menu_item_id, category_id, quantity, price in lines:
+        row = items.setdefault(menu_item_id, {
+            'date': day, 'menu_item': menu_item_id, 'category': category_id,
+            'quantity': 0, 'revenue': Decimal('0'), 'order_count': sign,
+        })
+        row['quantity'] += sign * quantity
+        row['revenue'] += sign * quantity * price
+    increment_rows(ItemSalesRollup, list(items.values()), ['date', 'menu_item'], ['quantity', 'revenue', 'order_count'])
+
+
+def order_created(order, items):
+    # `items` : les OrderItem de la commande, avec leur plat chargé
+    if order.status != CANCELLED:
+        _apply(order, [
+            (item.menu_item_id, item.menu_item.category_id, item.quantity, item.price) for item in items
+        ], 1)
+
+
+def order_status_changed(order, old_status):
+    if (old_status == CANCELLED) == (order.status == CANCELLED):
+        return
+    lines = OrderItem.objects.filter(order=order).values_list(
+        'menu_item_id', 'menu_item__category_id', 'quantity', 'price'
+    )
+    _apply(order, list(lines), 1 if old_status == CANCELLED else -1)
+
+
+# Recalcul depuis les commandes : agrégation faite par la base en deux
+# requêtes GROUP BY, quel que soit le volume
+
+def _since_filter(field, since):
+    if since is None:
+        return {}
+    return {f'{field}__gte': timezone.make_aware(datetime.combine(since, time.min))}
+
+
+def compute(since=None):
+    tz = timezone.get_current_timezone()
+    orders = Order.objects.exclude(status=CANCELLED).filter(**_since_filter('created_at', since)).order_by()
+    hours = {
+        (row['day'], row['hour']): (row['order_count'], row['revenue'])
+        for row in orders.annotate(
+            day=TruncDate('created_at', tzinfo=tz), hour=ExtractHour('created_at', tzinfo=tz),
+        ).values('day', 'hour').annotate(order_count=Count('id'), revenue=Sum('total_amount'))
+    }
+    lines = OrderItem.objects.exclude(order__status=CANCELLED).filter(
+        **_since_filter('order__created_at', since)
+    ).order_by()
+    items = {
+        (row['day'], row['menu_item']): (row['menu_item__category'], row['sold'], row['revenue'], row['order_count'])
+        for row in lines.annotate(day=TruncDate('order__created_at', tzinfo=tz)).values(
+            'day', 'menu_item', 'menu_item__category'
+        ).annotate(
+            sold=Sum('quantity'),
+            revenue=Sum(F('price') * F('quantity')),
+            order_count=Count('order', distinct=True),
+        )
+    }
+    return hours, items
+
+
+def rebuild(since=None):
+    # Recalcule les cumuls à partir du jour `since` (tous si None)
+    hours, items = compute(since)
+    with transaction.atomic():
+        for model in (SalesRollup, ItemSalesRollup):
+            rollups = model.objects.all()
+            if since is not None:
+                rollups = rollups.filter(date__gte=since)
+            rollups.delete()
+        SalesRollup.objects.bulk_create((
+            SalesRollup(date=day, hour=hour, order_count=count, revenue=revenue)
+            for (day, hour), (count, revenue) in hours.items()
+        ), batch_size=1000)
+        ItemSalesRollup.objects.bulk_create((
+            ItemSalesRollup(
+                date=day, menu_item_id=menu_item_id, category_id=category_id,
+                quantity=quantity, revenue=revenue, order_count=count,
+            )
+            for (day, menu_item_id), (category_id, quantity, revenue, count) in items.items()
+        ), batch_size=1000)
+    return len(hours), len(items)
+
+
+def check():
+    # Écarts (clé, stocké, attendu) entre les cumuls et les commandes ; vide si tout est cohérent
+    hours, items = compute()
+    stored_hours = {
+        (row.date, row.hour): (row.order_count, row.revenue)
+        for row in SalesRollup.objects.exclude(order_count=0)
+    }
+    stored_items = {
+        (row.date, row.menu_item_id): (row.category_id, row.quantity, row.revenue, row.order_count)
+        for row in ItemSalesRollup.objects.exclude(order_count=0)
+    }
+    problems = []
+    for stored, expected in ((stored_hours, hours), (stored_items, items)):
+        for key in sorted(set(stored) | set(expected)):
+            if stored.get(key) != expected.get(key):
+                problems.append((key, stored.get(key), expected.get(key)))
+    return problems
+
+
+# Rapports, lus uniquement dans les cumuls
+
+def period(days, today=None):
+    # Les `days` derniers jours, aujourd'hui compris
+    today = today or timezone.localdate()
+    return today - timedelta(days=days - 1), today
+
+
+def revenue_by_day(since, until):
+    rows = SalesRollup.objects.filter(date__range=(since, until)).values('date').annotate(
+        order_count=Sum('order_count'), revenue=Sum('revenue'),
+    ).order_by('date')
+    return list(rows)
+
+
+def revenue_by_hour(since, until):
+    rows = SalesRollup.objects.filter(date__range=(since, until)).values('hour').annotate(
+        order_count=Sum('order_count'), revenue=Sum('revenue'),
+    ).order_by('hour')
+    return list(rows)
+
+
+def top_items(since, until, limit=10):
+    rows = ItemSalesRollup.objects.filter(date__range=(since, until)).values(
+        'menu_item_id', 'menu_item__name'
+    ).annotate(quantity=Sum('quantity'), revenue=Sum('revenue')).filter(quantity__gt=0)
+    return list(rows.order_by('-quantity', '-revenue')[:limit])
+
+
+def sales_by_category(since, until):
+    rows = ItemSalesRollup.objects.filter(date__range=(since, until)).values('category_id', 'category__name').annotate(
+        quantity=Sum('quantity'), revenue=Sum('revenue'),
+    ).filter(quantity__gt=0)
+    return list(rows.order_by('-revenue'))
@@ -0,0 +1,27 @@
+document.addEventListener('DOMContentLoaded', function() {
+    const userDropdown = document.querySelector('.user-dropdown');
+    const dropdownToggle = document.querySelector('.user-dropdown-toggle');
+
+    if (userDropdown && dropdownToggle) {
+        // Gérer le clic sur le toggle
+        dropdownToggle.addEventListener('click', function(e) {
+            e.preventDefault();
+            userDropdown.classList.toggle('show');
+        });
+
+        // Fermer le dropdown quand on clique en dehors
+        document.addEventListener('click', function(e) {
+            if (!userDropdown.contains(e.target)) {
+                userDropdown.classList.remove('show');
+            }
+        });
+
+        // Empêcher la fermeture lors du clic dans le menu
+        userDropdown.querySelector('.user-dropdown-content').addEventListener('click', function(e) {
+            // Ne pas empêcher le comportement par défaut des liens et boutons
+            if (!e.target.closest('a') && !e.target.closest('button')) {
+                e.stopPropagation();
+            }
+        });
+    }
+});
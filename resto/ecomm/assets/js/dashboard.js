@@ -0,0 +1,38 @@
+function toggleSidebar() {
+    document.getElementById('sidebar').classList.toggle('show');
+}
+
+// Statuts en temps réel : les listes se mettent à jour sans rechargement
+if (window.EventSource) {
+    const source = new EventSource(document.currentScript.dataset.eventsUrl);
+    function showNotice(text) {
+        const alert = document.createElement('div');
+        alert.className = 'alert alert-info alert-dismissible fade show';
+        alert.textContent = text;
+        const close = document.createElement('button');
+        close.type = 'button';
+        close.className = 'btn-close';
+        close.dataset.bsDismiss = 'alert';
+        alert.appendChild(close);
+        const wrapper = document.querySelector('.content-wrapper');
+        wrapper.insertBefore(alert, wrapper.firstChild);
+    }
+    source.addEventListener('order', function(e) {
+        const data = JSON.parse(e.data);
+        const select = document.querySelector(`.status-select[data-order-id="${data.id}"]`);
+        if (select) {
+            select.value = data.status;
+        } else if (data.created) {
+            showNotice(`Nouvelle commande #${data.id}`);
+        }
+    });
+    source.addEventListener('reservation', function(e) {
+        const data = JSON.parse(e.data);
+        const select = document.querySelector(`.status-select[data-reservation-id="${data.id}"]`);
+        if (select) {
+            select.value = data.status;
+        } else if (data.created) {
+            showNotice(`Nouvelle réservation #${data.id}`);
+        }
+    });
+}
@@ -0,0 +1,31 @@
+document.addEventListener('DOMContentLoaded', function() {
+    const charts = JSON.parse(document.getElementById('analytics-charts').textContent);
+
+    new Chart(document.getElementById('chart-days'), {
+        type: 'line',
+        data: {
+            labels: charts.days.labels,
+            datasets: [
+                {label: "Chiffre d'affaires (F CFA)", data: charts.days.revenue, borderColor: '#198754', yAxisID: 'y'},
+                {label: 'Commandes', data: charts.days.orders, borderColor: '#0d6efd', yAxisID: 'y1'}
+            ]
+        },
+        options: {scales: {y: {position: 'left'}, y1: {position: 'right', grid: {drawOnChartArea: false}}}}
+    });
+
+    new Chart(document.getElementById('chart-hours'), {
+        type: 'bar',
+        data: {
+            labels: charts.hours.labels,
+            datasets: [{label: "Chiffre d'affaires (F CFA)", data: charts.hours.revenue, backgroundColor: '#0d6efd'}]
+        }
+    });
+
+    new Chart(document.getElementById('chart-categories'), {
+        type: 'doughnut',
+        data: {
+            labels: charts.categories.labels,
+            datasets: [{data: charts.categories.revenue}]
+        }
+    });
+});
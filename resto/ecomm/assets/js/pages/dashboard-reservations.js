@@ -0,0 +1,109 @@
+document.addEventListener('DOMContentLoaded', function() {
+    // Initialisation du calendrier
+    var calendarEl = document.getElementById('calendar');
+    var calendar = new FullCalendar.Calendar(calendarEl, {
+        initialView: 'dayGridMonth',
+        locale: 'fr',
+        headerToolbar: {
+            left: 'prev,next today',
+            center: 'title',
+            right: 'dayGridMonth,timeGridWeek,timeGridDay'
+        },
+        events: '/dashboard/reservations/events/',  // Endpoint à créer pour récupérer les événements
+        eventClick: function(info) {
+            // Ouvrir le modal correspondant à la réservation
+            var modal = document.querySelector(`#reservationModal${info.event.id}`);
+            if (modal) {
+                var bsModal = new bootstrap.Modal(modal);
+                bsModal.show();
+            }
+        }
+    });
+    calendar.render();
+
+    // Gestion du changement de statut
+    document.querySelectorAll('.status-select').forEach(select => {
+        select.addEventListener('change', function() {
+            const reservationId = this.dataset.reservationId;
+            const status = this.value;
+
+            fetch(`/dashboard/reservations/${reservationId}/status/`, {
+                method: 'POST',
+                headers: {
+                    'Content-Type': 'application/x-www-form-urlencoded',
+                    'X-CSRFToken': getCookie('csrftoken')
+                },
+                body: `status=${status}`
+            })
+            .then(response => response.json())
+            .then(data => {
+                if (data.success) {
+                    // Afficher une notification de succès
+                    const alert = document.createElement('div');
+                    alert.className = 'alert alert-success alert-dismissible fade show';
+                    alert.innerHTML = `
+                        Statut mis à jour avec succès
+                        <button type="button" class="btn-close" data-bs-dismiss="alert" aria-label="Close"></button>
+                    `;
+                    document.querySelector('.content-wrapper').insertBefore(alert, document.querySelector('.content-wrapper').firstChild);
+                } else if (data.message) {
+                    // Rétablissement refusé : le créneau est complet
+                    const alert = document.createElement('div');
+                    alert.className = 'alert alert-warning alert-dismissible fade show';
+                    alert.textContent = data.message;
+                    document.querySelector('.content-wrapper').insertBefore(alert, document.querySelector('.content-wrapper').firstChild);
+                }
+            })
+            .catch(error => console.error('Error:', error));
+        });
+    });
+
+    // Fonction pour récupérer le cookie CSRF
+    function getCookie(name) {
+        let cookieValue = null;
+        if (document.cookie && document.cookie !== '') {
+            const cookies = document.cookie.split(';');
+            for (let i = 0; i < cookies.length; i++) {
+                const cookie = cookies[i].trim();
+                if (cookie.substring(0, name.length + 1) === (name + '=')) {
+                    cookieValue = decodeURIComponent(cookie.substring(name.length + 1));
+                    break;
+                }
+            }
+        }
+        return cookieValue;
+    }
+
+    // Gestion de l'impression
+    document.querySelectorAll('.print-reservation').forEach(button => {
+        button.addEventListener('click', function() {
+            const reservationId = this.dataset.reservationId;
+            const modalContent = document.querySelector(`#reservationModal${reservationId} .modal-body`).cloneNode(true);
+
+            const printWindow = window.open('', '_blank');
+            printWindow.document.write(`
+                <html>
+                <head>
+                    <title>Réservation #${reservationId}</title>
+                    <link href="https://cdn.jsdelivr.net/npm/bootstrap@5.1.3/dist/css/bootstrap.min.css" rel="stylesheet">
+                    <style>
+                        body { padding: 20px; }
+                        @media print {
+                            .no-print { display: none; }
+                        }
+                    </style>
+                </head>
+                <body>
+                    <div class="container">
+                        <h4 class="mb-4">Réservation #${reservationId}</h4>
+                        ${modalContent.innerHTML}
+                    </div>
+                </body>
+                </html>
+            `);
+
+            printWindow.document.close();
+            printWindow.print();
+        });
+    });
+});
@@ -0,0 +1,68 @@
+const csrfToken = document.currentScript.dataset.csrfToken;
+
+document.addEventListener('DOMContentLoaded', function() {
+    const forms = document.querySelectorAll('form[action^="/add-to-cart/"]');
+    const notification = document.getElementById('notification');
+    const notificationMessage = document.getElementById('notification-message');
+    const cartCount = document.querySelector('.cart-count');
+
+    forms.forEach(form => {
+        form.addEventListener('submit', function(e) {
+            e.preventDefault();
+            const button = this.querySelector('.menu__button');
+            const itemId = button.dataset.itemId;
+
+            // Ajouter la classe pour l'animation de chargement
+            button.classList.add('adding');
+
+            fetch(this.action, {
+                method: 'POST',
+                headers: {
+                    'Content-Type': 'application/x-www-form-urlencoded',
+                    'X-CSRFToken': csrfToken
+                },
+                body: new URLSearchParams(new FormData(this))
+            })
+            .then(response => response.json())
+            .then(data => {
+                if (data.success) {
+                    // Mettre à jour le compteur du panier
+                    if (cartCount) {
+                        cartCount.textContent = data.cart_count;
+                    }
+
+                    // Mettre à jour le message de notification
+                    notificationMessage.textContent = data.message;
+
+                    // Animation de succès
+                    button.classList.remove('adding');
+                    button.classList.add('success');
+
+                    // Afficher la notification
+                    notification.classList.add('show');
+                    setTimeout(() => {
+                        notification.classList.remove('show');
+                    }, 2000);
+
+                    // Réinitialiser le bouton après un délai
+                    setTimeout(() => {
+                        button.classList.remove('success');
+                    }, 1000);
+                }
+            })
+            .catch(error => {
+                console.error('Error:', error);
+                button.classList.remove('adding');
+
+                // Afficher un message d'erreur
+                notificationMessage.textContent = "Une erreur est survenue";
+                notification.style.backgroundColor = 'var(--first-color-alt)';
+                notification.classList.add('show');
+                setTimeout(() => {
+                    notification.classList.remove('show');
+                    notification.style.backgroundColor = 'var(--first-color)';
+                }, 2000);
+            });
+        });
+    });
+});
@@ -0,0 +1,15 @@
+// Avancement des commandes en temps réel, sans recharger la page
+if (window.EventSource) {
+    const steps = ['pending', 'confirmed', 'preparing', 'delivering', 'delivered'];
+    const source = new EventSource(document.currentScript.dataset.eventsUrl);
+    source.addEventListener('order', function(e) {
+        const data = JSON.parse(e.data);
+        const card = document.querySelector(`.order-card[data-order-id="${data.id}"]`);
+        if (!card) return;
+        const current = steps.indexOf(data.status);
+        card.querySelectorAll('.progress-step').forEach((step, index) => {
+            step.classList.toggle('completed', current >= index);
+            step.classList.toggle('active', current === index);
+        });
+    });
+}
@@ -0,0 +1,34 @@
+document.getElementById('registerForm').addEventListener('submit', function(e) {
+    let valid = true;
+
+    // Reset errors
+    document.getElementById('usernameError').textContent = '';
+    document.getElementById('emailError').textContent = '';
+    document.getElementById('passwordError').textContent = '';
+
+    // Username validation
+    const username = document.getElementById('username').value.trim();
+    if (username.length < 3) {
+        document.getElementById('usernameError').textContent = "Le nom d'utilisateur doit contenir au moins 3 caractères.";
+        valid = false;
+    }
+
+    // Email validation
+    const email = document.getElementById('email').value.trim();
+    const emailPattern = /^[^\s@]+@[^\s@]+\.[^\s@]+$/;
+    if (!emailPattern.test(email)) {
+        document.getElementById('emailError').textContent = "Veuillez entrer une adresse email valide.";
+        valid = false;
+    }
+
+    // Password validation
+    const password = document.getElementById('password').value;
+    if (password.length < 6) {
+        document.getElementById('passwordError').textContent = "Le mot de passe doit contenir au moins 6 caractères.";
+        valid = false;
+    }
+
+    if (!valid) {
+        e.preventDefault();
+    }
+});
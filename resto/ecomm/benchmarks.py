@@ -0,0 +1,1492 @@
+import asyncio
+import io
+import json
+import os
+import re
+import socket
+import sqlite3
+import subprocess
+import sys
+import statistics
+import tempfile
+import threading
+import time
+import tracemalloc
+from concurrent.futures import ThreadPoolExecutor
+from contextlib import contextmanager
+from datetime import date, datetime, time as dtime, timedelta
+from decimal import Decimal
+from unittest import mock
+from urllib.parse import urlencode
+
+from asgiref.sync import async_to_sync
+from django.conf import settings
+from django.contrib.auth.models import User
+from django.core.cache import cache
+from django.core.files.base import ContentFile
+from django.core.files.storage import default_storage
+from django.core.files.uploadedfile import SimpleUploadedFile
+from django.core.handlers.asgi import ASGIHandler
+from django.core.management import call_command
+from django.core.paginator import Paginator
+from django.db import OperationalError, close_old_connections, connection, reset_queries, transaction
+from django.db.models import Count, F, Q, Sum
+from django.db.models.functions import ExtractHour, TruncDate
+from django.http import JsonResponse
+from django.test import Client, RequestFactory
+from django.test.utils import CaptureQueriesContext, override_settings
+from django.urls import reverse
+from django.utils import timezone
+from whitenoise.middleware import WhiteNoiseMiddleware
+
+from . import cart as cart_ops
+from . import analytics, calendar_feed, capacity, events, exports, images, instrumentation, search, stats, tasks
+from .pagination import encode_cursor
+from .models import (
+    Cart, CartItem, Category, DiningTable, MenuItem, Order, OrderItem, Reservation, SlotOccupancy, Task,
+)
+
+# Registre des scénarios exécutés par la commande `manage.py benchmark`
+SCENARIOS = {}
+
+
+def scenario(name):
+    def register(func):
+        SCENARIOS[name] = func
+        return func
+    return register
+
+
+def measure(func, setup=None, repeat=5):
+    # Médiane, p95 et p99 de la durée (ms) et nombre de requêtes SQL d'un appel à func()
+    timings = []
+    queries = 0
+    for _ in range(repeat):
+        if setup is not None:
+            setup()
+        reset_queries()  # Journal des requêtes plein après un gros peuplement : plus rien ne serait compté
+        with CaptureQueriesContext(connection) as ctx:
+            start = time.perf_counter()
+            func()
+            timings.append((time.perf_counter() - start) * 1000)
+        queries = len(ctx)
+    timings.sort()
+    return {
+        'queries': queries,
+        'median_ms': round(statistics.median(timings), 3),
+        'p95_ms': round(timings[min(len(timings) - 1, int(len(timings) * 0.95))], 3),
+        'p99_ms': round(timings[min(len(timings) - 1, int(len(timings) * 0.99))], 3),
+    }
+
+
+def seed_menu(count, categories=5):
+    categories = Category.objects.bulk_create(
+        Category(name=f'Catégorie {i}') for i in range(categories)
+    )
+    MenuItem.objects.bulk_create(
+        MenuItem(
+            name=f'Plat {i}',
+            description='Plat de démonstration',
+            price=Decimal(500 + (i % 40) * 100),
+            category=categories[i % len(categories)],
+        )
+        for i in range(count)
+    )
+    return list(MenuItem.objects.order_by('id'))
+
+
+def seed_user(username='bench'):
+    user, _ = User.objects.get_or_create(username=username)
+    client = Client()
+    client.force_login(user)
+    return user, client
+
+
+def fill_cart(user, items, quantity=1):
+    cart, _ = Cart.objects.get_or_create(user=user)
+    CartItem.objects.filter(cart=cart).delete()
+    CartItem.objects.bulk_create(
+        CartItem(cart=cart, menu_item=item, quantity=quantity) for item in items
+    )
+    cart.refresh_totals()
+    return cart
+
+
+def legacy_checkout(user):
+    # Ancienne implémentation : une requête INSERT et un chargement de plat par ligne
+    cart = Cart.objects.get(user=user)
+    order = Order.objects.create(
+        user=user,
+        total_amount=sum(item.menu_item.price * item.quantity for item in cart.cartitem_set.all()),
+        phone_number='0600000000',
+    )
+    for item in cart.cartitem_set.all():
+        OrderItem.objects.create(
+            order=order, menu_item=item.menu_item, quantity=item.quantity, price=item.menu_item.price
+        )
+    cart.cartitem_set.all().delete()
+
+
+@scenario('checkout')
+def bench_checkout(repeat):
+    items = seed_menu(50)
+    user, client = seed_user()
+    results = {}
+    for lines in (1, 10, 50):
+        setup = lambda: fill_cart(user, items[:lines])
+        results[f'legacy_{lines}_lines'] = measure(lambda: legacy_checkout(user), setup, repeat)
+        results[f'pipeline_{lines}_lines'] = measure(
+            lambda: client.post(reverse('checkout'), {'phone': '0600000000', 'address': 'Rue 1'}),
+            setup, repeat,
+        )
+    return results
+
+
+DISH_WORDS = [
+    'poulet', 'braisé', 'poisson', 'ndolé', 'plantain', 'alloco', 'attiéké', 'riz',
+    'sauce', 'arachide', 'gombo', 'bœuf', 'crevettes', 'épicé', 'grillé', 'mariné',
+    'beignets', 'haricots', 'manioc', 'coco', 'citron', 'gingembre', 'piment', 'oignons',
+]
+
+
+def seed_catalog(count):
+    # Catalogue synthétique aux noms et descriptions variés, puis indexation
+    categories = Category.objects.bulk_create(Category(name=f'Catégorie {i}') for i in range(10))
+    words = len(DISH_WORDS)
+    MenuItem.objects.bulk_create(
+        (
+            MenuItem(
+                name=f'{DISH_WORDS[i % words].capitalize()} {DISH_WORDS[(i // words) % words]} {i}',
+                description=' '.join(DISH_WORDS[(i * k) % words] for k in (3, 5, 7, 11)),
+                price=Decimal(500 + (i % 40) * 100),
+                category=categories[i % len(categories)],
+            )
+            for i in range(count)
+        ),
+        batch_size=2000,
+    )
+    search.rebuild()
+
+
+@scenario('search')
+def bench_search(repeat):
+    seed_catalog(50000)
+    memory = search.MemoryIndex()
+    for item_id, name, description in MenuItem.objects.values_list('id', 'name', 'description'):
+        memory.add(item_id, name, description)
+
+    results = {}
+    for query in ('braisé', 'poulet braise', 'gingem', 'introuvable'):
+        page = slice(0, 12)
+        results[f'icontains "{query}"'] = measure(lambda: list(
+            MenuItem.objects.filter(is_available=True).filter(
+                Q(name__icontains=query) | Q(description__icontains=query)
+            ).order_by('name')[page]
+        ), repeat=repeat)
+        results[f'fts "{query}"'] = measure(lambda: list(
+            search.search(MenuItem.objects.filter(is_available=True), query)[page]
+        ), repeat=repeat)
+        results[f'memory index "{query}"'] = measure(
+            lambda: memory.search(search.tokenize(query))[page], repeat=repeat
+        )
+    return results
+
+
+@scenario('menu_api')
+def bench_menu_api(repeat):
+    per_page = 12
+    seed_menu(per_page * 1000 + per_page)
+    client = Client()
+    available = MenuItem.objects.filter(is_available=True)
+    results = {}
+    for page_number in (1, 10, 100, 1000):
+        cursor = None
+        if page_number > 1:
+            last = available.order_by('name', 'id')[(page_number - 1) * per_page - 1]
+            cursor = encode_cursor(['name', 'id'], [last.name, last.id])
+        params = {'cursor': cursor} if cursor else {}
+        setup = cache.clear  # Mesure d'un premier accès, sans 304
+        results[f'offset page {page_number}'] = measure(
+            lambda: list(Paginator(available.order_by('name'), per_page).get_page(page_number)),
+            repeat=repeat,
+        )
+        results[f'api cursor page {page_number}'] = measure(
+            lambda: client.get(reverse('menu_api'), params), setup, repeat
+        )
+    response = client.get(reverse('menu_api'))
+    results['api 304 revalidation'] = measure(
+        lambda: client.get(reverse('menu_api'), HTTP_IF_NONE_MATCH=response['ETag']), repeat=repeat
+    )
+    return results
+
+
+def legacy_add_to_cart(user, menu_item):
+    # Ancienne implémentation : lecture puis écriture de la quantité
+    cart, _ = Cart.objects.get_or_create(user=user)
+    cart_item, created = CartItem.objects.get_or_create(cart=cart, menu_item=menu_item)
+    if not created:
+        cart_item.quantity += 1
+        cart_item.save()
+    cart.refresh_totals()
+
+
+def hammer(add, workers, per_worker):
+    # Exécute add() en parallèle ; renvoie (durée en s, erreurs de verrou réessayées)
+    retries = []
+    lock = threading.Lock()
+
+    def worker(_):
+        done = 0
+        try:
+            while done < per_worker:
+                try:
+                    add()
+                    done += 1
+                except OperationalError:
+                    with lock:
+                        retries.append(1)
+        finally:
+            close_old_connections()
+
+    start = time.perf_counter()
+    with ThreadPoolExecutor(workers) as pool:
+        list(pool.map(worker, range(workers)))
+    return time.perf_counter() - start, len(retries)
+
+
+@scenario('cart_concurrency')
+def bench_cart_concurrency(repeat):
+    menu_item = seed_menu(1)[0]
+    workers, per_worker = 8, 50
+    expected = workers * per_worker
+    results = {}
+    for name, add in (('legacy', legacy_add_to_cart), ('upsert', cart_ops.add_item)):
+        user = User.objects.create(username=f'concurrence-{name}')
+        elapsed, retries = hammer(lambda: add(user, menu_item), workers, per_worker)
+        line = CartItem.objects.get(cart__user=user)
+        results[name] = {
+            'adds': expected,
+            'lost_updates': expected - line.quantity,
+            'lock_retries': retries,
+            'throughput_per_s': round(expected / elapsed, 1),
+        }
+    return results
+
+
+def make_photo(width=2400, height=1600, seed=0):
+    # Photo synthétique : dégradé et bruit, qui se compresse comme une vraie photo
+    from PIL import Image
+    noise = Image.effect_noise((width, height), 40 + seed % 20).convert('RGB')
+    gradient = Image.linear_gradient('L').resize((width, height)).convert('RGB')
+    photo = Image.blend(noise, gradient, 0.6)
+    buffer = io.BytesIO()
+    photo.save(buffer, 'JPEG', quality=90)
+    return buffer.getvalue()
+
+
+IMAGE_URL = re.compile(r'<source type="image/webp" srcset="([^"]+)"|<img src="([^"]+)"(?![^>]*srcset)')
+
+
+def page_image_bytes(html, slot_px):
+    # Octets d'images téléchargés par un navigateur WebP pour des vignettes de slot_px pixels CSS
+    total = 0
+    for srcset, src in IMAGE_URL.findall(html):
+        if srcset:
+            candidates = sorted(
+                (int(width.rstrip('w')), url)
+                for url, width in (candidate.split() for candidate in srcset.split(', '))
+            )
+            src = next((url for width, url in candidates if width >= slot_px), candidates[-1][1])
+        total += default_storage.size(src.removeprefix(default_storage.base_url))
+    return total
+
+
+@scenario('menu_images')
+def bench_menu_images(repeat):
+    count = 12  # Une page de menu
+    with tempfile.TemporaryDirectory() as media_root, override_settings(
+        MEDIA_ROOT=media_root, TASKS_EAGER=True
+    ):
+        items = seed_menu(count)
+        for i, item in enumerate(items):
+            item.image.save(f'plat-{i}.jpg', ContentFile(make_photo(seed=i)), save=False)
+        MenuItem.objects.bulk_update(items, ['image'])  # Sans signal : pas encore de variantes
+        cache.clear()
+        client = Client()
+
+        def render():
+            return client.get(reverse('menu')).content.decode()
+
+        results = {}
+        html = render()  # Page d'origine : le rendu ne déclenche pas de dérivation
+        results['original'] = {
+            'html_kb': round(len(html) / 1024, 1),
+            'image_kb': round(page_image_bytes(html, 720) / 1024, 1),
+        }
+        results['original render'] = measure(render, cache.clear, repeat)
+
+        start = time.process_time()
+        for item in items:
+            images.derive_item(item.pk)
+        cpu = (time.process_time() - start) * 1000
+        results['derivation'] = {'cpu_ms_per_photo': round(cpu / count, 1)}
+
+        html = render()
+        results['variants'] = {
+            'html_kb': round(len(html) / 1024, 1),
+            'image_kb_dpr2': round(page_image_bytes(html, 720) / 1024, 1),
+            'image_kb_dpr1': round(page_image_bytes(html, 360) / 1024, 1),
+        }
+        results['variants render'] = measure(render, cache.clear, repeat)
+    return results
+
+
+@scenario('admin_media')
+def bench_admin_media(repeat):
+    # Édition (nouvelle photo) et suppression d'un plat : travail fait dans la
+    # requête (TASKS_EAGER, comme avant la file) ou confié au worker
+    photo = make_photo()
+    with tempfile.TemporaryDirectory() as media_root, override_settings(MEDIA_ROOT=media_root):
+        item = seed_menu(1)[0]
+        staff, client = seed_user('chef')
+        staff.is_staff = True
+        staff.save()
+
+        def with_photo():
+            cache.clear()
+            # save() recrée le plat s'il vient d'être supprimé
+            item.image.save('plat.jpg', ContentFile(photo), save=False)
+            item.image_variants = {}
+            item.save()
+            images.derive_item(item.pk)
+            Task.objects.all().delete()
+
+        def edit():
+            client.post(reverse('admin_menu_edit', args=[item.pk]), {
+                'name': item.name, 'description': item.description, 'price': item.price,
+                'category': item.category_id, 'image': SimpleUploadedFile('nouveau.jpg', photo),
+            })
+
+        def delete():
+            client.post(reverse('admin_menu_delete', args=[item.pk]))
+
+        results = {}
+        for mode, eager in (('inline', True), ('queued', False)):
+            with override_settings(TASKS_EAGER=eager):
+                results[f'{mode} edit'] = measure(edit, with_photo, repeat)
+                results[f'{mode} delete'] = measure(delete, with_photo, repeat)
+        with_photo()
+        edit()
+        start = time.perf_counter()
+        tasks.run_pending()
+        results['worker'] = {'drain_ms': round((time.perf_counter() - start) * 1000, 1)}
+    return results
+
+
+def rss_kb():
+    with open('/proc/self/statm') as f:
+        return int(f.read().split()[1]) * os.sysconf('SC_PAGE_SIZE') // 1024
+
+
+async def sse_clients(count, cookie, on_message):
+    # Ouvre `count` connexions SSE sur l'application ASGI, dans ce processus ;
+    # renvoie une coroutine qui les ferme toutes
+    app = ASGIHandler()
+    closing = asyncio.Event()
+    scope = {
+        'type': 'http', 'asgi': {'version': '3.0'}, 'http_version': '1.1', 'method': 'GET',
+        'scheme': 'http', 'path': reverse('event_stream'), 'raw_path': b'', 'query_string': b'',
+        'root_path': '', 'headers': [(b'host', b'testserver'), (b'cookie', cookie.encode())],
+        'client': ('127.0.0.1', 0), 'server': ('testserver', 80),
+    }
+
+    def connection():
+        requested = False
+
+        async def receive():
+            nonlocal requested
+            if not requested:
+                requested = True
+                return {'type': 'http.request', 'body': b'', 'more_body': False}
+            await closing.wait()
+            return {'type': 'http.disconnect'}
+
+        async def send(message):
+            if message['type'] == 'http.response.body' and message.get('body', b'').startswith(b'event:'):
+                on_message(message['body'])
+
+        return app(dict(scope), receive, send)
+
+    running = [asyncio.create_task(connection()) for _ in range(count)]
+
+    async def close():
+        closing.set()
+        await asyncio.wait(running, timeout=10)
+
+    return close
+
+
+@scenario('events_fanout')
+def bench_events_fanout(repeat):
+    staff, client = seed_user('cuisine')
+    staff.is_staff = True
+    staff.save()
+    cookie = f"sessionid={client.cookies['sessionid'].value}"
+    broker = events.get_broker()
+
+    async def run(count):
+        latencies = []
+        pending = {}
+
+        def on_message(body):
+            data = json.loads(body.split(b'data: ', 1)[1])
+            latencies.append(time.perf_counter() - data['sent'])
+            pending['left'] -= 1
+            if not pending['left']:
+                pending['done'].set()
+
+        rss_before = rss_kb()
+        tracemalloc.start()
+        close = await sse_clients(count, cookie, on_message)
+        while broker.subscriber_count() < count:
+            await asyncio.sleep(0.01)
+        allocated = tracemalloc.get_traced_memory()[0]
+        tracemalloc.stop()
+        rss_after = rss_kb()
+
+        rounds = []
+        for _ in range(repeat):
+            pending.update(left=count, done=asyncio.Event())
+            message = events.encode('order', {'sent': time.perf_counter()})
+            start = time.perf_counter()
+            # Publication depuis un autre thread, comme une vue synchrone
+            await asyncio.to_thread(broker.publish, 'staff', message)
+            await pending['done'].wait()
+            rounds.append((time.perf_counter() - start) * 1000)
+        await close()
+
+        latencies.sort()
+        return {
+            'clients': count,
+            'kb_per_client': round(allocated / 1024 / count, 1),
+            'rss_delta_kb': rss_after - rss_before,
+            'p50_ms': round(latencies[len(latencies) // 2] * 1000, 2),
+            'p95_ms': round(latencies[int(len(latencies) * 0.95)] * 1000, 2),
+            'all_delivered_ms': round(statistics.median(rounds), 2),
+        }
+
+    return {f'{count} clients': asyncio.run(run(count)) for count in (10, 100, 1000)}
+
+
+def snapshot_database(path):
+    # Copie la base de test (en mémoire) dans un fichier, lisible par un serveur lancé à part
+    connection.ensure_connection()
+    target = sqlite3.connect(path)
+    with target:
+        connection.connection.backup(target)
+    target.close()
+
+
+def free_port():
+    with socket.socket() as sock:
+        sock.bind(('127.0.0.1', 0))
+        return sock.getsockname()[1]
+
+
+SLOW_DATABASE_HOOK = """
+def post_worker_init(worker):
+    # Latence réseau simulée sur chaque requête SQL (base distante)
+    import time
+    from django.db.backends.signals import connection_created
+
+    def slow(execute, sql, params, many, context):
+        time.sleep({latency})
+        return execute(sql, params, many, context)
+
+    def install(connection, **kwargs):
+        connection.execute_wrappers.append(slow)
+
+    connection_created.connect(install, weak=False)
+"""
+
+
+@contextmanager
+def run_server(mode, database, workers=2, db_latency_ms=0, environ=None):
+    # Serveur gunicorn local (gunicorn.conf.py) en mode 'wsgi' ou 'asgi' ;
+    # `environ` complète ou remplace les variables d'environnement des workers
+    port = free_port()
+    env = dict(
+        os.environ, SERVER_MODE=mode, SQLITE_PATH=database, WEB_CONCURRENCY=str(workers), DEBUG='False',
+        **(environ or {}),
+    )
+    config = os.path.join(settings.BASE_DIR, 'gunicorn.conf.py')
+    with tempfile.NamedTemporaryFile('w', suffix='.py', delete=False) as f:
+        f.write(f'exec(open({config!r}).read())\n')
+        if db_latency_ms:
+            f.write(SLOW_DATABASE_HOOK.format(latency=db_latency_ms / 1000))
+    process = subprocess.Popen(
+        [sys.executable, '-m', 'gunicorn', '--config', f.name,
+         '--bind', f'127.0.0.1:{port}', '--log-level', 'warning', '--backlog', '2048'],
+        cwd=settings.BASE_DIR, env=env,
+    )
+    try:
+        deadline = time.monotonic() + 30
+        while True:
+            try:
+                if asyncio.run(http_get(port, '/'))[0] == 200:
+                    break
+            except OSError:
+                pass
+            if time.monotonic() > deadline or process.poll() is not None:
+                raise RuntimeError(f"Le serveur {mode} n'a pas démarré")
+            time.sleep(0.2)
+        yield port
+    finally:
+        process.terminate()
+        process.wait(10)
+        os.unlink(f.name)
+
+
+async def http_request(port, method, path, cookie=None, data=None, headers=()):
+    # Client HTTP/1.1 minimal : une connexion par requête, comme un navigateur sans keep-alive
+    reader, writer = await asyncio.open_connection('127.0.0.1', port)
+    request = f'{method} {path} HTTP/1.1\r\nHost: localhost\r\nConnection: close\r\n'
+    if cookie:
+        request += f'Cookie: {cookie}\r\n'
+    for name, value in headers:
+        request += f'{name}: {value}\r\n'
+    body = urlencode(data or {}).encode()
+    if method == 'POST':
+        request += f'Content-Type: application/x-www-form-urlencoded\r\nContent-Length: {len(body)}\r\n'
+    writer.write((request + '\r\n').encode() + body)
+    await writer.drain()
+    response = await reader.read()
+    writer.close()
+    return int(response[9:12]), len(response)
+
+
+async def http_get(port, path, cookie=None):
+    return await http_request(port, 'GET', path, cookie)
+
+
+def percentiles(latencies):
+    latencies = sorted(latencies)
+
+    def percentile(p):
+        return round(latencies[min(len(latencies) - 1, int(len(latencies) * p))], 1) if latencies else None
+
+    return {'p50_ms': percentile(0.50), 'p95_ms': percentile(0.95), 'p99_ms': percentile(0.99)}
+
+
+async def http_load(port, requests, clients, per_client):
+    # `clients` clients simultanés, chacun enchaînant `per_client` requêtes (chemin, cookie)
+    latencies = []
+    errors = 0
+
+    async def client(number):
+        nonlocal errors
+        for i in range(per_client):
+            path, cookie = requests[(number + i) % len(requests)]
+            start = time.perf_counter()
+            try:
+                status, _ = await http_get(port, path, cookie)
+            except OSError:
+                errors += 1
+                continue
+            if status != 200:
+                errors += 1
+            latencies.append((time.perf_counter() - start) * 1000)
+
+    start = time.perf_counter()
+    await asyncio.gather(*(client(number) for number in range(clients)))
+    elapsed = time.perf_counter() - start
+    return {
+        'requests': clients * per_client,
+        'errors': errors,
+        'rps': round(clients * per_client / elapsed, 1),
+        **percentiles(latencies),
+    }
+
+
+def session_cookie(user):
+    client = Client()
+    client.force_login(user)
+    return f"sessionid={client.cookies['sessionid'].value}"
+
+
+@scenario('server_concurrency')
+def bench_server_concurrency(repeat):
+    # Pages de lecture (accueil, menu, historique, calendrier) servies par un
+    # vrai serveur : workers synchrones (WSGI) contre workers uvicorn (ASGI)
+    items = seed_menu(200)
+    customer = User.objects.create(username='habitue')
+    staff = User.objects.create(username='cuisine', is_staff=True)
+    for i in range(30):
+        Order.objects.create(user=customer, total_amount=Decimal('3000'), phone_number='0600000000')
+        Reservation.objects.create(
+            user=customer, date=date(2026, 11, 1 + i % 28), time=dtime(19, 30),
+            number_of_guests=2, phone_number='0600000000',
+        )
+    customer_cookie, staff_cookie = session_cookie(customer), session_cookie(staff)
+    requests = [
+        ('/', None),
+        ('/menu/', None),
+        (f'/menu/?category={items[0].category_id}&sort=price', None),
+        ('/my-orders/', customer_cookie),
+        ('/dashboard/reservations/events/?start=2026-11-01&end=2026-12-01', staff_cookie),
+    ]
+
+    results = {}
+    with tempfile.TemporaryDirectory() as directory:
+        database = os.path.join(directory, 'bench.sqlite3')
+        snapshot_database(database)
+        # SQLite local, puis une base distante simulée (5 ms par requête SQL)
+        for latency in (0, 5):
+            for mode in ('wsgi', 'asgi'):
+                with run_server(mode, database, db_latency_ms=latency) as port:
+                    asyncio.run(http_load(port, requests, 10, 2))  # Caches chauds
+                    for clients in (50, 200):
+                        results[f'{mode} db+{latency}ms {clients} clients'] = asyncio.run(
+                            http_load(port, requests, clients, 2)
+                        )
+    return results
+
+
+def seed_reservations(user, start, days, per_slot=4):
+    # Une année de réservations synthétiques : `per_slot` groupes de 1 à 6 par créneau
+    slots = capacity.slots()
+    Reservation.objects.bulk_create(
+        (
+            Reservation(
+                user=user, date=start + timedelta(days=day), time=slot,
+                number_of_guests=1 + (day + i + n) % 6, phone_number='0600000000',
+                status='cancelled' if (day + n) % 10 == 0 else 'confirmed',
+            )
+            for day in range(days)
+            for i, slot in enumerate(slots)
+            for n in range(per_slot)
+        ),
+        batch_size=2000,
+    )
+
+
+def legacy_availability(day, guests, seats):
+    # Sans index d'occupation : agrégation des réservations du jour à chaque requête
+    booked = {}
+    rows = Reservation.objects.filter(date=day, status__in=capacity.ACTIVE_STATUSES).order_by()
+    for row in rows.values('time').annotate(guests=Sum('number_of_guests')):
+        for slot in capacity.covered_slots(row['time']):
+            booked[slot] = booked.get(slot, 0) + row['guests']
+    return [
+        min(seats - booked.get(covered, 0) for covered in capacity.covered_slots(slot)) >= guests
+        for slot in capacity.slots()
+    ]
+
+
+def legacy_book(user, day, start, guests, seats):
+    # Vérification puis insertion, sans verrou : deux requêtes peuvent lire la même occupation
+    covered = capacity.covered_slots(start)
+    booked = Reservation.objects.filter(
+        date=day, time__in=covered, status__in=capacity.ACTIVE_STATUSES
+    ).aggregate(guests=Sum('number_of_guests'))['guests'] or 0
+    if booked + guests <= seats:
+        Reservation.objects.create(user=user, date=day, time=start, number_of_guests=guests, phone_number='0')
+
+
+def indexed_book(user, day, start, guests):
+    with transaction.atomic():
+        capacity.reserve(day, start, guests)
+        Reservation.objects.create(user=user, date=day, time=start, number_of_guests=guests, phone_number='0')
+
+
+@scenario('reservation_capacity')
+def bench_reservation_capacity(repeat):
+    user = User.objects.create(username='reservations')
+    tables = DiningTable.objects.bulk_create(DiningTable(name=f'T{i}', seats=4) for i in range(10))
+    seats = sum(table.seats for table in tables)
+    first_day = date(2026, 1, 1)
+    seed_reservations(user, first_day, 365)
+    capacity.rebuild()
+    day = date(2026, 7, 14)
+    results = {
+        'dataset': {
+            'reservations': Reservation.objects.count(),
+            'occupancy_rows': SlotOccupancy.objects.count(),
+            'seats_per_slot': seats,
+        },
+        'availability legacy': measure(lambda: legacy_availability(day, 4, seats), repeat=repeat * 20),
+        'availability indexed': measure(lambda: capacity.availability(day, 4), repeat=repeat * 20),
+    }
+    days = iter(range(1000))
+    results['book indexed'] = measure(
+        lambda: indexed_book(user, date(2028, 1, 1) + timedelta(days=next(days)), dtime(19, 0), 2),
+        repeat=repeat * 20,
+    )
+
+    # Réservations concurrentes sur un même créneau vide : places vendues contre capacité
+    workers, per_worker = 8, 10
+    for name, book in (
+        ('legacy', lambda day: legacy_book(user, day, dtime(20, 0), 3, seats)),
+        ('indexed', lambda day: indexed_book(user, day, dtime(20, 0), 3)),
+    ):
+        target = date(2029, 1, 1) if name == 'legacy' else date(2029, 1, 2)
+
+        def attempt():
+            try:
+                book(target)
+            except capacity.SlotUnavailable:
+                pass
+
+        elapsed, retries = hammer(attempt, workers, per_worker)
+        sold = Reservation.objects.filter(date=target).aggregate(guests=Sum('number_of_guests'))['guests'] or 0
+        results[f'concurrency {name}'] = {
+            'attempts': workers * per_worker,
+            'seats_sold': sold,
+            'capacity': seats,
+            'overbooked': max(0, sold - seats),
+            'lock_retries': retries,
+            'throughput_per_s': round(workers * per_worker / elapsed, 1),
+        }
+    return results
+
+
+def legacy_reservation_events(start, end):
+    # Ancienne implémentation : une instance de modèle par réservation, à chaque requête
+    events = []
+    for reservation in Reservation.objects.filter(date__range=[start, end]).select_related('user'):
+        events.append({
+            'id': reservation.id,
+            'title': f"{reservation.user.username} - {reservation.number_of_guests} pers.",
+            'start': f"{reservation.date}T{reservation.time}",
+            'className': f"bg-{reservation.status}",
+        })
+    return JsonResponse(events, safe=False).content
+
+
+async def calendar_body(start, end):
+    versions = await calendar_feed.aweek_versions(calendar_feed.weeks_between(start, end))
+    return b''.join([chunk async for chunk in calendar_feed.afeed(start, end, versions)])
+
+
+async def calendar_streamed_size(start, end):
+    # Consomme le flux morceau par morceau, comme le serveur : rien n'est conservé
+    versions = await calendar_feed.aweek_versions(calendar_feed.weeks_between(start, end))
+    return sum([len(chunk) async for chunk in calendar_feed.afeed(start, end, versions)])
+
+
+async def calendar_etag(start, end):
+    versions = await calendar_feed.aweek_versions(calendar_feed.weeks_between(start, end))
+    return calendar_feed.etag(start, end, versions)
+
+
+def peak_kb(func):
+    tracemalloc.start()
+    func()
+    peak = tracemalloc.get_traced_memory()[1]
+    tracemalloc.stop()
+    return peak // 1024
+
+
+@scenario('calendar_feed')
+def bench_calendar_feed(repeat):
+    user = User.objects.create(username='calendrier')
+    seed_reservations(user, date(2026, 1, 1), 365, per_slot=31)
+    views = {
+        'month': (date(2026, 6, 1), date(2026, 7, 13)),  # Grille mensuelle de FullCalendar : 6 semaines
+        'year': (date(2026, 1, 1), date(2027, 1, 1)),
+    }
+    results = {'dataset': {'reservations': Reservation.objects.count()}}
+    for name, (start, end) in views.items():
+        body = async_to_sync(calendar_body)(start, end)
+        results[f'{name} size'] = {
+            'events': len(json.loads(body)),
+            'kb': len(body) // 1024,
+        }
+        results[f'{name} legacy'] = measure(
+            lambda: legacy_reservation_events(start, end - timedelta(days=1)), repeat=repeat,
+        )
+        results[f'{name} feed cold'] = measure(
+            lambda: async_to_sync(calendar_body)(start, end), setup=cache.clear, repeat=repeat,
+        )
+        results[f'{name} feed cached'] = measure(lambda: async_to_sync(calendar_body)(start, end), repeat=repeat)
+        results[f'{name} revalidate (304)'] = measure(
+            lambda: async_to_sync(calendar_etag)(start, end), repeat=repeat * 10,
+        )
+    start, end = views['year']
+    cache.clear()
+    results['year peak memory'] = {
+        'legacy_kb': peak_kb(lambda: legacy_reservation_events(start, end - timedelta(days=1))),
+        'streamed_cold_kb': peak_kb(lambda: async_to_sync(calendar_streamed_size)(start, end)),
+        'streamed_cached_kb': peak_kb(lambda: async_to_sync(calendar_streamed_size)(start, end)),
+    }
+    return results
+
+
+def seed_orders(count, user, menu_item, batch=50000):
+    # `count` commandes d'une ligne chacune, insérées par lots
+    for start in range(0, count, batch):
+        orders = Order.objects.bulk_create(
+            Order(user=user, total_amount=Decimal('1500'), phone_number='0600000000', delivery_address='Rue 1')
+            for _ in range(min(batch, count - start))
+        )
+        OrderItem.objects.bulk_create(
+            OrderItem(order=order, menu_item=menu_item, quantity=1, price=Decimal('1500')) for order in orders
+        )
+
+
+# Export naïf, pour comparaison : toute la table chargée en instances de modèle
+LEGACY_EXPORT = """
+import csv, os
+from ecomm.models import Order, OrderItem
+lines = {}
+for item in OrderItem.objects.select_related('menu_item'):
+    lines.setdefault(item.order_id, []).append(item)
+writer = csv.writer(open(os.devnull, 'w'))
+for order in list(Order.objects.select_related('user')):
+    for item in lines.get(order.id, []):
+        writer.writerow([order.id, order.created_at, order.user.username, order.status, order.total_amount,
+                         item.menu_item.name, item.quantity, item.price])
+"""
+
+
+# Lance manage.py puis affiche le pic de mémoire résidente du processus.
+# ru_maxrss d'un processus fils n'est pas fiable ici : sous Linux, il hérite du
+# pic du parent au moment du fork.
+PEAK_RSS_RUNNER = """
+import os, runpy, sys
+try:
+    runpy.run_path('manage.py', run_name='__main__')
+finally:
+    with open('/proc/self/status') as f:
+        sys.stderr.write(next(line for line in f if line.startswith('VmHWM')))
+"""
+
+
+def run_command(args, database):
+    # Exécute manage.py sur `database` ; renvoie (durée en s, pic de mémoire résidente en Mo)
+    env = dict(os.environ, SQLITE_PATH=database)
+    start = time.perf_counter()
+    process = subprocess.run(
+        [sys.executable, '-c', PEAK_RSS_RUNNER, *args], cwd=settings.BASE_DIR, env=env,
+        stdout=subprocess.DEVNULL, stderr=subprocess.PIPE, text=True,
+    )
+    elapsed = time.perf_counter() - start
+    if process.returncode:
+        raise RuntimeError(f"manage.py {' '.join(args)} a échoué : {process.stderr}")
+    peak_kb = int(process.stderr.rsplit('VmHWM:', 1)[1].split()[0])
+    return round(elapsed, 1), round(peak_kb / 1024, 1)
+
+
+@scenario('export')
+def bench_export(repeat):
+    # Export des commandes par `manage.py export_data` dans un processus séparé,
+    # pour mesurer son pic de mémoire résidente, à 100 000 puis 1 000 000 de commandes
+    user = User.objects.create(username='comptable')
+    menu_item = seed_menu(1)[0]
+    results = {}
+    seeded = 0
+    with tempfile.TemporaryDirectory() as directory:
+        database = os.path.join(directory, 'export.sqlite3')
+        for count in (100_000, 1_000_000):
+            seed_orders(count - seeded, user, menu_item)
+            seeded = count
+            snapshot_database(database)
+            for fmt in exports.FORMATS:
+                elapsed, rss = run_command(['export_data', 'orders', '--format', fmt, '-o', os.devnull], database)
+                results[f'{count} orders {fmt}'] = {
+                    'seconds': elapsed, 'rows_per_s': round(count / elapsed), 'peak_rss_mb': rss,
+                }
+            if count == 100_000:
+                elapsed, rss = run_command(['shell', '-c', LEGACY_EXPORT], database)
+                results[f'{count} orders legacy csv'] = {
+                    'seconds': elapsed, 'rows_per_s': round(count / elapsed), 'peak_rss_mb': rss,
+                }
+        # Référence : pic d'un processus manage.py qui ne fait rien
+        results['manage.py check'] = {'peak_rss_mb': run_command(['check'], database)[1]}
+    return results
+
+
+def seed_sales(user, items, days, per_day=150, batch=20000):
+    # `days` jours de commandes synthétiques jusqu'à hier, de 11 h à 23 h,
+    # de une à quatre lignes ; une sur vingt annulée
+    first = timezone.localdate() - timedelta(days=days)
+    stamps = [
+        timezone.make_aware(datetime.combine(first + timedelta(days=day), dtime(11)) + timedelta(minutes=n * 720 // per_day))
+        for day in range(days)
+        for n in range(per_day)
+    ]
+    for start in range(0, len(stamps), batch):
+        count = min(batch, len(stamps) - start)
+        lines = [
+            [items[(start + i + k * 7) % len(items)] for k in range(1 + (start + i) % 4)]
+            for i in range(count)
+        ]
+        # created_at est en auto_now_add : désactivé le temps d'imposer l'horodatage
+        with mock.patch.object(Order._meta.get_field('created_at'), 'auto_now_add', False):
+            orders = Order.objects.bulk_create(
+                Order(
+                    user=user, phone_number='0600000000', created_at=stamps[start + i],
+                    total_amount=sum(item.price for item in dishes),
+                    status='cancelled' if (start + i) % 20 == 0 else 'delivered',
+                )
+                for i, dishes in enumerate(lines)
+            )
+        OrderItem.objects.bulk_create(
+            OrderItem(order=order, menu_item=item, quantity=1, price=item.price)
+            for order, dishes in zip(orders, lines)
+            for item in dishes
+        )
+
+
+def legacy_top_items(since):
+    # Sans cumuls : agrégation des lignes de commande de la période à chaque affichage
+    rows = OrderItem.objects.filter(
+        order__created_at__gte=timezone.make_aware(datetime.combine(since, dtime.min))
+    ).exclude(order__status='cancelled').values('menu_item_id', 'menu_item__name').annotate(
+        sold=Sum('quantity'), revenue=Sum(F('price') * F('quantity')),
+    )
+    return list(rows.order_by('-sold')[:10])
+
+
+def legacy_revenue_by_hour(since):
+    rows = Order.objects.filter(
+        created_at__gte=timezone.make_aware(datetime.combine(since, dtime.min))
+    ).exclude(status='cancelled').annotate(
+        hour=ExtractHour('created_at', tzinfo=timezone.get_current_timezone())
+    ).values('hour').annotate(order_count=Count('id'), revenue=Sum('total_amount'))
+    return list(rows.order_by('hour'))
+
+
+def legacy_revenue_by_day(since):
+    rows = Order.objects.filter(
+        created_at__gte=timezone.make_aware(datetime.combine(since, dtime.min))
+    ).exclude(status='cancelled').annotate(
+        day=TruncDate('created_at', tzinfo=timezone.get_current_timezone())
+    ).values('day').annotate(order_count=Count('id'), revenue=Sum('total_amount'))
+    return list(rows.order_by('day'))
+
+
+@scenario('analytics')
+def bench_analytics(repeat):
+    # Rapports de ventes sur deux ans de commandes : agrégation des commandes à
+    # la demande contre lecture des cumuls journaliers
+    items = seed_menu(60)
+    user, client = seed_user()
+    staff = User.objects.create(username='gerant', is_staff=True)
+    staff_client = Client()
+    staff_client.force_login(staff)
+    seed_sales(user, items, 730)
+    start = time.perf_counter()
+    hours, dish_days = analytics.rebuild()
+    rebuilt_s = time.perf_counter() - start
+    results = {
+        'dataset': {
+            'orders': Order.objects.count(),
+            'order_items': OrderItem.objects.count(),
+            'hour_rollups': hours,
+            'item_rollups': dish_days,
+            'rebuild_s': round(rebuilt_s, 2),
+        },
+    }
+    for days in (30, 730):
+        since, until = analytics.period(days)
+        results[f'top items {days}d legacy'] = measure(lambda: legacy_top_items(since), repeat=repeat)
+        results[f'top items {days}d rollups'] = measure(lambda: analytics.top_items(since, until), repeat=repeat)
+        results[f'by hour {days}d legacy'] = measure(lambda: legacy_revenue_by_hour(since), repeat=repeat)
+        results[f'by hour {days}d rollups'] = measure(lambda: analytics.revenue_by_hour(since, until), repeat=repeat)
+        results[f'by day {days}d legacy'] = measure(lambda: legacy_revenue_by_day(since), repeat=repeat)
+        results[f'by day {days}d rollups'] = measure(lambda: analytics.revenue_by_day(since, until), repeat=repeat)
+    results['page 365d'] = measure(
+        lambda: staff_client.get(reverse('admin_analytics'), {'days': 365}), repeat=repeat,
+    )
+
+    # Coût de la tenue des cumuls au passage d'une commande de 3 lignes
+    setup = lambda: fill_cart(user, items[:3])
+    checkout = lambda: client.post(reverse('checkout'), {'phone': '0600000000', 'address': 'Rue 1'})
+    with mock.patch.object(analytics, 'order_created'):
+        results['checkout without rollups'] = measure(checkout, setup, repeat * 4)
+    results['checkout with rollups'] = measure(checkout, setup, repeat * 4)
+    return results
+
+
+def per_call_us(func, calls):
+    start = time.perf_counter()
+    for _ in range(calls):
+        func()
+    return (time.perf_counter() - start) / calls * 1e6
+
+
+@scenario('instrumentation')
+def bench_instrumentation(repeat):
+    # Surcoût de l'instrumentation : coût propre par requête HTTP, mesuré sur
+    # une vue réduite à cinq requêtes SQL simples et distinctes, puis rapporté à la durée
+    # des pages menu et panier selon le taux d'échantillonnage. Comparer
+    # directement les pages avec et sans middleware noierait l'écart dans le bruit.
+    items = seed_menu(50)
+    user, client = seed_user()
+    fill_cart(user, items[:20])
+    cart = Cart.objects.get(user=user)
+
+    def view(request):
+        # Requêtes toutes différentes : une répétition serait signalée dans les logs
+        Cart.objects.filter(pk=cart.pk).exists()
+        Cart.objects.filter(user=user).exists()
+        CartItem.objects.filter(cart=cart).exists()
+        MenuItem.objects.filter(pk=items[0].pk).exists()
+        Category.objects.filter(pk=items[0].category_id).exists()
+        return JsonResponse({})
+
+    request = RequestFactory().get('/')
+    middleware = instrumentation.InstrumentationMiddleware(view)
+    # Variantes alternées sur plusieurs tours, meilleur tour retenu : écarte
+    # les dérives (cache, ramasse-miettes) d'une variante mesurée à part
+    variants = {
+        'plain': (None, lambda: view(request)),
+        'rate 0.0': (0.0, lambda: middleware(request)),
+        'rate 1.0': (1.0, lambda: middleware(request)),
+    }
+    best = {name: float('inf') for name in variants}
+    for _ in range(repeat * 20):
+        for name, (rate, func) in variants.items():
+            with override_settings(INSTRUMENTATION_SAMPLE_RATE=rate if rate is not None else 0):
+                best[name] = min(best[name], per_call_us(func, 50))
+    results = {}
+    for rate in (0.0, 1.0):
+        results[f'cost per request, rate {rate}'] = {
+            'view_us': round(best['plain'], 1), 'overhead_us': round(best[f'rate {rate}'] - best['plain'], 1),
+        }
+    sampled = results['cost per request, rate 1.0']['overhead_us']
+    unsampled = results['cost per request, rate 0.0']['overhead_us']
+    for page, url in (('menu', reverse('menu')), ('panier', reverse('panier'))):
+        client.get(url)  # Cache du catalogue
+        with override_settings(INSTRUMENTATION_SAMPLE_RATE=0):
+            timing = measure(lambda: client.get(url), repeat=repeat * 20)
+        results[f'{page} page'] = timing
+        for rate in (0.05, 1.0):
+            overhead = rate * sampled + (1 - rate) * unsampled
+            results[f'{page} overhead, rate {rate}'] = {
+                'overhead_pct': round(overhead / (timing['median_ms'] * 1000) * 100, 2),
+            }
+    return results
+
+
+# Parcours de commande complet, à plusieurs volumes de données. Chaque échelle
+# complète la précédente : (plats, clients, commandes, réservations).
+SCALES = (
+    ('small', {'menu': 20, 'users': 50, 'orders': 1_000, 'reservations': 500}),
+    ('medium', {'menu': 100, 'users': 1_000, 'orders': 20_000, 'reservations': 10_000}),
+    ('large', {'menu': 300, 'users': 10_000, 'orders': 200_000, 'reservations': 100_000}),
+)
+LOAD_CLIENTS = 20  # Clients simultanés du test de charge, chacun avec son compte
+
+
+def seed_scale(current, target, batch=20000):
+    # Complète les données de `current` (volumes déjà en base) jusqu'à `target`
+    categories = list(Category.objects.all()) or Category.objects.bulk_create(
+        Category(name=f'Catégorie {i}') for i in range(5)
+    )
+    MenuItem.objects.bulk_create(
+        MenuItem(
+            name=f'Plat {i}', description='Plat de démonstration', price=Decimal(500 + (i % 40) * 100),
+            category=categories[i % len(categories)],
+        )
+        for i in range(current['menu'], target['menu'])
+    )
+    User.objects.bulk_create(
+        User(username=f'client{i}', password='!') for i in range(current['users'], target['users'])
+    )
+    items = list(MenuItem.objects.order_by('id'))
+    users = list(User.objects.filter(username__startswith='client').order_by('id').values_list('id', flat=True))
+
+    # Commandes des douze derniers mois, de une à quatre lignes ; created_at
+    # imposé (auto_now_add désactivé le temps de l'insertion)
+    now = timezone.now()
+    for start in range(current['orders'], target['orders'], batch):
+        numbers = range(start, min(start + batch, target['orders']))
+        lines = {n: [items[(n + k * 7) % len(items)] for k in range(1 + n % 4)] for n in numbers}
+        with mock.patch.object(Order._meta.get_field('created_at'), 'auto_now_add', False):
+            orders = Order.objects.bulk_create(
+                Order(
+                    user_id=users[n % len(users)], phone_number='0600000000', delivery_address='Rue 1',
+                    total_amount=sum(item.price for item in lines[n]),
+                    status=('delivered', 'delivered', 'delivered', 'cancelled', 'pending')[n % 5],
+                    created_at=now - timedelta(minutes=(n * 7919) % (365 * 24 * 60)),
+                )
+                for n in numbers
+            )
+        OrderItem.objects.bulk_create(
+            OrderItem(order=order, menu_item=item, quantity=1, price=item.price)
+            for order, n in zip(orders, numbers)
+            for item in lines[n]
+        )
+
+    slots = capacity.slots()
+    today = timezone.localdate()
+    Reservation.objects.bulk_create(
+        (
+            Reservation(
+                user_id=users[n % len(users)], date=today + timedelta(days=n % 730 - 365), time=slots[n % len(slots)],
+                number_of_guests=1 + n % 6, phone_number='0600000000',
+                status=('confirmed', 'confirmed', 'pending', 'cancelled')[n % 4],
+            )
+            for n in range(current['reservations'], target['reservations'])
+        ),
+        batch_size=batch,
+    )
+    # Compteurs dénormalisés cohérents avec les données insérées
+    stats.rebuild()
+    capacity.rebuild()
+    analytics.rebuild()
+
+
+CSRF_TOKEN = 'benchmarkbenchmarkbenchmarkbench'  # Secret de 32 caractères, envoyé en cookie et en en-tête
+
+
+def flow_steps(items, number):
+    # Parcours d'un client : (étape, méthode, chemin, données)
+    item = items[number % len(items)]
+    return [
+        ('menu', 'GET', reverse('menu'), None),
+        ('add_to_cart', 'POST', reverse('add_to_cart', args=[item.id]), {}),
+        ('panier', 'GET', reverse('panier'), None),
+        ('checkout', 'POST', reverse('checkout'), {'address': 'Rue 1', 'phone': '0600000000'}),
+        ('my_orders', 'GET', reverse('my_orders'), None),
+    ]
+
+
+def dashboard_steps():
+    return [
+        (name, 'GET', reverse(name), None)
+        for name in ('admin_dashboard', 'admin_orders', 'admin_reservations', 'admin_analytics')
+    ]
+
+
+async def http_flow_load(port, flows, rounds):
+    # Chaque flux (cookie, étapes) est parcouru `rounds` fois par son propre
+    # client, tous les clients en parallèle ; latences par étape
+    latencies = {}
+    errors = 0
+
+    async def client(cookie, steps):
+        nonlocal errors
+        headers = [('X-CSRFToken', CSRF_TOKEN)]
+        for _ in range(rounds):
+            for step, method, path, data in steps:
+                start = time.perf_counter()
+                try:
+                    status, _ = await http_request(
+                        port, method, path, f'{cookie}; csrftoken={CSRF_TOKEN}', data, headers,
+                    )
+                except OSError:
+                    errors += 1
+                    continue
+                if status not in (200, 302):
+                    errors += 1
+                latencies.setdefault(step, []).append((time.perf_counter() - start) * 1000)
+
+    start = time.perf_counter()
+    await asyncio.gather(*(client(cookie, steps) for cookie, steps in flows))
+    elapsed = time.perf_counter() - start
+    total = sum(len(values) for values in latencies.values())
+    results = {
+        'all': {
+            'requests': total, 'errors': errors, 'rps': round(total / elapsed, 1),
+            **percentiles([value for values in latencies.values() for value in values]),
+        },
+    }
+    results.update((step, percentiles(values)) for step, values in latencies.items())
+    return results
+
+
+@scenario('ordering_flow')
+def bench_ordering_flow(repeat):
+    # Parcours menu -> ajout au panier -> panier -> commande -> historique, et
+    # pages du tableau de bord : par le client de test (durée et requêtes SQL
+    # par étape), puis sous charge sur un serveur gunicorn local (WSGI)
+    staff = User.objects.create(username='gerant', is_staff=True)
+    staff_client = Client()
+    staff_client.force_login(staff)
+    current = {'menu': 0, 'users': 0, 'orders': 0, 'reservations': 0}
+    results = {}
+    for scale, target in SCALES:
+        seed_scale(current, target)
+        current = target
+        items = list(MenuItem.objects.order_by('id'))
+        customers = list(User.objects.filter(username__startswith='client').order_by('id')[:LOAD_CLIENTS])
+        results[f'{scale} dataset'] = dict(target, order_items=OrderItem.objects.count())
+
+        customer, client = customers[0], Client()
+        client.force_login(customer)
+        cart_setup = lambda: fill_cart(customer, items[:3])
+        for step, method, path, data in flow_steps(items, 0) + dashboard_steps():
+            http = staff_client if step.startswith('admin_') else client
+            call = (lambda: http.get(path)) if method == 'GET' else (lambda: http.post(path, data))
+            results[f'{scale} {step}'] = measure(
+                call, cart_setup if step in ('panier', 'checkout') else None, repeat * 4,
+            )
+
+        flows = [(session_cookie(user), flow_steps(items, n)) for n, user in enumerate(customers)]
+        flows.append((session_cookie(staff), dashboard_steps()))
+        with tempfile.TemporaryDirectory() as directory:
+            database = os.path.join(directory, 'flow.sqlite3')
+            snapshot_database(database)
+            with run_server('wsgi', database) as port:
+                asyncio.run(http_flow_load(port, flows[:2], 1))  # Caches chauds
+                for step, timing in asyncio.run(http_flow_load(port, flows, repeat)).items():
+                    results[f'{scale} load {step}'] = timing
+    return results
+
+
+SESSION_MODES = (
+    ('db + session messages', 'db', 'session'),
+    ('db + cookie messages', 'db', 'cookie'),
+    ('cached_db + cookie messages', 'cached_db', 'cookie'),
+    ('signed_cookies + cookie messages', 'signed_cookies', 'cookie'),
+)
+
+
+def write_count(queries):
+    return sum(query['sql'].startswith(('INSERT', 'UPDATE', 'DELETE')) for query in queries)
+
+
+@scenario('session_storage')
+def bench_session_storage(repeat):
+    # Écritures en base (INSERT, UPDATE, DELETE) et accès à django_session par
+    # étape du parcours, message affiché compris (redirection suivie), selon
+    # le stockage des sessions et des messages
+    items = seed_menu(10)
+    staff = User.objects.create(username='gerant', is_staff=True)
+    day = str(timezone.localdate() + timedelta(days=3))
+    steps = [
+        ('contact', 'post', reverse('contact'), {
+            'name': 'Awa', 'email': 'awa@example.com', 'subject': 'Bonjour', 'message': 'Merci',
+        }),
+        ('login', 'post', reverse('login'), {'username': '{user}', 'password': 'secret-pass'}),
+        ('add_to_cart', 'post', reverse('add_to_cart', args=[items[0].id]), {}),
+        ('checkout', 'post', reverse('checkout'), {'address': 'Rue 1', 'phone': '0600000000'}),
+        ('make_reservation', 'post', reverse('make_reservation'), {
+            'date': day, 'time': '19:30', 'guests': 2, 'phone': '0600000000',
+        }),
+        ('my_orders', 'get', reverse('my_orders'), {}),
+    ]
+    admin_step = ('admin_menu_edit', 'post', reverse('admin_menu_edit', args=[items[1].id]), {
+        'name': 'Plat 1', 'description': 'Plat de démonstration', 'price': '1500', 'category': items[1].category_id,
+    })
+    results = {}
+    users = iter(range(10_000))
+    for mode, backend, messages_backend in SESSION_MODES:
+        overrides = override_settings(
+            SESSION_ENGINE=f'django.contrib.sessions.backends.{backend}',
+            MESSAGE_STORAGE=settings.MESSAGE_STORAGES[messages_backend],
+            PASSWORD_HASHERS=['django.contrib.auth.hashers.MD5PasswordHasher'],
+        )
+        measured = {}
+        with overrides:
+            cache.clear()
+            for _ in range(repeat):
+                username = f'client{next(users)}'
+                User.objects.create_user(username, password='secret-pass')
+                client, staff_client = Client(), Client()
+                staff_client.force_login(staff)
+                for step, method, path, data in steps + [admin_step]:
+                    http = staff_client if step == 'admin_menu_edit' else client
+                    data = {key: value.format(user=username) if isinstance(value, str) else value for key, value in data.items()}
+                    reset_queries()
+                    with CaptureQueriesContext(connection) as ctx:
+                        start = time.perf_counter()
+                        getattr(http, method)(path, data, follow=True)
+                        elapsed = (time.perf_counter() - start) * 1000
+                    measured.setdefault(step, []).append((
+                        len(ctx), write_count(ctx.captured_queries),
+                        sum('django_session' in query['sql'] for query in ctx.captured_queries), elapsed,
+                    ))
+        total_writes = 0
+        for step, runs in measured.items():
+            queries, writes, session, _ = runs[-1]
+            total_writes += writes
+            results[f'{mode} {step}'] = {
+                'queries': queries, 'writes': writes, 'session_queries': session,
+                'ms': round(statistics.median(run[3] for run in runs), 2),
+            }
+        results[f'{mode} total'] = {'writes': total_writes}
+    return results
+
+
+# Profils de base comparés par write_concurrency (variables d'environnement du serveur)
+DATABASE_PROFILES = (
+    ('sqlite django', {'SQLITE_TUNING': 'False', 'DB_CONN_MAX_AGE': '0'}),
+    ('sqlite wal+immediate', {'SQLITE_TUNING': 'True', 'DB_CONN_MAX_AGE': '0'}),
+    ('sqlite wal+immediate persistent', {'SQLITE_TUNING': 'True', 'DB_CONN_MAX_AGE': '60'}),
+)
+
+
+def write_steps(items, number):
+    item = items[number % len(items)]
+    return [
+        ('add_to_cart', 'POST', reverse('add_to_cart', args=[item.id]), {}),
+        ('checkout', 'POST', reverse('checkout'), {'address': 'Rue 1', 'phone': '0600000000'}),
+    ]
+
+
+@scenario('write_concurrency')
+def bench_write_concurrency(repeat):
+    # Ajouts au panier et commandes simultanés (LOAD_CLIENTS clients, 4
+    # workers gunicorn) sur la même base SQLite, pour chaque profil : erreurs
+    # ("database is locked" : réponses 500), débit et commandes enregistrées
+    items = seed_menu(20)
+    customers = [User.objects.create(username=f'client{n}') for n in range(LOAD_CLIENTS)]
+    flows = [(session_cookie(user), write_steps(items, n)) for n, user in enumerate(customers)]
+    rounds = max(repeat, 2)
+    results = {}
+    for profile, environ in DATABASE_PROFILES:
+        with tempfile.TemporaryDirectory() as directory:
+            database = os.path.join(directory, 'writes.sqlite3')
+            snapshot_database(database)
+            with run_server('wsgi', database, workers=4, environ=environ) as port:
+                timings = asyncio.run(http_flow_load(port, flows, rounds))
+            with sqlite3.connect(database) as db:
+                orders = db.execute('SELECT COUNT(*) FROM ecomm_order').fetchone()[0]
+        results[profile] = dict(timings['all'], orders=f'{orders}/{LOAD_CLIENTS * rounds}')
+        for step in ('add_to_cart', 'checkout'):
+            results[f'{profile} {step}'] = timings[step]
+    return results
+
+
+def report_steps():
+    since = timezone.localdate() - timedelta(days=30)
+    return dashboard_steps() + [
+        ('admin_export', 'GET', f"{reverse('admin_export', args=['orders'])}?format=jsonl&since={since}", None),
+    ]
+
+
+@scenario('read_replica')
+def bench_read_replica(repeat):
+    # Commandes de LOAD_CLIENTS clients pendant que le personnel consulte
+    # tableau de bord, rapports et exports : base principale seule, puis avec
+    # une réplique SQLite (copie de la base principale, jamais rafraîchie
+    # pendant la mesure : une lecture qui devrait relire la base principale
+    # et lirait la réplique échouerait)
+    target = SCALES[1][1]
+    seed_scale({'menu': 0, 'users': 0, 'orders': 0, 'reservations': 0}, target)
+    staff = User.objects.create(username='gerant', is_staff=True)
+    items = list(MenuItem.objects.order_by('id'))
+    customers = list(User.objects.filter(username__startswith='client').order_by('id')[:LOAD_CLIENTS])
+    flows = [(session_cookie(user), flow_steps(items, n)) for n, user in enumerate(customers)]
+    flows += [(session_cookie(staff), report_steps()) for _ in range(4)]
+
+    results = {}
+    with tempfile.TemporaryDirectory() as directory:
+        for profile in ('primary only', 'replica'):
+            database = os.path.join(directory, f'{profile[0]}.sqlite3')
+            snapshot_database(database)
+            environ = {}
+            if profile == 'replica':
+                replica = os.path.join(directory, 'replica.sqlite3')
+                snapshot_database(replica)
+                environ['DATABASE_REPLICA_URL'] = f'sqlite://{replica}'
+            with run_server('wsgi', database, workers=4, environ=environ) as port:
+                asyncio.run(http_flow_load(port, flows[-1:], 1))  # Caches chauds
+                timings = asyncio.run(http_flow_load(port, flows, repeat))
+            with sqlite3.connect(database) as db:
+                orders = db.execute('SELECT COUNT(*) FROM ecomm_order').fetchone()[0]
+            results[profile] = dict(timings['all'], new_orders=orders - target['orders'])
+            for step in ('checkout', 'my_orders', 'admin_orders', 'admin_analytics', 'admin_export'):
+                results[f'{profile} {step}'] = timings[step]
+    return results
+
+
+ASSET_URL = re.compile(r'(?:href|src)="(/static/[^"]+\.(?:css|js))"')
+INLINE_CODE = re.compile(r'<(style|script)[^>]*>(.*?)</\1>', re.S)
+
+
+@scenario('static_assets')
+def bench_static_assets(repeat):
+    # Octets transférés par page : HTML (dont styles et scripts en ligne), puis
+    # feuilles de style et scripts locaux tels que WhiteNoise les sert après
+    # collectstatic à un navigateur qui accepte Brotli, comme en production
+    # (DEBUG désactivé : noms à empreinte). Au retour sur la page,
+    # seuls les fichiers sans cache immuable sont redemandés (304). Bibliothèques
+    # des CDN non comptées.
+    items = seed_menu(12)
+    customer = User.objects.create_user('client', password='secret-pass')
+    fill_cart(customer, items[:3])
+    staff = User.objects.create(username='gerant', is_staff=True)
+    pages = [
+        (None, name) for name in ('index', 'menu', 'login', 'register', 'contact')
+    ] + [
+        (customer, name) for name in ('panier', 'make_reservation', 'my_orders')
+    ] + [(staff, name) for name in ('admin_dashboard', 'admin_orders')]
+
+    results = {}
+    totals = {'first_visit_kb': 0.0, 'repeat_visit_kb': 0.0, 'requests': 0, 'revalidated': 0}
+    with tempfile.TemporaryDirectory() as static_root, override_settings(
+        STATIC_ROOT=static_root, DEBUG=False,
+    ):
+        call_command('collectstatic', interactive=False, verbosity=0)
+        whitenoise = WhiteNoiseMiddleware(lambda request: None)
+        factory = RequestFactory()
+        for user, name in pages:
+            client = Client()
+            if user is not None:
+                client.force_login(user)
+            html = client.get(reverse(name)).content
+            inline = sum(len(code.encode()) for _, code in INLINE_CODE.findall(html.decode()))
+            assets = revalidated = 0
+            urls = ASSET_URL.findall(html.decode())
+            for url in urls:
+                response = whitenoise(factory.get(url, HTTP_ACCEPT_ENCODING='gzip, deflate, br'))
+                assets += int(response['Content-Length'])
+                revalidated += 'immutable' not in response.get('Cache-Control', '')
+                response.close()
+            results[name] = {
+                'html_kb': round(len(html) / 1024, 1), 'inline_kb': round(inline / 1024, 1),
+                'files': len(urls), 'files_kb': round(assets / 1024, 1),
+                'first_visit_kb': round((len(html) + assets) / 1024, 1), 'revalidated': revalidated,
+            }
+            totals['first_visit_kb'] += (len(html) + assets) / 1024
+            totals['repeat_visit_kb'] += len(html) / 1024
+            totals['requests'] += 1 + len(urls)
+            totals['revalidated'] += revalidated
+    results['total'] = {key: round(value, 1) for key, value in totals.items()}
+    return results
+
+
+def template_settings(cached):
+    loaders = settings.TEMPLATE_LOADERS
+    options = dict(settings.TEMPLATES[0]['OPTIONS'], loaders=[('django.template.loaders.cached.Loader', loaders)] if cached else loaders)
+    return [dict(settings.TEMPLATES[0], OPTIONS=options)]
+
+
+# Modes comparés par template_render : (nom, chargeur en cache, fragments en cache)
+RENDER_MODES = (
+    ('no template cache', False, False),
+    ('cached loader', True, False),
+    ('cached loader + fragments', True, True),
+)
+
+
+@scenario('template_render')
+def bench_template_render(repeat):
+    # Durée des pages index, menu et panier (client connecté, panier de 10
+    # plats), catalogue déjà en cache : sans cache de gabarits, avec le
+    # chargeur en cache, puis avec les fragments en cache (cache partagé pour
+    # la version des paniers)
+    items = seed_menu(24)
+    user, _ = seed_user()
+    fill_cart(user, items[:10])
+    pages = [('index', reverse('index')), ('menu', reverse('menu')), ('panier', reverse('panier'))]
+    dummy = {'BACKEND': 'django.core.cache.backends.dummy.DummyCache'}
+    shared = {'BACKEND': 'django.core.cache.backends.locmem.LocMemCache', 'LOCATION': 'bench-fragments'}
+    results = {}
+    for mode, cached_loader, fragments in RENDER_MODES:
+        caches_setting = dict(
+            settings.CACHES, template_fragments=shared if fragments else dummy, carts=shared if fragments else dummy,
+        )
+        with override_settings(TEMPLATES=template_settings(cached_loader), CACHES=caches_setting):
+            cache.clear()
+            client = Client()
+            client.force_login(user)
+            for name, path in pages:
+                client.get(path)  # Catalogue, fragments et gabarits compilés
+                results[f'{mode} {name}'] = measure(lambda: client.get(path), repeat=repeat)
+    return results
@@ -0,0 +1,158 @@
+import gzip
+import re
+from pathlib import Path
+
+# Feuilles de style et scripts du site, construits par `manage.py build_assets`
+# à partir des sources de ecomm/assets : concaténés, débarrassés des règles
+# CSS qu'aucun gabarit ni script n'utilise, puis minifiés dans
+# ecomm/static/build. Les fichiers construits sont versionnés avec les sources :
+# collectstatic (CompressedManifestStaticFilesStorage) les renomme avec leur
+# empreinte et les précompresse (gzip, Brotli), et WhiteNoise les sert avec un
+# cache immuable de dix ans. Chaque page a ses propres fichiers
+# (pages/<gabarit>) : les styles d'une page ne s'appliquent pas aux autres.
+
+APP_DIR = Path(__file__).resolve().parent
+SOURCE_DIR = APP_DIR / 'assets'
+BUILD_DIR = APP_DIR / 'static' / 'build'
+
+# Fichiers communs : (fichier construit, sources dans l'ordre)
+BUNDLES = {
+    'site.css': ('css/styles.css', 'css/base.css'),
+    'site.js': ('js/main.js', 'js/base.js'),
+    'dashboard.css': ('css/dashboard.css',),
+    'dashboard.js': ('js/dashboard.js',),
+}
+
+# Fichiers dont les classes et identifiants utilisés sont relevés, et classes
+# composées à l'exécution (`status-{{ order.status }}`, messages, événements
+# du calendrier) ou produites par les formulaires Django, toujours conservées
+CONTENT_GLOBS = ('templates/**/*.html', 'assets/js/**/*.js', '*.py', 'templatetags/*.py')
+SAFELIST = re.compile(r'^(alert|bg|status)-|^(errorlist|helptext|nonfield)$')
+
+
+def bundles():
+    # Fichiers communs, puis un fichier par source de ecomm/assets/*/pages
+    found = dict(BUNDLES)
+    for path in sorted(SOURCE_DIR.glob('*/pages/*')):
+        found[f'pages/{path.name}'] = (path.relative_to(SOURCE_DIR).as_posix(),)
+    return found
+
+
+def content_words():
+    words = set()
+    for pattern in CONTENT_GLOBS:
+        for path in APP_DIR.glob(pattern):
+            if BUILD_DIR not in path.parents:
+                words.update(re.findall(r'[A-Za-z0-9_-]+', path.read_text()))
+    return words
+
+
+# Élimination des règles inutilisées. Une règle est gardée si l'un de ses
+# sélecteurs n'emploie que des classes et identifiants présents dans le
+# contenu ; les @media et @supports sont filtrés de même, les autres
+# @-règles (@font-face, @keyframes...) gardées telles quelles.
+
+NESTED_AT_RULES = ('@media', '@supports', '@layer', '@container')
+
+
+def _split_selectors(prelude):
+    selectors, depth, start = [], 0, 0
+    for i, char in enumerate(prelude):
+        if char in '([':
+            depth += 1
+        elif char in ')]':
+            depth -= 1
+        elif char == ',' and depth == 0:
+            selectors.append(prelude[start:i].strip())
+            start = i + 1
+    selectors.append(prelude[start:].strip())
+    return selectors
+
+
+def _selector_used(selector, words):
+    # Attributs et :not(...) ne restreignent pas les éléments à conserver
+    selector = re.sub(r'\[[^\]]*\]|:not\([^)]*\)', '', selector)
+    names = re.findall(r'[.#](-?[_a-zA-Z][_a-zA-Z0-9-]*)', selector)
+    return all(name in words or SAFELIST.search(name) for name in names)
+
+
+def _blocks(css):
+    # (prélude, corps) de chaque bloc de premier niveau ; corps None pour une instruction (@import ...;)
+    depth, start, prelude = 0, 0, None
+    i = 0
+    while i < len(css):
+        char = css[i]
+        if char in '"\'':
+            i = css.index(char, i + 1)
+        elif char == '{':
+            if depth == 0:
+                prelude, start = css[start:i].strip(), i + 1
+            depth += 1
+        elif char == '}':
+            depth -= 1
+            if depth == 0:
+                yield prelude, css[start:i]
+                start = i + 1
+        elif char == ';' and depth == 0:
+            yield css[start:i].strip(), None
+            start = i + 1
+        i += 1
+
+
+def purge(css, words):
+    css = re.sub(r'/\*.*?\*/', '', css, flags=re.S)
+    kept = []
+    for prelude, body in _blocks(css):
+        if body is None:
+            kept.append(f'{prelude};')
+        elif prelude.startswith(NESTED_AT_RULES):
+            inner = purge(body, words)
+            if inner:
+                kept.append(f'{prelude}{{{inner}}}')
+        elif prelude.startswith('@'):
+            kept.append(f'{prelude}{{{body}}}')
+        else:
+            selectors = [s for s in _split_selectors(prelude) if _selector_used(s, words)]
+            if selectors:
+                kept.append(f"{','.join(selectors)}{{{body}}}")
+    return '\n'.join(kept)
+
+
+def build(name, sources, words):
+    # Contenu minifié du fichier construit `name`
+    from rcssmin import cssmin
+    from rjsmin import jsmin
+
+    texts = [(SOURCE_DIR / source).read_text() for source in sources]
+    if name.endswith('.css'):
+        return cssmin(purge('\n'.join(texts), words)) + '\n'
+    # Un script qui ne se termine pas par un point-virgule ne doit pas se fondre dans le suivant
+    return jsmin('\n;\n'.join(texts)) + '\n'
+
+
+def build_all(write=True):
+    # Construit tous les fichiers ; renvoie {nom: (octets des sources, contenu, à jour sur le disque)}
+    words = content_words()
+    results = {}
+    for name, sources in bundles().items():
+        content = build(name, sources, words)
+        target = BUILD_DIR / name
+        current = target.exists() and target.read_text() == content
+        if write and not current:
+            target.parent.mkdir(parents=True, exist_ok=True)
+            target.write_text(content)
+        source_bytes = sum((SOURCE_DIR / source).stat().st_size for source in sources)
+        results[name] = (source_bytes, content, current)
+    if write:
+        expected = {BUILD_DIR / name for name in results}
+        for path in BUILD_DIR.rglob('*.*'):
+            if path not in expected:
+                path.unlink()  # Page supprimée ou renommée
+    return results
+
+
+def transfer_sizes(data):
+    # (octets bruts, gzip, brotli) : ce qu'envoie WhiteNoise selon l'Accept-Encoding du navigateur
+    import brotli
+
+    return len(data), len(gzip.compress(data, 9)), len(brotli.compress(data))
@@ -0,0 +1,154 @@
+import hashlib
+import json
+import time
+from datetime import date, timedelta
+
+from django.conf import settings
+from django.core.cache import caches
+from django.db import transaction
+
+from . import routers
+from .models import Reservation
+
+# Flux d'événements du calendrier des réservations (FullCalendar).
+# Les événements sont mis en cache par semaine (du lundi au dimanche), déjà
+# encodés en JSON et rangés par jour : une réponse n'est qu'une concaténation
+# de fragments. Chaque semaine a son numéro de version, incrémenté après la
+# validation de toute création ou modification d'une réservation de la
+# semaine ; l'ETag d'une plage est dérivé des versions des semaines couvertes.
+
+WEEK = timedelta(days=7)
+MAX_RANGE_DAYS = 400  # Vue annuelle de FullCalendar, avec ses jours de bordure
+BATCH_WEEKS = 8  # Semaines lues (cache ou base) à la fois lors d'une diffusion en flux
+STREAM_MIN_WEEKS = 8  # Au-delà, la réponse est diffusée en flux plutôt que construite en mémoire
+
+
+def _cache():
+    return caches[settings.CATALOG_CACHE_ALIAS]
+
+
+def week_of(day):
+    return day - timedelta(days=day.weekday())
+
+
+def weeks_between(start, end):
+    # Lundis des semaines qui recoupent [start, end[
+    week = week_of(start)
+    weeks = []
+    while week < end:
+        weeks.append(week)
+        week += WEEK
+    return weeks
+
+
+def parse_range(start, end):
+    # FullCalendar envoie des dates ISO, éventuellement avec heure et fuseau ;
+    # seule la date compte. `end` est exclu. ValueError si la plage est invalide.
+    start = date.fromisoformat((start or '')[:10])
+    end = date.fromisoformat((end or '')[:10])
+    if not start < end or (end - start).days > MAX_RANGE_DAYS:
+        raise ValueError(f"Plage invalide : {start} - {end}")
+    return start, end
+
+
+def _version_key(week):
+    return f'calendar:{week.isoformat()}:version'
+
+
+def _bucket_key(week, version):
+    return f'calendar:{week.isoformat()}:{version}'
+
+
+def invalidate(day):
+    # Après validation : une lecture concurrente ne peut pas remettre en cache
+    # l'ancien contenu sous la nouvelle version
+    if isinstance(day, str):
+        day = date.fromisoformat(day)
+    key = _version_key(week_of(day))
+
+    def bump():
+        try:
+            _cache().incr(key)
+        except ValueError:
+            pass  # Pas de version : la prochaine lecture en crée une nouvelle
+
+    transaction.on_commit(bump)
+
+
+async def aweek_versions(weeks):
+    cache = _cache()
+    keys = {week: _version_key(week) for week in weeks}
+    found = await cache.aget_many(keys.values())
+    versions = {}
+    for week, key in keys.items():
+        version = found.get(key)
+        if version is None:
+            # Valeur initiale horodatée, comme pour la version du catalogue
+            await cache.aadd(key, time.time_ns(), settings.CALENDAR_VERSION_TIMEOUT)
+            version = await cache.aget(key)
+        versions[week] = version
+    return versions
+
+
+def etag(start, end, versions):
+    signature = f"{start}:{end}:" + ','.join(str(version) for version in versions.values())
+    return f'"{hashlib.md5(signature.encode()).hexdigest()}"'
+
+
+def encode_event(pk, day, start, guests, status, username):
+    return json.dumps({
+        'id': pk,
+        'title': f"{username} - {guests} pers.",
+        'start': f"{day.isoformat()}T{start.isoformat()}",
+        'className': f"bg-{status}",
+    }, separators=(',', ':')).encode()
+
+
+async def _abuild(weeks):
+    # Événements des semaines `weeks` en une requête, sans instancier de modèle :
+    # {lundi: {jour ISO: événements du jour encodés et séparés par des virgules}}
+    events = {week: {} for week in weeks}
+    rows = Reservation.objects.filter(
+        date__gte=min(weeks), date__lt=max(weeks) + WEEK
+    ).order_by('date', 'time', 'id').values_list(
+        'id', 'date', 'time', 'number_of_guests', 'status', 'user__username'
+    )
+    async for row in rows:
+        days = events.get(week_of(row[1]))
+        if days is not None:
+            days.setdefault(row[1].isoformat(), []).append(encode_event(*row))
+    return {week: {day: b','.join(items) for day, items in days.items()} for week, days in events.items()}
+
+
+async def _abuckets(weeks, versions):
+    cache = _cache()
+    keys = {week: _bucket_key(week, versions[week]) for week in weeks}
+    found = await cache.aget_many(keys.values())
+    buckets = {week: found[key] for week, key in keys.items() if key in found}
+    missing = [week for week in weeks if week not in buckets]
+    if missing:
+        # Base principale, comme pour le catalogue : le cache survit au retard de la réplique
+        with routers.primary():
+            built = await _abuild(missing)
+        await cache.aset_many({keys[week]: built[week] for week in missing}, settings.CALENDAR_CACHE_TIMEOUT)
+        buckets.update(built)
+    return buckets
+
+
+async def afeed(start, end, versions):
+    # Tableau JSON des événements de [start, end[, produit par morceaux
+    low, high = start.isoformat(), end.isoformat()
+    weeks = list(versions)
+    separator = b'['
+    for i in range(0, len(weeks), BATCH_WEEKS):
+        batch = weeks[i:i + BATCH_WEEKS]
+        buckets = await _abuckets(batch, versions)
+        chunk = []
+        for week in batch:
+            for day, fragment in sorted(buckets[week].items()):
+                if low <= day < high:
+                    chunk += [separator, fragment]
+                    separator = b','
+        if chunk:
+            yield b''.join(chunk)
+    yield b']' if separator == b',' else b'[]'
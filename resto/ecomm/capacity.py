@@ -0,0 +1,130 @@
+from datetime import date, datetime, timedelta
+
+from django.conf import settings
+from django.db import transaction
+from django.db.models import F, Sum
+from django.db.models.functions import Greatest
+
+from .models import DiningTable, Reservation, SlotOccupancy
+
+# Capacité de la salle : tables (DiningTable) et créneaux de réservation.
+# SlotOccupancy tient, pour chaque (date, créneau), le nombre de couverts
+# réservés ; il est ajusté dans la transaction qui crée, annule ou rétablit une
+# réservation. La disponibilité d'une journée se lit en une requête sur au plus
+# len(slots()) lignes, quel que soit le nombre de réservations en base.
+# La capacité se compte en couverts (tables combinables) ; sans aucune table
+# déclarée, elle est illimitée mais l'occupation reste tenue à jour.
+
+ACTIVE_STATUSES = ('pending', 'confirmed')  # Statuts qui occupent des places
+
+
+class SlotUnavailable(Exception):
+    pass
+
+
+def slots():
+    return [datetime.strptime(value, '%H:%M').time() for value in settings.RESERVATION_SLOTS]
+
+
+def covered_slots(start):
+    # Créneaux occupés par un repas commençant à `start` : ceux qui débutent pendant sa durée
+    begin = datetime.combine(date.min, start)
+    end = begin + timedelta(minutes=settings.RESERVATION_DURATION)
+    return [slot for slot in slots() if begin <= datetime.combine(date.min, slot) < end]
+
+
+def capacity():
+    # Couverts disponibles par créneau ; None si aucune table n'est déclarée
+    return DiningTable.objects.filter(is_active=True).aggregate(seats=Sum('seats'))['seats']
+
+
+def availability(day, guests):
+    # Créneaux du jour `day` et places restantes pour un groupe de `guests` personnes
+    seats = capacity()
+    booked = dict(SlotOccupancy.objects.filter(date=day).values_list('time', 'seats'))
+    result = []
+    for slot in slots():
+        if seats is None:
+            remaining = None
+        else:
+            remaining = min(seats - booked.get(covered, 0) for covered in covered_slots(slot))
+        result.append({
+            'time': slot,
+            'remaining': remaining,
+            'available': remaining is None or remaining >= guests,
+        })
+    return result
+
+
+def reserve(day, start, guests, existing=False):
+    # Prend `guests` places sur tous les créneaux couverts, ou aucune (SlotUnavailable).
+    # existing : réservation déjà en base, dont l'heure peut précéder les
+    # créneaux actuels ; elle reprend les places des créneaux qu'elle couvre.
+    if not existing and start not in slots():
+        raise SlotUnavailable("Ce créneau n'est pas proposé.")
+    covered = covered_slots(start)
+    with transaction.atomic():
+        seats = capacity()
+        if seats is not None and guests > seats:
+            raise SlotUnavailable("Ce groupe dépasse la capacité de la salle.")
+        SlotOccupancy.objects.bulk_create(
+            [SlotOccupancy(date=day, time=slot) for slot in covered], ignore_conflicts=True
+        )
+        # Verrou des lignes dans un ordre fixe : deux réservations concurrentes
+        # sur des créneaux qui se chevauchent ne peuvent pas s'interbloquer
+        rows = SlotOccupancy.objects.filter(date=day, time__in=covered)
+        list(rows.select_for_update().order_by('time').values_list('id', flat=True))
+        if seats is not None:
+            rows = rows.filter(seats__lte=seats - guests)
+        # Mise à jour conditionnelle : si un créneau est plein, tout est annulé
+        if rows.update(seats=F('seats') + guests) < len(covered):
+            raise SlotUnavailable("Plus assez de places sur ce créneau.")
+
+
+def release(day, start, guests):
+    # Jamais en dessous de zéro : une réservation peut ne jamais avoir été comptée
+    SlotOccupancy.objects.filter(date=day, time__in=covered_slots(start)).update(
+        seats=Greatest(F('seats') - guests, 0)
+    )
+
+
+def status_changed(reservation, old_status):
+    # À appeler avant d'enregistrer le nouveau statut, dans la même transaction
+    was_active = old_status in ACTIVE_STATUSES
+    is_active = reservation.status in ACTIVE_STATUSES
+    if was_active and not is_active:
+        release(reservation.date, reservation.time, reservation.number_of_guests)
+    elif is_active and not was_active:
+        reserve(reservation.date, reservation.time, reservation.number_of_guests, existing=True)
+
+
+def compute():
+    # Occupation attendue, recalculée à partir des réservations
+    occupancy = {}
+    reservations = Reservation.objects.filter(status__in=ACTIVE_STATUSES).order_by()
+    for row in reservations.values('date', 'time').annotate(guests=Sum('number_of_guests')):
+        for slot in covered_slots(row['time']):
+            key = (row['date'], slot)
+            occupancy[key] = occupancy.get(key, 0) + row['guests']
+    return occupancy
+
+
+def rebuild():
+    occupancy = compute()
+    with transaction.atomic():
+        SlotOccupancy.objects.all().delete()
+        SlotOccupancy.objects.bulk_create(
+            SlotOccupancy(date=day, time=slot, seats=seats) for (day, slot), seats in occupancy.items()
+        )
+    return len(occupancy)
+
+
+def check():
+    # Liste des écarts ((date, créneau), stocké, attendu) ; vide si tout est cohérent
+    expected = compute()
+    stored = {(row.date, row.time): row.seats for row in SlotOccupancy.objects.all()}
+    return [
+        (key, stored.get(key, 0), expected.get(key, 0))
+        for key in sorted(set(stored) | set(expected))
+        if stored.get(key, 0) != expected.get(key, 0)
+    ]
@@ -0,0 +1,246 @@
+import hashlib
+import json
+import time
+
+from django.conf import settings
+from django.core.cache import caches
+from django.db import IntegrityError, transaction
+
+from . import routers
+from .models import DELIVERY_FEE, Cart, CartItem, MenuItem
+
+# Modifications du panier sans lecture-modification-écriture : chaque
+# opération est une mise à jour conditionnelle (quantity = quantity ± n) qui
+# renvoie directement la nouvelle quantité et les nouveaux totaux du panier.
+# Deux requêtes simultanées ne peuvent donc plus écraser l'incrément de l'autre.
+
+
+def add_item(user, menu_item, quantity=1):
+    # Renvoie (quantité de la ligne, totaux du panier)
+    with transaction.atomic():
+        lines = CartItem.objects.filter(cart__user=user, menu_item=menu_item).add_quantity(quantity)
+        if lines:
+            line_quantity = lines[0]['quantity']
+        else:
+            cart, _ = Cart.objects.get_or_create(user=user)
+            try:
+                with transaction.atomic():
+                    CartItem.objects.create(cart=cart, menu_item=menu_item, quantity=quantity)
+                line_quantity = quantity
+            except IntegrityError:
+                # Ligne créée entre-temps par une requête concurrente
+                lines = CartItem.objects.filter(cart=cart, menu_item=menu_item).add_quantity(quantity)
+                line_quantity = lines[0]['quantity']
+        totals = Cart.objects.filter(user=user).adjust_totals(menu_item.id, quantity)
+        bump_version(user.id)
+    return line_quantity, totals
+
+
+def update_item(user, cart_item_id, action):
+    # action : 'increase', 'decrease' ou 'remove'. Renvoie un dict avec la
+    # nouvelle quantité (0 si la ligne est supprimée), le total de la ligne et
+    # les totaux du panier. Lève CartItem.DoesNotExist si la ligne n'appartient
+    # pas au panier de l'utilisateur.
+    lines = CartItem.objects.filter(id=cart_item_id, cart__user=user)
+    with transaction.atomic():
+        if action == 'increase':
+            changed = lines.add_quantity(1)
+            delta = 1
+        elif action == 'decrease':
+            changed = lines.filter(quantity__gt=1).add_quantity(-1)
+            delta = -1
+        else:
+            changed = []
+        removed = False
+        if not changed and action in ('decrease', 'remove'):
+            changed = lines.delete_returning()
+            removed = True
+            delta = -changed[0]['quantity'] if changed else 0
+        if not changed:
+            raise CartItem.DoesNotExist
+
+        line = changed[0]
+        totals = Cart.objects.filter(user=user).adjust_totals(line['menu_item_id'], delta)
+        bump_version(user.id)
+
+    quantity = 0 if removed else line['quantity']
+    line_total = 0
+    if quantity:
+        line_total = MenuItem.objects.values_list('price', flat=True).get(pk=line['menu_item_id']) * quantity
+    return {
+        'quantity': quantity,
+        'line_total': line_total,
+        'cart_total': totals['total_amount'],
+        'cart_count': totals['total_items'],
+    }
+
+
+# Version du panier de chaque utilisateur, en cache, incrémentée après la
+# validation de toute modification du panier. Le compteur du header et le
+# fragment des lignes de panier.html sont rangés sous cette version : le
+# header ne lit la base qu'une fois par modification du panier, et aucune
+# invalidation n'a besoin de connaître les clés.
+
+CART_CACHE_TIMEOUT = 60 * 60  # Compteurs des paniers inactifs
+
+
+def _cache():
+    return caches[settings.CART_CACHE_ALIAS]
+
+
+def _version_key(user_id):
+    return f'cart:{user_id}:version'
+
+
+def get_version(user_id):
+    cache = _cache()
+    key = _version_key(user_id)
+    version = cache.get(key)
+    if version is None:
+        # Valeur initiale horodatée, comme pour le catalogue : une version
+        # évincée du cache ne peut pas resservir d'anciennes entrées
+        cache.add(key, time.time_ns(), None)
+        version = cache.get(key)
+    return version
+
+
+def bump_version(*user_ids):
+    # Après validation : une lecture concurrente ne peut pas remettre en cache
+    # l'ancien compteur sous la nouvelle version
+    def bump():
+        cache = _cache()
+        for user_id in user_ids:
+            try:
+                cache.incr(_version_key(user_id))
+            except ValueError:
+                pass  # Pas de version : la prochaine lecture en crée une nouvelle
+
+    transaction.on_commit(bump)
+
+
+def item_count(user):
+    # Nombre d'articles du panier d'un utilisateur connecté, sans requête tant que le panier ne change pas
+    cache = _cache()
+    key = f'cart:{user.id}:{get_version(user.id)}:count'
+    count = cache.get(key)
+    if count is None:
+        with routers.primary():
+            count = Cart.objects.filter(user=user).values_list('total_items', flat=True).first() or 0
+        cache.set(key, count, CART_CACHE_TIMEOUT)
+    return count
+
+
+def fragment_version(request):
+    # Identifie le contenu du panier de la requête, pour les clés des fragments en cache
+    if request.user.is_authenticated:
+        return f'{request.user.id}:{get_version(request.user.id)}'
+    lines = json.dumps(sorted(read_session_cart(request).items()))
+    return f'session:{hashlib.md5(lines.encode()).hexdigest()}'
+
+
+# Panier des visiteurs non connectés : {id du plat: quantité} dans un cookie
+# signé. Aucune écriture en base tant que le visiteur ne se connecte pas ; à
+# la connexion, merge_session_cart() le verse dans son panier en une requête.
+
+SESSION_CART_COOKIE = 'cart'
+SESSION_CART_SALT = 'ecomm.cart'
+SESSION_CART_MAX_AGE = 60 * 60 * 24 * 30  # 30 jours
+SESSION_CART_MAX_LINES = 50
+MAX_LINE_QUANTITY = 99
+
+
+class SessionCartFull(Exception):
+    pass
+
+
+def read_session_cart(request):
+    if not hasattr(request, '_session_cart'):
+        lines = {}
+        raw = request.get_signed_cookie(
+            SESSION_CART_COOKIE, default=None, salt=SESSION_CART_SALT, max_age=SESSION_CART_MAX_AGE
+        )
+        try:
+            lines = {int(k): min(int(v), MAX_LINE_QUANTITY) for k, v in json.loads(raw or '{}').items()}
+        except (ValueError, TypeError, AttributeError):
+            pass
+        request._session_cart = {k: v for k, v in lines.items() if v > 0}
+    return request._session_cart
+
+
+def write_session_cart(request, response, lines):
+    request._session_cart = lines
+    if lines:
+        response.set_signed_cookie(
+            SESSION_CART_COOKIE,
+            json.dumps({str(k): v for k, v in lines.items()}, separators=(',', ':')),
+            salt=SESSION_CART_SALT, max_age=SESSION_CART_MAX_AGE, httponly=True, samesite='Lax',
+        )
+    else:
+        response.delete_cookie(SESSION_CART_COOKIE, samesite='Lax')
+
+
+def add_session_item(request, menu_item, quantity=1):
+    # Renvoie le nouveau contenu du panier (à écrire avec write_session_cart)
+    lines = dict(read_session_cart(request))
+    if menu_item.id not in lines and len(lines) >= SESSION_CART_MAX_LINES:
+        raise SessionCartFull
+    lines[menu_item.id] = min(lines.get(menu_item.id, 0) + quantity, MAX_LINE_QUANTITY)
+    return lines
+
+
+def update_session_item(request, menu_item_id, action):
+    lines = dict(read_session_cart(request))
+    if menu_item_id not in lines:
+        raise CartItem.DoesNotExist
+    if action == 'increase':
+        lines[menu_item_id] = min(lines[menu_item_id] + 1, MAX_LINE_QUANTITY)
+    elif action == 'decrease' and lines[menu_item_id] > 1:
+        lines[menu_item_id] -= 1
+    else:
+        del lines[menu_item_id]
+    return lines
+
+
+class SessionCart:
+    # Même interface que Cart pour les gabarits ; les lignes sont des CartItem
+    # non enregistrés dont l'id est celui du plat
+    def __init__(self, lines):
+        menu_items = MenuItem.objects.in_bulk(list(lines)) if lines else {}
+        self.items = [
+            CartItem(id=item_id, menu_item=menu_items[item_id], quantity=quantity)
+            for item_id, quantity in lines.items() if item_id in menu_items
+        ]
+
+    def get_total(self):
+        return sum((item.get_total() for item in self.items), 0)
+
+    def get_subtotal(self):
+        return self.get_total()
+
+    def get_total_items(self):
+        return sum(item.quantity for item in self.items)
+
+    def get_delivery_fee(self):
+        return DELIVERY_FEE
+
+
+def merge_session_cart(user, lines):
+    # Verse le panier du cookie dans le panier de l'utilisateur, en additionnant
+    # les quantités (plafonnées comme dans le cookie). Le panier est verrouillé :
+    # les lignes existantes sont mises à jour, seules les nouvelles sont créées
+    # (pas d'upsert, que MySQL ne permet pas sur une contrainte désignée).
+    if not lines:
+        return
+    with transaction.atomic():
+        cart, _ = Cart.objects.select_for_update().get_or_create(user=user)
+        valid = set(MenuItem.objects.filter(id__in=list(lines)).values_list('id', flat=True))
+        existing = {line.menu_item_id: line for line in cart.cartitem_set.filter(menu_item_id__in=valid)}
+        for item_id, line in existing.items():
+            line.quantity = min(line.quantity + lines[item_id], MAX_LINE_QUANTITY)
+        CartItem.objects.bulk_update(existing.values(), ['quantity'])
+        CartItem.objects.bulk_create([
+            CartItem(cart=cart, menu_item_id=item_id, quantity=min(quantity, MAX_LINE_QUANTITY))
+            for item_id, quantity in lines.items() if item_id in valid and item_id not in existing
+        ])
+        cart.refresh_totals()
+        bump_version(user.id)
@@ -0,0 +1,147 @@
+import threading
+import time
+
+from django.conf import settings
+from django.core.cache import caches
+
+from . import routers
+from .models import Category, MenuItem
+
+# Cache de lecture du catalogue (catégories, plats, plats mis en avant).
+# Toutes les clés incluent un numéro de version : le modifier suffit à
+# invalider d'un coup tout le catalogue, sans avoir à connaître les clés.
+# Le cache est rempli depuis la base principale : une réplique en retard y
+# rangerait l'ancien catalogue sous la nouvelle version.
+VERSION_KEY = 'catalog:version'
+MENU_SORTS = ('name', '-name', 'price', '-price')
+FEATURED_COUNT = 6
+
+_stats = {'hits': 0, 'misses': 0}
+_stats_lock = threading.Lock()
+
+
+def _cache():
+    return caches[settings.CATALOG_CACHE_ALIAS]
+
+
+def _record(outcome):
+    with _stats_lock:
+        _stats[outcome] += 1
+
+
+def get_stats():
+    with _stats_lock:
+        return dict(_stats)
+
+
+def reset_stats():
+    with _stats_lock:
+        _stats.update(hits=0, misses=0)
+
+
+def get_version():
+    cache = _cache()
+    version = cache.get(VERSION_KEY)
+    if version is None:
+        # Valeur initiale horodatée : une version évincée du cache ne peut
+        # pas être réutilisée et servir d'anciennes entrées
+        cache.add(VERSION_KEY, time.time_ns(), settings.CATALOG_VERSION_TIMEOUT)
+        version = cache.get(VERSION_KEY)
+    return version
+
+
+def bump_version():
+    cache = _cache()
+    try:
+        return cache.incr(VERSION_KEY)
+    except ValueError:
+        return get_version()
+
+
+def _cached(name, build):
+    cache = _cache()
+    key = f'catalog:{get_version()}:{name}'
+    value = cache.get(key)
+    if value is None:
+        _record('misses')
+        with routers.primary():
+            value = build()
+        cache.set(key, value, settings.CATALOG_CACHE_TIMEOUT)
+    else:
+        _record('hits')
+    return value
+
+
+async def aget_version():
+    cache = _cache()
+    version = await cache.aget(VERSION_KEY)
+    if version is None:
+        await cache.aadd(VERSION_KEY, time.time_ns(), settings.CATALOG_VERSION_TIMEOUT)
+        version = await cache.aget(VERSION_KEY)
+    return version
+
+
+async def _acached(name, queryset):
+    # Variante asynchrone de _cached() : le queryset n'est évalué qu'en cas d'absence du cache
+    cache = _cache()
+    key = f'catalog:{await aget_version()}:{name}'
+    value = await cache.aget(key)
+    if value is None:
+        _record('misses')
+        with routers.primary():
+            value = [obj async for obj in queryset]
+        await cache.aset(key, value, settings.CATALOG_CACHE_TIMEOUT)
+    else:
+        _record('hits')
+    return value
+
+
+def get_categories():
+    return _cached('categories', lambda: list(Category.objects.all()))
+
+
+def get_featured_items():
+    return _cached('featured', lambda: list(
+        MenuItem.objects.filter(is_available=True).select_related('category')[:FEATURED_COUNT]
+    ))
+
+
+def available_items(category_id=None, sort=None):
+    # Plats disponibles, éventuellement filtrés par catégorie et triés
+    items = MenuItem.objects.filter(is_available=True).select_related('category')
+    if category_id:
+        items = items.filter(category_id=category_id)
+    if sort in MENU_SORTS:
+        items = items.order_by(sort)
+    return items
+
+
+def get_menu_items(category_id=None, sort=None):
+    if category_id is not None and not str(category_id).isdigit():
+        return []
+    if sort not in MENU_SORTS:
+        sort = None
+    return _cached(
+        f'items:{category_id or "all"}:{sort or "default"}',
+        lambda: list(available_items(category_id, sort)),
+    )
+
+
+# Variantes asynchrones, pour les vues async
+
+async def aget_categories():
+    return await _acached('categories', Category.objects.all())
+
+
+async def aget_featured_items():
+    return await _acached(
+        'featured', MenuItem.objects.filter(is_available=True).select_related('category')[:FEATURED_COUNT]
+    )
+
+
+async def aget_menu_items(category_id=None, sort=None):
+    if category_id is not None and not str(category_id).isdigit():
+        return []
+    if sort not in MENU_SORTS:
+        sort = None
+    return await _acached(f'items:{category_id or "all"}:{sort or "default"}', available_items(category_id, sort))
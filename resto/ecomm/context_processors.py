@@ -0,0 +1,12 @@
+from . import cart as cart_ops
+
+
+def cart(request):
+    # Nombre d'articles du panier pour le compteur du header, évalué seulement
+    # s'il est affiché : cookie du panier, ou compteur en cache tenu par version
+    def cart_count():
+        if request.user.is_authenticated:
+            return cart_ops.item_count(request.user)
+        return sum(cart_ops.read_session_cart(request).values())
+
+    return {'cart_count': cart_count}
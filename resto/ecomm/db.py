@@ -0,0 +1,100 @@
+from django.db import connections, router
+from django.db.models import sql
+
+
+# UPDATE / DELETE ... RETURNING : modifie des lignes et renvoie leurs nouvelles
+# valeurs dans le même aller-retour. SQLite (3.35+) et PostgreSQL le supportent ;
+# ailleurs (MySQL), les lignes sont verrouillées puis relues : à appeler dans
+# une transaction.
+
+def supports_returning(using):
+    connection = connections[using]
+    return connection.vendor in ('sqlite', 'postgresql') and connection.features.can_return_columns_from_insert
+
+
+def _returning_sql(queryset, fields):
+    connection = connections[queryset.db]
+    columns = ', '.join(
+        connection.ops.quote_name(queryset.model._meta.get_field(name).column) for name in fields
+    )
+    return f' RETURNING {columns}'
+
+
+def _convert(model, fields, rows):
+    converted = []
+    for row in rows:
+        converted.append({
+            name: model._meta.get_field(name).to_python(value) for name, value in zip(fields, row)
+        })
+    return converted
+
+
+def _write_db(queryset):
+    # queryset.db désigne la base de lecture, qui peut être une réplique
+    return queryset._db or router.db_for_write(queryset.model)
+
+
+def update_returning(queryset, fields, **values):
+    # Comme queryset.update(**values), mais renvoie les valeurs `fields` des lignes modifiées
+    using = _write_db(queryset)
+    if not supports_returning(using):
+        # Verrouille les lignes pour que la condition du queryset tienne jusqu'à la relecture
+        manager = queryset.model._base_manager.using(using)
+        pks = list(queryset.select_for_update().values_list('pk', flat=True))
+        if not pks:
+            return []
+        manager.filter(pk__in=pks).update(**values)
+        return list(manager.filter(pk__in=pks).values(*fields))
+
+    query = queryset.query.chain(sql.UpdateQuery)
+    query.add_update_values(values)
+    query.annotations = {}
+    statement, params = query.get_compiler(using).as_sql()
+    if not statement:
+        return []
+    with connections[using].cursor() as cursor:
+        cursor.execute(statement + _returning_sql(queryset, fields), params)
+        return _convert(queryset.model, fields, cursor.fetchall())
+
+
+def delete_returning(queryset, fields):
+    # Supprime les lignes du queryset (sans signaux ni cascade) et renvoie leurs valeurs `fields`
+    using = _write_db(queryset)
+    if not supports_returning(using):
+        manager = queryset.model._base_manager.using(using)
+        rows = list(queryset.select_for_update().values('pk', *fields))
+        manager.filter(pk__in=[row['pk'] for row in rows])._raw_delete(using)
+        return [{name: row[name] for name in fields} for row in rows]
+
+    query = queryset.query.chain(sql.DeleteQuery)
+    statement, params = query.get_compiler(using).as_sql()
+    with connections[using].cursor() as cursor:
+        cursor.execute(statement + _returning_sql(queryset, fields), params)
+        return _convert(queryset.model, fields, cursor.fetchall())
+
+
+# INSERT ... ON CONFLICT DO UPDATE : cumuls incrémentés en une requête, quel
+# que soit le nombre de lignes (ON DUPLICATE KEY UPDATE sous MySQL).
+
+def increment_rows(model, rows, key_fields, increment_fields):
+    # Ajoute les valeurs `increment_fields` de chaque ligne (dict par nom de champ)
+    # à la ligne de même clé `key_fields` (contrainte d'unicité), ou la crée
+    if not rows:
+        return
+    connection = connections[router.db_for_write(model)]
+    quote = connection.ops.quote_name
+    table = quote(model._meta.db_table)
+    fields = [model._meta.get_field(name) for name in rows[0]]
+    increments = [quote(model._meta.get_field(name).column) for name in increment_fields]
+    values = ', '.join(['(' + ', '.join(['%s'] * len(fields)) + ')'] * len(rows))
+    params = [field.get_db_prep_save(row[field.name], connection) for row in rows for field in fields]
+    if connection.vendor == 'mysql':
+        conflict = 'ON DUPLICATE KEY UPDATE ' + ', '.join(f'{c} = {c} + VALUES({c})' for c in increments)
+    else:
+        keys = ', '.join(quote(model._meta.get_field(name).column) for name in key_fields)
+        conflict = f'ON CONFLICT ({keys}) DO UPDATE SET ' + ', '.join(
+            f'{c} = {table}.{c} + excluded.{c}' for c in increments
+        )
+    columns = ', '.join(quote(field.column) for field in fields)
+    with connection.cursor() as cursor:
+        cursor.execute(f'INSERT INTO {table} ({columns}) VALUES {values} {conflict}', params)
@@ -0,0 +1,160 @@
+import asyncio
+import json
+import threading
+from collections import defaultdict
+from functools import lru_cache
+
+from django.conf import settings
+from django.db import transaction
+from django.utils.module_loading import import_string
+
+# Diffusion en temps réel des changements de statut (commandes, réservations)
+# vers les tableaux de bord et le client concerné, par server-sent events.
+# Canaux : 'staff' (tout le personnel) et 'user:<id>' (un client).
+
+QUEUE_SIZE = 100
+
+
+def encode(event, data):
+    # Message SSE, encodé une seule fois quel que soit le nombre d'abonnés
+    return f"event: {event}\ndata: {json.dumps(data, separators=(',', ':'))}\n\n".encode()
+
+
+class Subscription:
+    def __init__(self, channels):
+        self.channels = channels
+        self.loop = asyncio.get_running_loop()
+        self.queue = asyncio.Queue(QUEUE_SIZE)
+        self.dropped = 0
+
+    def deliver(self, message):
+        # Appelé dans la boucle de l'abonné ; un client trop lent perd les plus anciens messages
+        if self.queue.full():
+            self.queue.get_nowait()
+            self.dropped += 1
+        self.queue.put_nowait(message)
+
+    async def get(self, timeout=None):
+        return await asyncio.wait_for(self.queue.get(), timeout)
+
+    async def __aenter__(self):
+        get_broker().add(self)
+        return self
+
+    async def __aexit__(self, *exc_info):
+        get_broker().remove(self)
+
+
+class InMemoryBroker:
+    """
+    Broker propre au processus : suffit avec un seul processus serveur ASGI.
+    Avec plusieurs processus, utiliser un broker partagé (RedisBroker).
+    """
+
+    def __init__(self):
+        self._subscribers = defaultdict(set)
+        self._lock = threading.Lock()
+
+    def subscriber_count(self):
+        with self._lock:
+            return len(set().union(*self._subscribers.values()))
+
+    def add(self, subscription):
+        with self._lock:
+            for channel in subscription.channels:
+                self._subscribers[channel].add(subscription)
+
+    def remove(self, subscription):
+        with self._lock:
+            for channel in subscription.channels:
+                self._subscribers[channel].discard(subscription)
+                if not self._subscribers[channel]:
+                    del self._subscribers[channel]
+
+    def publish(self, channel, message):
+        self.dispatch(channel, message)
+
+    def dispatch(self, channel, message):
+        # Peut être appelé depuis n'importe quel thread (vues synchrones comprises)
+        with self._lock:
+            subscriptions = list(self._subscribers.get(channel, ()))
+        for subscription in subscriptions:
+            try:
+                subscription.loop.call_soon_threadsafe(subscription.deliver, message)
+            except RuntimeError:
+                self.remove(subscription)  # Boucle fermée
+
+
+class RedisBroker(InMemoryBroker):
+    """
+    Broker partagé entre processus : les messages transitent par Redis
+    (EVENTS_REDIS_URL) et chaque processus les redistribue à ses abonnés.
+    Nécessite le paquet `redis`.
+    """
+    PREFIX = 'resto:events:'
+
+    def __init__(self):
+        super().__init__()
+        import redis
+
+        self._redis = redis.Redis.from_url(settings.EVENTS_REDIS_URL)
+        self._listener = None
+
+    def add(self, subscription):
+        super().add(subscription)
+        with self._lock:
+            if self._listener is None:
+                self._listener = threading.Thread(target=self._listen, name='events-redis', daemon=True)
+                self._listener.start()
+
+    def publish(self, channel, message):
+        self._redis.publish(self.PREFIX + channel, message)
+
+    def _listen(self):
+        pubsub = self._redis.pubsub(ignore_subscribe_messages=True)
+        pubsub.psubscribe(self.PREFIX + '*')
+        for item in pubsub.listen():
+            channel = item['channel'].decode().removeprefix(self.PREFIX)
+            self.dispatch(channel, item['data'])
+
+
+@lru_cache(maxsize=None)
+def get_broker():
+    return import_string(getattr(settings, 'EVENTS_BROKER', 'ecomm.events.InMemoryBroker'))()
+
+
+def channels_for(user):
+    channels = [f'user:{user.pk}']
+    if user.is_staff:
+        channels.append('staff')
+    return channels
+
+
+def publish(channels, event, data):
+    # Envoi après validation de la transaction : rien n'est annoncé en cas de rollback
+    message = encode(event, data)
+    broker = get_broker()
+
+    def send():
+        for channel in channels:
+            broker.publish(channel, message)
+
+    transaction.on_commit(send)
+
+
+def order_changed(order, created=False):
+    publish(['staff', f'user:{order.user_id}'], 'order', {
+        'id': order.id,
+        'status': order.status,
+        'label': order.get_status_display(),
+        'created': created,
+    })
+
+
+def reservation_changed(reservation, created=False):
+    publish(['staff', f'user:{reservation.user_id}'], 'reservation', {
+        'id': reservation.id,
+        'status': reservation.status,
+        'label': reservation.get_status_display(),
+        'created': created,
+    })
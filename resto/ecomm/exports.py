@@ -0,0 +1,225 @@
+import csv
+import json
+import re
+from datetime import date, datetime, time, timedelta
+from decimal import Decimal
+
+from django.db import models
+from django.utils import timezone
+
+from .models import Contact, Order, OrderItem, Reservation
+
+# Exports comptables (commandes avec leurs lignes, réservations, messages de
+# contact) en CSV ou JSONL, produits par morceaux : la mémoire utilisée ne
+# dépend pas du nombre de lignes exportées. Les lignes sont lues par lots
+# triés par id (pagination par clé) plutôt que par un curseur ouvert pendant
+# tout l'export : les pilotes MySQL chargeraient sinon tout le résultat en
+# mémoire, et les lignes de commande d'un lot se lisent en une requête.
+
+BATCH_SIZE = 2000
+FORMATS = ('csv', 'jsonl')
+CONTENT_TYPES = {'csv': 'text/csv; charset=utf-8', 'jsonl': 'application/x-ndjson'}
+
+ORDER_COLUMNS = ('id', 'created_at', 'customer', 'status', 'total_amount', 'delivery_address', 'phone_number')
+ORDER_ITEM_COLUMNS = ('item', 'quantity', 'unit_price', 'line_total')
+RESERVATION_COLUMNS = (
+    'id', 'date', 'time', 'customer', 'number_of_guests', 'status', 'phone_number', 'special_requests', 'created_at',
+)
+CONTACT_COLUMNS = ('id', 'created_at', 'name', 'email', 'subject', 'message')
+
+# Colonnes saisies par les clients : un tableur exécuterait comme formule une
+# cellule commençant par l'un de ces caractères, elle est préfixée par '.
+# Seul un numéro de téléphone international (+ suivi de chiffres et d'espaces)
+# reste tel quel.
+TEXT_COLUMNS = frozenset((
+    'customer', 'delivery_address', 'phone_number', 'special_requests', 'name', 'email', 'subject', 'message',
+))
+FORMULA_PREFIXES = ('=', '+', '-', '@', '\t', '\r')
+PHONE_NUMBER = re.compile(r'\+[\d ]+')
+
+
+class _Echo:
+    # Pseudo-fichier pour csv.writer : writerow() renvoie la ligne formatée
+    def write(self, value):
+        return value
+
+
+def _value(value):
+    # Valeurs sérialisables : dates ISO (heure locale), montants en texte exact
+    if isinstance(value, datetime):
+        return timezone.localtime(value).isoformat() if timezone.is_aware(value) else value.isoformat()
+    if isinstance(value, (date, time)):
+        return value.isoformat()
+    if isinstance(value, Decimal):
+        return str(value)
+    return value
+
+
+def _text_cell(value):
+    if isinstance(value, str) and value.startswith(FORMULA_PREFIXES) and not PHONE_NUMBER.fullmatch(value):
+        return "'" + value
+    return value
+
+
+def _batches(queryset, fields):
+    last = 0
+    while True:
+        rows = list(queryset.filter(id__gt=last).order_by('id').values('id', *fields)[:BATCH_SIZE])
+        if not rows:
+            return
+        yield rows
+        if len(rows) < BATCH_SIZE:
+            return
+        last = rows[-1]['id']
+
+
+def order_records(queryset):
+    fields = ('created_at', 'user__username', 'status', 'total_amount', 'delivery_address', 'phone_number')
+    for batch in _batches(queryset, fields):
+        lines = {}
+        items = OrderItem.objects.filter(order_id__in=[order['id'] for order in batch]).order_by('id')
+        for item in items.values('order_id', 'menu_item__name', 'quantity', 'price'):
+            lines.setdefault(item['order_id'], []).append({
+                'item': item['menu_item__name'],
+                'quantity': item['quantity'],
+                'unit_price': _value(item['price']),
+                'line_total': _value(item['price'] * item['quantity']),
+            })
+        for order in batch:
+            yield {
+                'id': order['id'],
+                'created_at': _value(order['created_at']),
+                'customer': order['user__username'],
+                'status': order['status'],
+                'total_amount': _value(order['total_amount']),
+                'delivery_address': order['delivery_address'],
+                'phone_number': order['phone_number'],
+                'items': lines.get(order['id'], []),
+            }
+
+
+def order_rows(record):
+    # Une ligne CSV par ligne de commande, les colonnes de la commande répétées
+    order = [record[column] for column in ORDER_COLUMNS]
+    if not record['items']:
+        return [order + [''] * len(ORDER_ITEM_COLUMNS)]
+    return [order + [item[column] for column in ORDER_ITEM_COLUMNS] for item in record['items']]
+
+
+def reservation_records(queryset):
+    fields = (
+        'date', 'time', 'user__username', 'number_of_guests', 'status', 'phone_number', 'special_requests', 'created_at',
+    )
+    for batch in _batches(queryset, fields):
+        for reservation in batch:
+            reservation['customer'] = reservation.pop('user__username')
+            yield {column: _value(reservation[column]) for column in RESERVATION_COLUMNS}
+
+
+def contact_records(queryset):
+    for batch in _batches(queryset, CONTACT_COLUMNS[1:]):
+        for contact in batch:
+            yield {column: _value(contact[column]) for column in CONTACT_COLUMNS}
+
+
+# Jeux de données exportables : requête de base, champ du filtre de dates,
+# statuts admis (None : pas de filtre de statut), lignes et en-tête CSV
+DATASETS = {
+    'orders': {
+        'queryset': Order.objects.all,
+        'date_field': 'created_at',
+        'statuses': Order.STATUS_CHOICES,
+        'records': order_records,
+        'header': ORDER_COLUMNS + ORDER_ITEM_COLUMNS,
+        'rows': order_rows,
+    },
+    'reservations': {
+        'queryset': Reservation.objects.all,
+        'date_field': 'date',
+        'statuses': Reservation.STATUS_CHOICES,
+        'records': reservation_records,
+        'header': RESERVATION_COLUMNS,
+        'rows': lambda record: [[record[column] for column in RESERVATION_COLUMNS]],
+    },
+    'contacts': {
+        'queryset': Contact.objects.all,
+        'date_field': 'created_at',
+        'statuses': None,
+        'records': contact_records,
+        'header': CONTACT_COLUMNS,
+        'rows': lambda record: [[record[column] for column in CONTACT_COLUMNS]],
+    },
+}
+
+
+def _start_of_day(day):
+    return timezone.make_aware(datetime.combine(day, time.min))
+
+
+def parse_date(value):
+    return date.fromisoformat(value) if value else None
+
+
+def filtered_queryset(dataset, since=None, until=None, status=None):
+    # Bornes incluses ; ValueError si un filtre ne s'applique pas à ce jeu de données
+    spec = DATASETS[dataset]
+    queryset = spec['queryset']()
+    field = spec['date_field']
+    if isinstance(queryset.model._meta.get_field(field), models.DateTimeField):
+        # Bornes en heure locale, sans __date : l'index sur le champ reste utilisable
+        if since:
+            queryset = queryset.filter(**{f'{field}__gte': _start_of_day(since)})
+        if until:
+            queryset = queryset.filter(**{f'{field}__lt': _start_of_day(until + timedelta(days=1))})
+    else:
+        if since:
+            queryset = queryset.filter(**{f'{field}__gte': since})
+        if until:
+            queryset = queryset.filter(**{f'{field}__lte': until})
+    if status:
+        if spec['statuses'] is None or status not in dict(spec['statuses']):
+            raise ValueError(f"Statut invalide pour {dataset} : {status}")
+        queryset = queryset.filter(status=status)
+    return queryset
+
+
+def _csv_chunks(spec, records):
+    writer = csv.writer(_Echo())
+    yield writer.writerow(spec['header'])
+    text = [index for index, column in enumerate(spec['header']) if column in TEXT_COLUMNS]
+    chunk = []
+    for record in records:
+        for row in spec['rows'](record):
+            for index in text:
+                row[index] = _text_cell(row[index])
+            chunk.append(writer.writerow(row))
+        if len(chunk) >= BATCH_SIZE:
+            yield ''.join(chunk)
+            chunk = []
+    if chunk:
+        yield ''.join(chunk)
+
+
+def _jsonl_chunks(records):
+    chunk = []
+    for record in records:
+        chunk.append(json.dumps(record, ensure_ascii=False, separators=(',', ':')) + '\n')
+        if len(chunk) >= BATCH_SIZE:
+            yield ''.join(chunk)
+            chunk = []
+    if chunk:
+        yield ''.join(chunk)
+
+
+def export(dataset, fmt, since=None, until=None, status=None):
+    # Valide les paramètres immédiatement (ValueError), puis renvoie un
+    # itérateur de morceaux de texte à diffuser
+    if dataset not in DATASETS:
+        raise ValueError(f"Export inconnu : {dataset}")
+    if fmt not in FORMATS:
+        raise ValueError(f"Format inconnu : {fmt}")
+    spec = DATASETS[dataset]
+    records = spec['records'](filtered_queryset(dataset, since, until, status))
+    if fmt == 'csv':
+        return _csv_chunks(spec, records)
+    return _jsonl_chunks(records)
@@ -0,0 +1,104 @@
+import hashlib
+import io
+
+from django.conf import settings
+from django.core.cache import cache
+from django.core.files.base import ContentFile
+from django.core.files.storage import default_storage
+from PIL import Image, ImageOps
+
+from . import catalog, tasks
+from .models import MenuItem
+
+# Variantes dérivées des photos des plats : plusieurs largeurs, en WebP et en
+# JPEG de repli. Les noms contiennent l'empreinte du fichier source : une
+# variante ne change jamais et peut être mise en cache indéfiniment.
+DERIVED_DIR = 'menu_items/derived'
+FORMATS = (
+    ('webp', 'WEBP', {'quality': 80, 'method': 4}),
+    ('jpeg', 'JPEG', {'quality': 82, 'optimize': True, 'progressive': True}),
+)
+PENDING_TIMEOUT = 300
+
+
+def widths():
+    return sorted(getattr(settings, 'MENU_IMAGE_WIDTHS', (320, 640, 960)))
+
+
+def _flatten(image, fmt):
+    # Le JPEG n'a pas de canal alpha : fond blanc pour les PNG transparents
+    if fmt == 'JPEG' and image.mode in ('RGBA', 'LA', 'P'):
+        image = image.convert('RGBA')
+        background = Image.new('RGB', image.size, (255, 255, 255))
+        background.paste(image, mask=image.getchannel('A'))
+        return background
+    if image.mode not in ('RGB', 'RGBA'):
+        return image.convert('RGBA' if 'A' in image.getbands() or image.mode == 'P' else 'RGB')
+    return image
+
+
+def derive(name):
+    # Génère (ou retrouve) les variantes du fichier `name` du stockage
+    with default_storage.open(name, 'rb') as f:
+        data = f.read()
+    digest = hashlib.sha256(data).hexdigest()[:16]
+    targets = widths()
+
+    image = Image.open(io.BytesIO(data))
+    # Décodage JPEG directement à une résolution réduite, bien moins coûteux
+    image.draft('RGB', (targets[-1], targets[-1]))
+    image = ImageOps.exif_transpose(image)
+    width, height = image.size
+
+    variants = {'source': name, 'hash': digest, 'width': width, 'height': height}
+    for ext, _, _ in FORMATS:
+        variants[ext] = []
+    for target in sorted({min(w, width) for w in targets}):
+        resized = image
+        if target < width:
+            resized = image.resize(
+                (target, max(1, round(height * target / width))), Image.Resampling.LANCZOS, reducing_gap=3.0
+            )
+        for ext, fmt, options in FORMATS:
+            path = f'{DERIVED_DIR}/{digest}-{target}w.{ext}'
+            if not default_storage.exists(path):
+                buffer = io.BytesIO()
+                _flatten(resized, fmt).save(buffer, fmt, **options)
+                path = default_storage.save(path, ContentFile(buffer.getvalue()))
+            variants[ext].append([target, path])
+    return variants
+
+
+def is_current(item):
+    return bool(item.image) and item.image_variants.get('source') == item.image.name
+
+
+@tasks.task('images.derive_item')
+def derive_item(item_id):
+    item = MenuItem.objects.filter(pk=item_id).only('image', 'image_variants').first()
+    if item is None or not item.image:
+        return None
+    if is_current(item):
+        return item.image_variants
+    variants = derive(item.image.name)
+    # update() ne déclenche pas post_save : pas de nouvelle dérivation en boucle.
+    # Le filtre sur l'image ignore le résultat si elle a été remplacée entre-temps.
+    if MenuItem.objects.filter(pk=item_id, image=item.image.name).update(image_variants=variants):
+        catalog.bump_version()
+    return variants
+
+
+def schedule(item):
+    # Dérivation confiée au worker (ecomm.tasks), une seule fois par photo
+    if cache.add(f'images:pending:{item.pk}:{item.image.name}', 1, PENDING_TIMEOUT):
+        tasks.enqueue('images.derive_item', item.pk)
+
+
+def variant_paths(item):
+    # Fichiers des variantes à supprimer avec la photo ; aucun si un autre plat les partage
+    variants = item.image_variants
+    if not variants.get('hash'):
+        return []
+    if MenuItem.objects.exclude(pk=item.pk).filter(image_variants__hash=variants['hash']).exists():
+        return []
+    return [path for ext, _, _ in FORMATS for _, path in variants.get(ext, [])]
@@ -0,0 +1,240 @@
+import logging
+import random
+import threading
+import time
+from collections import Counter
+from contextvars import ContextVar
+
+from asgiref.sync import iscoroutinefunction, markcoroutinefunction
+from django.conf import settings
+from django.db import connections
+
+logger = logging.getLogger(__name__)
+
+# Instrumentation des vues : durée, nombre et durée des requêtes SQL, requêtes
+# répétées (même SQL exécuté plusieurs fois dans une requête HTTP : signe d'un
+# N+1). Seule une part des requêtes HTTP est mesurée
+# (INSTRUMENTATION_SAMPLE_RATE) ; les autres ne coûtent qu'un tirage aléatoire.
+# Les mesures sont agrégées par vue dans le processus et exposées au format
+# texte de Prometheus : chaque worker expose les siennes.
+
+DURATION_BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1, 2.5, 5, 10)
+QUERY_BUCKETS = (0, 1, 2, 5, 10, 20, 50, 100)
+DUPLICATE_WARNING = 5  # Répétitions d'une même requête SQL signalées dans les logs
+UNRESOLVED = '<unresolved>'  # Vue des URL inconnues (404), pour borner les libellés
+
+_current = ContextVar('instrumentation_sample', default=None)
+
+
+class Sample:
+    # Mesures d'une requête HTTP
+    def __init__(self):
+        self.start = time.perf_counter()
+        self.duration = 0.0
+        self.queries = 0
+        self.query_time = 0.0
+        self.statements = Counter()
+
+    def add_query(self, sql, duration):
+        self.queries += 1
+        self.query_time += duration
+        self.statements[sql] += 1
+
+    @property
+    def duplicates(self):
+        return sum(count - 1 for count in self.statements.values())
+
+
+def record_query(execute, sql, params, many, context):
+    # Enveloppe d'exécution installée sur chaque connexion ; hors échantillon, appel direct
+    sample = _current.get()
+    if sample is None:
+        return execute(sql, params, many, context)
+    start = time.perf_counter()
+    try:
+        return execute(sql, params, many, context)
+    finally:
+        sample.add_query(sql, time.perf_counter() - start)
+
+
+def install(connection):
+    if record_query not in connection.execute_wrappers:
+        connection.execute_wrappers.append(record_query)
+
+
+class _Histogram:
+    def __init__(self, buckets):
+        self.buckets = buckets
+        self.counts = [0] * len(buckets)
+        self.sum = 0
+        self.count = 0
+
+    def observe(self, value):
+        self.sum += value
+        self.count += 1
+        for i, bound in enumerate(self.buckets):
+            if value <= bound:
+                self.counts[i] += 1
+
+    def lines(self, name, labels):
+        for bound, count in zip(self.buckets, self.counts):
+            yield f'{name}_bucket{{{labels},le="{bound}"}} {count}'
+        yield f'{name}_bucket{{{labels},le="+Inf"}} {self.count}'
+        yield f'{name}_sum{{{labels}}} {round(self.sum, 6)}'
+        yield f'{name}_count{{{labels}}} {self.count}'
+
+
+class _ViewStats:
+    def __init__(self):
+        self.responses = Counter()  # (méthode, statut) -> nombre
+        self.duration = _Histogram(DURATION_BUCKETS)
+        self.queries = _Histogram(QUERY_BUCKETS)
+        self.query_time = 0.0
+        self.duplicates = 0
+        self.over_budget = 0
+
+
+def _escape(value):
+    return str(value).replace('\\', '\\\\').replace('"', '\\"').replace('\n', '\\n')
+
+
+# (nom, type, aide) des métriques exposées
+METRICS = (
+    ('ecomm_view_responses_total', 'counter', "Réponses mesurées, par vue, méthode et statut"),
+    ('ecomm_view_duration_seconds', 'histogram', "Durée de traitement des requêtes mesurées"),
+    ('ecomm_view_queries', 'histogram', "Requêtes SQL par requête HTTP mesurée"),
+    ('ecomm_view_query_seconds_total', 'counter', "Temps passé dans les requêtes SQL"),
+    ('ecomm_view_duplicate_queries_total', 'counter', "Requêtes SQL répétées à l'identique (hors paramètres)"),
+    ('ecomm_view_query_budget_exceeded_total', 'counter', "Requêtes HTTP au-delà de QUERY_BUDGETS"),
+)
+
+
+class Registry:
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._views = {}
+
+    def observe(self, view, method, status, sample, over_budget):
+        with self._lock:
+            stats = self._views.get(view)
+            if stats is None:
+                stats = self._views[view] = _ViewStats()
+            stats.responses[method, status] += 1
+            stats.duration.observe(sample.duration)
+            stats.queries.observe(sample.queries)
+            stats.query_time += sample.query_time
+            stats.duplicates += sample.duplicates
+            stats.over_budget += over_budget
+
+    def reset(self):
+        with self._lock:
+            self._views.clear()
+
+    def render(self):
+        lines = [
+            '# HELP ecomm_instrumentation_sample_rate Part des requêtes mesurées',
+            '# TYPE ecomm_instrumentation_sample_rate gauge',
+            f'ecomm_instrumentation_sample_rate {settings.INSTRUMENTATION_SAMPLE_RATE}',
+        ]
+        sections = {name: [] for name, _, _ in METRICS}
+        with self._lock:
+            for view, stats in sorted(self._views.items()):
+                labels = f'view="{_escape(view)}"'
+                sections['ecomm_view_responses_total'] += [
+                    f'ecomm_view_responses_total{{{labels},method="{method}",status="{status}"}} {count}'
+                    for (method, status), count in sorted(stats.responses.items())
+                ]
+                sections['ecomm_view_duration_seconds'] += stats.duration.lines('ecomm_view_duration_seconds', labels)
+                sections['ecomm_view_queries'] += stats.queries.lines('ecomm_view_queries', labels)
+                sections['ecomm_view_query_seconds_total'].append(
+                    f'ecomm_view_query_seconds_total{{{labels}}} {round(stats.query_time, 6)}'
+                )
+                sections['ecomm_view_duplicate_queries_total'].append(
+                    f'ecomm_view_duplicate_queries_total{{{labels}}} {stats.duplicates}'
+                )
+                sections['ecomm_view_query_budget_exceeded_total'].append(
+                    f'ecomm_view_query_budget_exceeded_total{{{labels}}} {stats.over_budget}'
+                )
+        for name, kind, help_text in METRICS:
+            lines += [f'# HELP {name} {help_text}', f'# TYPE {name} {kind}', *sections[name]]
+        return '\n'.join(lines) + '\n'
+
+
+registry = Registry()
+
+
+def view_name(request):
+    match = getattr(request, 'resolver_match', None)
+    if match is None:
+        return UNRESOLVED
+    return match.view_name
+
+
+class InstrumentationMiddleware:
+    """
+    Mesure une part des requêtes (INSTRUMENTATION_SAMPLE_RATE) : durée, requêtes
+    SQL, répétitions, dépassement de QUERY_BUDGETS. Les mesures sont attachées à
+    la requête (`request.instrumentation`) et, si INSTRUMENTATION_SERVER_TIMING,
+    renvoyées dans l'en-tête Server-Timing. Pour une réponse diffusée en flux,
+    seule la production des en-têtes est mesurée.
+    """
+    sync_capable = True
+    async_capable = True
+
+    def __init__(self, get_response):
+        self.get_response = get_response
+        if iscoroutinefunction(get_response):
+            markcoroutinefunction(self)
+
+    def __call__(self, request):
+        if iscoroutinefunction(self):
+            return self.__acall__(request)
+        if not self.sampled():
+            return self.get_response(request)
+        # Connexions ouvertes avant le chargement du module (les autres passent par connection_created)
+        for connection in connections.all(initialized_only=True):
+            install(connection)
+        sample = Sample()
+        token = _current.set(sample)
+        try:
+            response = self.get_response(request)
+        finally:
+            _current.reset(token)
+        return self.finish(request, response, sample)
+
+    async def __acall__(self, request):
+        if not self.sampled():
+            return await self.get_response(request)
+        # Le contexte suit la requête dans les threads de sync_to_async : les
+        # requêtes SQL des vues asynchrones sont comptées aussi
+        sample = Sample()
+        token = _current.set(sample)
+        try:
+            response = await self.get_response(request)
+        finally:
+            _current.reset(token)
+        return self.finish(request, response, sample)
+
+    @staticmethod
+    def sampled():
+        rate = settings.INSTRUMENTATION_SAMPLE_RATE
+        return rate >= 1 or (rate > 0 and random.random() < rate)
+
+    def finish(self, request, response, sample):
+        sample.duration = time.perf_counter() - sample.start
+        view = view_name(request)
+        budget = settings.QUERY_BUDGETS.get(view)
+        over_budget = budget is not None and sample.queries > budget
+        if over_budget:
+            logger.warning("%s : %s requêtes SQL pour un budget de %s", view, sample.queries, budget)
+        sql, repeats = max(sample.statements.items(), key=lambda item: item[1], default=('', 0))
+        if repeats >= DUPLICATE_WARNING:
+            logger.warning("%s : requête exécutée %s fois : %s", view, repeats, sql[:200])
+        registry.observe(view, request.method, response.status_code, sample, over_budget)
+        request.instrumentation = sample
+        if settings.INSTRUMENTATION_SERVER_TIMING:
+            response['Server-Timing'] = (
+                f'app;dur={sample.duration * 1000:.1f}, '
+                f'db;dur={sample.query_time * 1000:.1f};desc="{sample.queries} queries, {sample.duplicates} repeated"'
+            )
+        return response
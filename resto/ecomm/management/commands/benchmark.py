@@ -0,0 +1,86 @@
+import json
+
+from django.core.management.base import BaseCommand, CommandError
+from django.db import connection
+from django.test.utils import setup_test_environment, teardown_test_environment
+
+from ecomm.benchmarks import SCENARIOS
+
+LATENCY_KEYS = ('median_ms', 'p50_ms', 'p95_ms', 'p99_ms')
+
+
+def regressions(baseline, results, tolerance):
+    # Écarts défavorables entre deux exécutions : toute requête SQL en plus,
+    # latence ou débit dégradés au-delà de `tolerance` (0.25 : 25 %)
+    found = []
+    for name, cases in results.items():
+        for case, stats in cases.items():
+            before = baseline.get(name, {}).get(case)
+            if not before:
+                continue
+            if stats.get('queries', 0) > before.get('queries', stats.get('queries', 0)):
+                found.append(f"{name} / {case} : {before['queries']} -> {stats['queries']} requêtes SQL")
+            for key in LATENCY_KEYS:
+                if before.get(key) and stats.get(key) and stats[key] > before[key] * (1 + tolerance):
+                    found.append(f"{name} / {case} : {key} {before[key]} -> {stats[key]}")
+            if before.get('rps') and stats.get('rps') and stats['rps'] < before['rps'] * (1 - tolerance):
+                found.append(f"{name} / {case} : rps {before['rps']} -> {stats['rps']}")
+            if stats.get('errors', 0) > before.get('errors', 0):
+                found.append(f"{name} / {case} : {before.get('errors', 0)} -> {stats['errors']} erreurs")
+    return found
+
+
+class Command(BaseCommand):
+    help = "Exécute les scénarios de benchmark sur une base de test jetable"
+
+    def add_arguments(self, parser):
+        parser.add_argument('scenarios', nargs='*', help="Scénarios à exécuter (tous par défaut)")
+        parser.add_argument('--repeat', type=int, default=5)
+        parser.add_argument('--output', help="Fichier JSON où écrire les résultats")
+        parser.add_argument('--compare', help="Résultats de référence (JSON) : échoue en cas de régression")
+        parser.add_argument(
+            '--tolerance', type=float, default=0.25,
+            help="Dégradation de latence ou de débit tolérée avec --compare (0.25 : 25 %%)",
+        )
+
+    def handle(self, *args, **options):
+        names = options['scenarios'] or list(SCENARIOS)
+        unknown = set(names) - set(SCENARIOS)
+        if unknown:
+            raise CommandError(f"Scénarios inconnus : {', '.join(sorted(unknown))}")
+        baseline = None
+        if options['compare']:
+            with open(options['compare']) as f:
+                baseline = json.load(f)
+
+        setup_test_environment()
+        old_name = connection.creation.create_test_db(verbosity=0, serialize=False)
+        results = {}
+        try:
+            for name in names:
+                self.stdout.write(self.style.MIGRATE_HEADING(name))
+                results[name] = SCENARIOS[name](options['repeat'])
+                for case, stats in results[name].items():
+                    if 'median_ms' in stats:
+                        line = (
+                            f"{stats['queries']:>6} req  {stats['median_ms']:>10} ms  "
+                            f"(p95 {stats['p95_ms']} ms, p99 {stats['p99_ms']} ms)"
+                        )
+                    else:
+                        line = '  '.join(f"{key}={value}" for key, value in stats.items())
+                    self.stdout.write(f"  {case:<40} {line}")
+        finally:
+            connection.creation.destroy_test_db(old_name, verbosity=0)
+            teardown_test_environment()
+
+        if options['output']:
+            with open(options['output'], 'w') as f:
+                json.dump(results, f, indent=2)
+
+        if baseline is not None:
+            found = regressions(baseline, results, options['tolerance'])
+            for line in found:
+                self.stdout.write(f"  {line}")
+            if found:
+                raise CommandError(f"{len(found)} régression(s) par rapport à {options['compare']}")
+            self.stdout.write(self.style.SUCCESS(f"Aucune régression par rapport à {options['compare']}"))
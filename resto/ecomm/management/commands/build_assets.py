@@ -0,0 +1,37 @@
+from django.core.management.base import BaseCommand, CommandError
+
+from ecomm import bundles
+
+
+class Command(BaseCommand):
+    help = (
+        "Construit les feuilles de style et scripts du site (ecomm/assets -> ecomm/static/build) : "
+        "concaténation, élimination des règles CSS inutilisées, minification. À relancer après "
+        "toute modification des sources, avant collectstatic."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--check', action='store_true',
+            help="Vérifie que les fichiers construits correspondent aux sources, sans les écrire",
+        )
+
+    def handle(self, *args, **options):
+        results = bundles.build_all(write=not options['check'])
+        if options['check']:
+            stale = [name for name, (_, _, current) in results.items() if not current]
+            for name in stale:
+                self.stdout.write(f"  {name} : à reconstruire")
+            if stale:
+                raise CommandError(f"{len(stale)} fichier(s) à reconstruire : manage.py build_assets")
+            self.stdout.write(self.style.SUCCESS("Fichiers construits à jour"))
+            return
+
+        self.stdout.write(f"  {'fichier':<32} {'sources':>8} {'minifié':>8} {'gzip':>7} {'brotli':>7}")
+        totals = [0, 0, 0, 0]
+        for name, (source_bytes, content, _) in results.items():
+            sizes = (source_bytes, *bundles.transfer_sizes(content.encode()))
+            totals = [total + size for total, size in zip(totals, sizes)]
+            self.stdout.write(f"  {name:<32} {sizes[0]:>8} {sizes[1]:>8} {sizes[2]:>7} {sizes[3]:>7}")
+        self.stdout.write(f"  {'total':<32} {totals[0]:>8} {totals[1]:>8} {totals[2]:>7} {totals[3]:>7}")
+        self.stdout.write(self.style.SUCCESS(f"{len(results)} fichier(s) construit(s) dans {bundles.BUILD_DIR}"))
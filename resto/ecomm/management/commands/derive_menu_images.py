@@ -0,0 +1,28 @@
+from django.core.management.base import BaseCommand
+
+from ecomm import images
+from ecomm.models import MenuItem
+
+
+class Command(BaseCommand):
+    help = "Génère les miniatures et variantes WebP des photos de plats qui n'en ont pas encore"
+
+    def add_arguments(self, parser):
+        parser.add_argument('--force', action='store_true', help="Régénère aussi les variantes existantes")
+
+    def handle(self, *args, **options):
+        items = MenuItem.objects.exclude(image='').exclude(image=None).only('image', 'image_variants')
+        derived = failed = 0
+        for item in items.iterator():
+            if images.is_current(item) and not options['force']:
+                continue
+            if options['force']:
+                MenuItem.objects.filter(pk=item.pk).update(image_variants={})
+            try:
+                images.derive_item(item.pk)
+            except (OSError, ValueError) as exc:
+                failed += 1
+                self.stderr.write(f"{item.image.name} : {exc}")
+                continue
+            derived += 1
+        self.stdout.write(self.style.SUCCESS(f"{derived} photo(s) traitée(s), {failed} échec(s)"))
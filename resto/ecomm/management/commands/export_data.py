@@ -0,0 +1,35 @@
+from django.core.management.base import BaseCommand, CommandError
+
+from ecomm import exports
+
+
+class Command(BaseCommand):
+    help = "Exporte les commandes (avec leurs lignes), réservations ou messages de contact en CSV ou JSONL"
+
+    def add_arguments(self, parser):
+        parser.add_argument('dataset', choices=sorted(exports.DATASETS))
+        parser.add_argument('--format', choices=exports.FORMATS, default='csv')
+        parser.add_argument('--since', help="Date de début incluse (AAAA-MM-JJ)")
+        parser.add_argument('--until', help="Date de fin incluse (AAAA-MM-JJ)")
+        parser.add_argument('--status', help="Statut des commandes ou réservations")
+        parser.add_argument('--output', '-o', default='-', help="Fichier de sortie (- : sortie standard)")
+
+    def handle(self, *args, **options):
+        try:
+            chunks = exports.export(
+                options['dataset'], options['format'],
+                since=exports.parse_date(options['since']),
+                until=exports.parse_date(options['until']),
+                status=options['status'],
+            )
+        except ValueError as exc:
+            raise CommandError(exc)
+
+        if options['output'] == '-':
+            for chunk in chunks:
+                self.stdout.write(chunk, ending='')
+            return
+        with open(options['output'], 'w', encoding='utf-8', newline='') as f:
+            for chunk in chunks:
+                f.write(chunk)
+        self.stderr.write(self.style.SUCCESS(f"Export écrit dans {options['output']}"))
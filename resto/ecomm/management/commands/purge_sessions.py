@@ -0,0 +1,35 @@
+import time
+from importlib import import_module
+
+from django.conf import settings
+from django.core.management.base import BaseCommand
+from django.utils import timezone
+
+
+class Command(BaseCommand):
+    help = (
+        "Supprime par lots les sessions expirées de la base (à planifier, par exemple chaque nuit). "
+        "Contrairement à clearsessions, aucun DELETE ne verrouille la table longtemps."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('--batch', type=int, default=5000, help="Sessions supprimées par transaction")
+        parser.add_argument('--pause', type=float, default=0.0, help="Attente (s) entre deux lots")
+
+    def handle(self, *args, **options):
+        store = import_module(settings.SESSION_ENGINE).SessionStore
+        if not hasattr(store, 'get_model_class'):
+            # Sessions en cache ou en cookie : elles expirent d'elles-mêmes
+            self.stdout.write(f"Sessions hors base ({settings.SESSION_ENGINE}) : rien à supprimer")
+            return
+        sessions = store.get_model_class().objects
+        now = timezone.now()
+        deleted = 0
+        while True:
+            keys = list(sessions.filter(expire_date__lt=now).values_list('session_key', flat=True)[:options['batch']])
+            if not keys:
+                break
+            deleted += sessions.filter(session_key__in=keys).delete()[0]
+            if options['pause']:
+                time.sleep(options['pause'])
+        self.stdout.write(self.style.SUCCESS(f"{deleted} session(s) expirée(s) supprimée(s)"))
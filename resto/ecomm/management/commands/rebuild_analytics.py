@@ -0,0 +1,35 @@
+from datetime import date
+
+from django.core.management.base import BaseCommand, CommandError
+
+from ecomm import analytics
+
+
+class Command(BaseCommand):
+    help = "Recalcule les cumuls de ventes (par heure et par plat) depuis les commandes"
+
+    def add_arguments(self, parser):
+        parser.add_argument('--since', help="Ne recalcule qu'à partir de ce jour (AAAA-MM-JJ)")
+        parser.add_argument(
+            '--check', action='store_true',
+            help="Vérifie la cohérence des cumuls sans les modifier",
+        )
+
+    def handle(self, *args, **options):
+        if options['check']:
+            problems = analytics.check()
+            for key, stored, expected in problems:
+                self.stdout.write(f"  {key} : stocké {stored}, attendu {expected}")
+            if problems:
+                raise CommandError(f"{len(problems)} cumul(s) incohérent(s)")
+            self.stdout.write(self.style.SUCCESS("Cumuls de ventes cohérents"))
+            return
+
+        try:
+            since = date.fromisoformat(options['since']) if options['since'] else None
+        except ValueError as exc:
+            raise CommandError(exc)
+        hours, items = analytics.rebuild(since)
+        self.stdout.write(self.style.SUCCESS(
+            f"Cumuls reconstruits ({hours} heures, {items} plats-jours)"
+        ))
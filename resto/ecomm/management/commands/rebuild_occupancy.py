@@ -0,0 +1,26 @@
+from django.core.management.base import BaseCommand, CommandError
+
+from ecomm import capacity
+
+
+class Command(BaseCommand):
+    help = "Recalcule l'occupation des créneaux de réservation depuis les réservations"
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--check', action='store_true',
+            help="Vérifie la cohérence de l'occupation sans la modifier",
+        )
+
+    def handle(self, *args, **options):
+        if options['check']:
+            problems = capacity.check()
+            for (day, slot), stored, expected in problems:
+                self.stdout.write(f"  {day} {slot:%H:%M} : stocké {stored}, attendu {expected}")
+            if problems:
+                raise CommandError(f"{len(problems)} créneau(x) incohérent(s)")
+            self.stdout.write(self.style.SUCCESS("Occupation des créneaux cohérente"))
+            return
+
+        count = capacity.rebuild()
+        self.stdout.write(self.style.SUCCESS(f"Occupation reconstruite ({count} créneaux)"))
@@ -0,0 +1,14 @@
+from django.core.management.base import BaseCommand
+
+from ecomm import search
+from ecomm.models import MenuItem
+
+
+class Command(BaseCommand):
+    help = "Reconstruit l'index de recherche plein texte des plats"
+
+    def handle(self, *args, **options):
+        search.rebuild()
+        self.stdout.write(self.style.SUCCESS(
+            f"Index de recherche reconstruit ({MenuItem.objects.count()} plats)"
+        ))
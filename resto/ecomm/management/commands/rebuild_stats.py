@@ -0,0 +1,28 @@
+from django.core.management.base import BaseCommand, CommandError
+
+from ecomm import stats
+
+
+class Command(BaseCommand):
+    help = "Recalcule les statistiques du tableau de bord depuis les commandes et réservations"
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--check', action='store_true',
+            help="Vérifie la cohérence des compteurs sans les modifier",
+        )
+
+    def handle(self, *args, **options):
+        if options['check']:
+            problems = stats.check()
+            for key, stored, expected in problems:
+                self.stdout.write(f"  {key} : stocké {stored}, attendu {expected}")
+            if problems:
+                raise CommandError(f"{len(problems)} compteur(s) incohérent(s)")
+            self.stdout.write(self.style.SUCCESS("Statistiques cohérentes"))
+            return
+
+        counters, days = stats.rebuild()
+        self.stdout.write(self.style.SUCCESS(
+            f"Statistiques reconstruites ({counters} compteurs, {days} jours)"
+        ))
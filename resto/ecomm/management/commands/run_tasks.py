@@ -0,0 +1,50 @@
+import logging
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+from django.core.management.base import BaseCommand
+from django.db import DatabaseError, close_old_connections
+
+from ecomm import tasks
+
+logger = logging.getLogger('ecomm.tasks')
+
+ERROR_BACKOFF_MAX = 60  # Attente maximale (s) entre deux tentatives quand la base est indisponible
+
+
+class Command(BaseCommand):
+    help = "Exécute les tâches différées de la file (suppressions de fichiers, images...)"
+
+    def add_arguments(self, parser):
+        parser.add_argument('--workers', type=int, default=4, help="Threads d'exécution des tâches")
+        parser.add_argument('--batch', type=int, default=20, help="Tâches réservées à chaque tour")
+        parser.add_argument('--poll', type=float, default=1.0, help="Attente (s) quand la file est vide")
+        parser.add_argument('--once', action='store_true', help="Vide la file puis s'arrête")
+
+    def handle(self, *args, **options):
+        done = 0
+        with ThreadPoolExecutor(options['workers'], thread_name_prefix='tasks') as executor:
+            errors = 0
+            try:
+                while True:
+                    # Connexion coupée ou trop vieille : rouverte au tour suivant
+                    close_old_connections()
+                    try:
+                        count = tasks.run_pending(options['batch'], executor)
+                    except DatabaseError:
+                        # Base verrouillée, serveur redémarré... : le worker attend et reprend
+                        errors += 1
+                        delay = min(options['poll'] * 2 ** errors, ERROR_BACKOFF_MAX)
+                        logger.exception("Lecture de la file impossible, nouvel essai dans %.0f s", delay)
+                        close_old_connections()
+                        time.sleep(delay)
+                        continue
+                    errors = 0
+                    done += count
+                    if not count:
+                        if options['once']:
+                            break
+                        time.sleep(options['poll'])
+            except KeyboardInterrupt:
+                pass
+        self.stdout.write(self.style.SUCCESS(f"{done} tâche(s) exécutée(s)"))
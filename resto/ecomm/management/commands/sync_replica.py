@@ -0,0 +1,37 @@
+import sqlite3
+import time
+
+from django.conf import settings
+from django.core.management.base import BaseCommand, CommandError
+from django.db import DEFAULT_DB_ALIAS, connections
+
+
+class Command(BaseCommand):
+    help = (
+        "Copie la base SQLite principale dans la réplique SQLite (DATABASE_REPLICA_URL), "
+        "pour essayer le routage des lectures en local. --every simule une réplication "
+        "asynchrone avec un retard borné."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('--every', type=float, default=0.0, help="Recopie toutes les N secondes (0 : une fois)")
+
+    def handle(self, *args, **options):
+        alias = settings.REPLICA_DATABASE
+        if not alias:
+            raise CommandError("Aucune réplique configurée (DATABASE_REPLICA_URL)")
+        primary, replica = connections[DEFAULT_DB_ALIAS], connections[alias]
+        if primary.vendor != 'sqlite' or replica.vendor != 'sqlite':
+            raise CommandError("La copie n'est possible qu'entre deux bases SQLite : répliquez avec le serveur")
+        while True:
+            primary.ensure_connection()
+            # Connexion dédiée : la copie n'hérite pas des transactions de Django
+            target = sqlite3.connect(replica.settings_dict['NAME'])
+            try:
+                primary.connection.backup(target)
+            finally:
+                target.close()
+            self.stdout.write(f"Réplique {replica.settings_dict['NAME']} à jour")
+            if not options['every']:
+                return
+            time.sleep(options['every'])
@@ -0,0 +1,41 @@
+# Generated by Django 5.1.7 on 2026-10-18 10:08
+
+from decimal import Decimal
+
+from django.db import migrations, models
+
+
+def backfill_cart_totals(apps, schema_editor):
+    Cart = apps.get_model('ecomm', 'Cart')
+    for cart in Cart.objects.all():
+        totals = cart.cartitem_set.aggregate(
+            subtotal=models.Sum(
+                models.F('quantity') * models.F('menu_item__price'),
+                output_field=models.DecimalField(max_digits=10, decimal_places=2),
+            ),
+            total_items=models.Sum('quantity'),
+        )
+        cart.total_amount = totals['subtotal'] or Decimal('0')
+        cart.total_items = totals['total_items'] or 0
+        cart.save(update_fields=['total_amount', 'total_items'])
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('ecomm', '0003_alter_cart_user'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='cart',
+            name='total_amount',
+            field=models.DecimalField(decimal_places=2, default=0, max_digits=10),
+        ),
+        migrations.AddField(
+            model_name='cart',
+            name='total_items',
+            field=models.PositiveIntegerField(default=0),
+        ),
+        migrations.RunPython(backfill_cart_totals, migrations.RunPython.noop),
+    ]
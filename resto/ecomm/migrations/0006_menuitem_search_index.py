@@ -0,0 +1,40 @@
+from django.db import migrations
+
+# Valeurs figées à la création de la migration : elle ne dépend pas du code
+# actuel de ecomm.search
+FTS_TABLE = 'ecomm_menuitem_fts'
+
+
+def create_search_index(apps, schema_editor):
+    if schema_editor.connection.vendor != 'sqlite':
+        return
+    MenuItem = apps.get_model('ecomm', 'MenuItem')
+    with schema_editor.connection.cursor() as cursor:
+        cursor.execute(
+            f"CREATE VIRTUAL TABLE IF NOT EXISTS {FTS_TABLE} USING fts5("
+            "name, description, tokenize='unicode61 remove_diacritics 2')"
+        )
+        # Classement BM25 pondéré (nom 10, description 1), utilisé par la colonne cachée `rank`
+        cursor.execute(f"INSERT INTO {FTS_TABLE}({FTS_TABLE}, rank) VALUES ('rank', 'bm25(10.0, 1.0)')")
+        cursor.executemany(
+            f"INSERT INTO {FTS_TABLE}(rowid, name, description) VALUES (%s, %s, %s)",
+            list(MenuItem.objects.values_list('id', 'name', 'description')),
+        )
+
+
+def drop_search_index(apps, schema_editor):
+    if schema_editor.connection.vendor != 'sqlite':
+        return
+    with schema_editor.connection.cursor() as cursor:
+        cursor.execute(f"DROP TABLE IF EXISTS {FTS_TABLE}")
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('ecomm', '0005_order_checkout_token'),
+    ]
+
+    operations = [
+        migrations.RunPython(create_search_index, drop_search_index),
+    ]
@@ -0,0 +1,61 @@
+# Generated by Django 5.1.7 on 2026-10-18 10:17
+
+from django.db import migrations, models
+from django.db.models import Count, Sum
+from django.db.models.functions import TruncDate
+
+
+def backfill_stats(apps, schema_editor):
+    Order = apps.get_model('ecomm', 'Order')
+    Reservation = apps.get_model('ecomm', 'Reservation')
+    StatCounter = apps.get_model('ecomm', 'StatCounter')
+    DailyStat = apps.get_model('ecomm', 'DailyStat')
+
+    totals = Order.objects.aggregate(count=Count('id'), amount=Sum('total_amount'))
+    counters = {'orders:total': StatCounter(key='orders:total', count=totals['count'], amount=totals['amount'] or 0)}
+    for status, _ in Order._meta.get_field('status').choices:
+        counters[f'orders:{status}'] = StatCounter(key=f'orders:{status}')
+    for status, _ in Reservation._meta.get_field('status').choices:
+        counters[f'reservations:{status}'] = StatCounter(key=f'reservations:{status}')
+    for row in Order.objects.order_by().values('status').annotate(count=Count('id'), amount=Sum('total_amount')):
+        counters[f"orders:{row['status']}"] = StatCounter(key=f"orders:{row['status']}", count=row['count'], amount=row['amount'] or 0)
+    for row in Reservation.objects.order_by().values('status').annotate(count=Count('id')):
+        counters[f"reservations:{row['status']}"] = StatCounter(key=f"reservations:{row['status']}", count=row['count'])
+    StatCounter.objects.bulk_create(counters.values())
+
+    days = {}
+    orders = Order.objects.order_by().annotate(day=TruncDate('created_at'))
+    for row in orders.values('day').annotate(count=Count('id')):
+        days[row['day']] = DailyStat(date=row['day'], order_count=row['count'])
+    for row in orders.filter(status='delivered').values('day').annotate(revenue=Sum('total_amount')):
+        days[row['day']].revenue = row['revenue'] or 0
+    DailyStat.objects.bulk_create(days.values())
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('ecomm', '0006_menuitem_search_index'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='DailyStat',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('date', models.DateField(unique=True)),
+                ('order_count', models.PositiveIntegerField(default=0)),
+                ('revenue', models.DecimalField(decimal_places=2, default=0, max_digits=14)),
+            ],
+        ),
+        migrations.CreateModel(
+            name='StatCounter',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('key', models.CharField(max_length=50, unique=True)),
+                ('count', models.BigIntegerField(default=0)),
+                ('amount', models.DecimalField(decimal_places=2, default=0, max_digits=14)),
+            ],
+        ),
+        migrations.RunPython(backfill_stats, migrations.RunPython.noop),
+    ]
@@ -0,0 +1,77 @@
+# Generated by Django 5.1.7 on 2026-10-18 10:19
+
+from django.conf import settings
+from django.db import migrations, models
+from django.db.models import Count, Sum
+
+
+def merge_duplicate_cart_items(apps, schema_editor):
+    # Fusionne les lignes en double d'un même plat avant la contrainte d'unicité
+    CartItem = apps.get_model('ecomm', 'CartItem')
+    duplicates = (
+        CartItem.objects.order_by().values('cart', 'menu_item')
+        .annotate(lines=Count('id'), quantity=Sum('quantity'))
+        .filter(lines__gt=1)
+    )
+    for row in duplicates:
+        lines = CartItem.objects.filter(cart=row['cart'], menu_item=row['menu_item']).order_by('id')
+        keep = lines.first()
+        lines.exclude(id=keep.id).delete()
+        keep.quantity = row['quantity']
+        keep.save(update_fields=['quantity'])
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('ecomm', '0007_dashboard_stats'),
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+    ]
+
+    operations = [
+        migrations.RunPython(merge_duplicate_cart_items, migrations.RunPython.noop),
+        migrations.AddIndex(
+            model_name='menuitem',
+            index=models.Index(condition=models.Q(('is_available', True)), fields=['name'], name='menuitem_avail_name_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='menuitem',
+            index=models.Index(condition=models.Q(('is_available', True)), fields=['price'], name='menuitem_avail_price_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='menuitem',
+            index=models.Index(condition=models.Q(('is_available', True)), fields=['category', 'name'], name='menuitem_avail_cat_name_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='menuitem',
+            index=models.Index(condition=models.Q(('is_available', True)), fields=['category', 'price'], name='menuitem_avail_cat_price_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='order',
+            index=models.Index(fields=['user', '-created_at'], name='order_user_created_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='order',
+            index=models.Index(fields=['-created_at'], name='order_created_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='order',
+            index=models.Index(fields=['status'], name='order_status_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='reservation',
+            index=models.Index(fields=['date', 'time'], name='reservation_date_time_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='reservation',
+            index=models.Index(fields=['status'], name='reservation_status_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='reservation',
+            index=models.Index(fields=['user', '-date'], name='reservation_user_date_idx'),
+        ),
+        migrations.AddConstraint(
+            model_name='cartitem',
+            constraint=models.UniqueConstraint(fields=('cart', 'menu_item'), name='unique_cart_menu_item'),
+        ),
+    ]
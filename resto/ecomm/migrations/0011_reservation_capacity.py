@@ -0,0 +1,66 @@
+# Generated by Django 5.1.7 on 2026-10-18 11:14
+
+from datetime import date, datetime, timedelta
+
+from django.db import migrations, models
+from django.db.models import Sum
+
+# Valeurs figées à la création de la migration (ecomm.capacity et
+# settings.RESERVATION_SLOTS / RESERVATION_DURATION peuvent changer depuis)
+ACTIVE_STATUSES = ('pending', 'confirmed')
+SLOTS = ('12:00', '12:30', '13:00', '13:30', '19:00', '19:30', '20:00', '20:30', '21:00')
+DURATION = 90  # minutes
+
+
+def covered_slots(start):
+    # Créneaux qui débutent pendant un repas commençant à `start`
+    begin = datetime.combine(date.min, start)
+    end = begin + timedelta(minutes=DURATION)
+    slots = [datetime.combine(date.min, datetime.strptime(value, '%H:%M').time()) for value in SLOTS]
+    return [slot.time() for slot in slots if begin <= slot < end]
+
+
+def backfill_occupancy(apps, schema_editor):
+    Reservation = apps.get_model('ecomm', 'Reservation')
+    SlotOccupancy = apps.get_model('ecomm', 'SlotOccupancy')
+
+    occupancy = {}
+    reservations = Reservation.objects.filter(status__in=ACTIVE_STATUSES).order_by()
+    for row in reservations.values('date', 'time').annotate(guests=Sum('number_of_guests')):
+        for slot in covered_slots(row['time']):
+            occupancy[row['date'], slot] = occupancy.get((row['date'], slot), 0) + row['guests']
+    SlotOccupancy.objects.bulk_create(
+        SlotOccupancy(date=day, time=slot, seats=seats) for (day, slot), seats in occupancy.items()
+    )
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('ecomm', '0010_task_queue'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='DiningTable',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('name', models.CharField(max_length=50, unique=True)),
+                ('seats', models.PositiveSmallIntegerField()),
+                ('is_active', models.BooleanField(default=True)),
+            ],
+        ),
+        migrations.CreateModel(
+            name='SlotOccupancy',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('date', models.DateField()),
+                ('time', models.TimeField()),
+                ('seats', models.PositiveIntegerField(default=0)),
+            ],
+            options={
+                'constraints': [models.UniqueConstraint(fields=('date', 'time'), name='slot_occupancy_date_time_uniq')],
+            },
+        ),
+        migrations.RunPython(backfill_occupancy, migrations.RunPython.noop),
+    ]
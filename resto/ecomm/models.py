@@ -1,6 +1,12 @@
 from django.db import models
+from django.db.models import ExpressionWrapper, F, OuterRef, Q, Subquery, Sum, Value
+from django.db.models.functions import Coalesce
+from django.utils import timezone
 from django.contrib.auth.models import User
 from decimal import Decimal
+from .db import delete_returning, update_returning
+
+DELIVERY_FEE = Decimal('1000')  # 1000 F CFA de frais de livraison
 
 class Category(models.Model):
     name = models.CharField(max_length=100)
@@ -17,37 +23,125 @@ class MenuItem(models.Model):
     description = models.TextField()
     price = models.DecimalField(max_digits=10, decimal_places=2)
     image = models.ImageField(upload_to='menu_items/', blank=True, null=True)
+    # Variantes redimensionnées de l'image (voir ecomm.images), vides tant qu'elles ne sont pas dérivées
+    image_variants = models.JSONField(default=dict, blank=True, editable=False)
     category = models.ForeignKey(Category, on_delete=models.CASCADE)
     is_available = models.BooleanField(default=True)
 
     def __str__(self):
         return self.name
 
+    class Meta:
+        # Menu public : plats disponibles, filtrés ou non par catégorie, triés par nom ou prix.
+        # Index partiels : seuls les plats disponibles y figurent (ignorés par MySQL)
+        indexes = [
+            models.Index(fields=['name'], condition=Q(is_available=True), name='menuitem_avail_name_idx'),
+            models.Index(fields=['price'], condition=Q(is_available=True), name='menuitem_avail_price_idx'),
+            models.Index(fields=['category', 'name'], condition=Q(is_available=True), name='menuitem_avail_cat_name_idx'),
+            models.Index(fields=['category', 'price'], condition=Q(is_available=True), name='menuitem_avail_cat_price_idx'),
+        ]
+
+def cart_line_total():
+    # Montant d'une ligne de panier (quantité × prix), calculé en SQL
+    return Sum(
+        F('quantity') * F('menu_item__price'),
+        output_field=models.DecimalField(max_digits=10, decimal_places=2),
+    )
+
+class CartQuerySet(models.QuerySet):
+    def refresh_totals(self):
+        # Recalcule les totaux dénormalisés de tous les paniers du queryset
+        # en une seule requête UPDATE, quel que soit le nombre de paniers
+        lines = CartItem.objects.filter(cart=OuterRef('pk')).order_by().values('cart')
+        subtotal = lines.annotate(subtotal=cart_line_total()).values('subtotal')
+        total_items = lines.annotate(total_items=Sum('quantity')).values('total_items')
+        return self.update(
+            total_amount=Coalesce(
+                Subquery(subtotal), Value(Decimal('0')),
+                output_field=models.DecimalField(max_digits=10, decimal_places=2),
+            ),
+            total_items=Coalesce(Subquery(total_items), Value(0)),
+        )
+
+    def adjust_totals(self, menu_item_id, quantity):
+        # Ajoute (ou retire, si négatif) `quantity` exemplaires d'un plat aux totaux,
+        # au prix actuel du plat, en une requête ; renvoie les nouveaux totaux
+        price = MenuItem.objects.filter(pk=menu_item_id).values('price')
+        rows = update_returning(
+            self, ['id', 'total_items', 'total_amount'],
+            total_items=F('total_items') + quantity,
+            total_amount=F('total_amount') + ExpressionWrapper(
+                Value(quantity) * Subquery(price),
+                output_field=models.DecimalField(max_digits=10, decimal_places=2),
+            ),
+            updated_at=timezone.now(),
+        )
+        return rows[0] if rows else None
+
 class Cart(models.Model):
     user = models.OneToOneField(User, on_delete=models.CASCADE)
     created_at = models.DateTimeField(auto_now_add=True)
     updated_at = models.DateTimeField(auto_now=True)
+    # Totaux dénormalisés, tenus à jour par refresh_totals() à chaque modification du panier
+    total_amount = models.DecimalField(max_digits=10, decimal_places=2, default=0)
+    total_items = models.PositiveIntegerField(default=0)
+
+    objects = CartQuerySet.as_manager()
+
+    def compute_totals(self):
+        # Sous-total et nombre d'articles en une seule requête d'agrégation
+        totals = self.cartitem_set.aggregate(
+            subtotal=cart_line_total(),
+            total_items=Sum('quantity'),
+        )
+        return totals['subtotal'] or Decimal('0'), totals['total_items'] or 0
+
+    def refresh_totals(self):
+        # À appeler dans la même transaction que la modification des lignes
+        self.total_amount, self.total_items = self.compute_totals()
+        self.save(update_fields=['total_amount', 'total_items', 'updated_at'])
+
+    def clear(self):
+        self.cartitem_set.all().delete()
+        self.total_amount = Decimal('0')
+        self.total_items = 0
+        self.save(update_fields=['total_amount', 'total_items', 'updated_at'])
 
     def get_total(self):
-        return sum(item.get_total() for item in self.cartitem_set.all())
+        return self.total_amount
 
     def get_total_items(self):
-        return self.cartitem_set.aggregate(total_items=models.Sum('quantity'))['total_items'] or 0
+        return self.total_items
 
     def get_subtotal(self):
-        return self.get_total()
+        return self.total_amount
 
     def get_delivery_fee(self):
-        return Decimal('1000')  # 1000 F CFA de frais de livraison
+        return DELIVERY_FEE
+
+class CartItemQuerySet(models.QuerySet):
+    def add_quantity(self, delta):
+        # quantity += delta en une requête, sans lecture préalable ; renvoie les lignes modifiées
+        return update_returning(self, ['id', 'quantity', 'menu_item_id'], quantity=F('quantity') + delta)
+
+    def delete_returning(self):
+        return delete_returning(self, ['id', 'quantity', 'menu_item_id'])
 
 class CartItem(models.Model):
     cart = models.ForeignKey(Cart, on_delete=models.CASCADE)
     menu_item = models.ForeignKey(MenuItem, on_delete=models.CASCADE)
     quantity = models.PositiveIntegerField(default=1)
 
+    objects = CartItemQuerySet.as_manager()
+
     def get_total(self):
         return self.menu_item.price * self.quantity
 
+    class Meta:
+        constraints = [
+            models.UniqueConstraint(fields=['cart', 'menu_item'], name='unique_cart_menu_item'),
+        ]
+
 class Contact(models.Model):
     name = models.CharField(max_length=100)
     email = models.EmailField()
@@ -73,12 +167,24 @@ class Order(models.Model):
     total_amount = models.DecimalField(max_digits=10, decimal_places=2)
     delivery_address = models.TextField(blank=True)
     phone_number = models.CharField(max_length=20)
+    # Jeton du formulaire de commande, unique par client : empêche les doubles soumissions
+    checkout_token = models.CharField(max_length=32, null=True, blank=True, editable=False)
     created_at = models.DateTimeField(auto_now_add=True)
     updated_at = models.DateTimeField(auto_now=True)
 
     def __str__(self):
         return f"Commande #{self.id} - {self.user.username}"
 
+    class Meta:
+        indexes = [
+            models.Index(fields=['user', '-created_at'], name='order_user_created_idx'),
+            models.Index(fields=['-created_at'], name='order_created_idx'),
+            models.Index(fields=['status'], name='order_status_idx'),
+        ]
+        constraints = [
+            models.UniqueConstraint(fields=['user', 'checkout_token'], name='order_user_checkout_token_uniq'),
+        ]
+
 class OrderItem(models.Model):
     order = models.ForeignKey(Order, on_delete=models.CASCADE)
     menu_item = models.ForeignKey(MenuItem, on_delete=models.CASCADE)
@@ -106,3 +212,114 @@ class Reservation(models.Model):
 
     def __str__(self):
         return f"Réservation de {self.user.username} pour {self.number_of_guests} personnes le {self.date}"
+
+    class Meta:
+        indexes = [
+            models.Index(fields=['date', 'time'], name='reservation_date_time_idx'),
+            models.Index(fields=['status'], name='reservation_status_idx'),
+            models.Index(fields=['user', '-date'], name='reservation_user_date_idx'),
+        ]
+
+class DiningTable(models.Model):
+    # Table de la salle ; la somme des couverts des tables actives fixe la capacité d'un créneau
+    name = models.CharField(max_length=50, unique=True)
+    seats = models.PositiveSmallIntegerField()
+    is_active = models.BooleanField(default=True)
+
+    def __str__(self):
+        return f"{self.name} ({self.seats} couverts)"
+
+class SlotOccupancy(models.Model):
+    # Couverts réservés sur un créneau, tenus à jour par ecomm.capacity
+    date = models.DateField()
+    time = models.TimeField()
+    seats = models.PositiveIntegerField(default=0)
+
+    class Meta:
+        constraints = [
+            models.UniqueConstraint(fields=['date', 'time'], name='slot_occupancy_date_time_uniq'),
+        ]
+
+    def __str__(self):
+        return f"{self.date} {self.time:%H:%M} : {self.seats} couverts"
+
+class StatCounter(models.Model):
+    # Compteur dénormalisé du tableau de bord (ex. 'orders:pending'),
+    # mis à jour incrémentalement par ecomm.stats
+    key = models.CharField(max_length=50, unique=True)
+    count = models.BigIntegerField(default=0)
+    amount = models.DecimalField(max_digits=14, decimal_places=2, default=0)
+
+    def __str__(self):
+        return f"{self.key} = {self.count}"
+
+class DailyStat(models.Model):
+    # Commandes passées et chiffre d'affaires livré, par jour de commande
+    date = models.DateField(unique=True)
+    order_count = models.PositiveIntegerField(default=0)
+    revenue = models.DecimalField(max_digits=14, decimal_places=2, default=0)
+
+    def __str__(self):
+        return f"{self.date} : {self.order_count} commandes"
+
+class SalesRollup(models.Model):
+    # Ventes d'une heure de la journée (heure locale de la commande), hors
+    # commandes annulées ; tenu à jour par ecomm.analytics
+    date = models.DateField()
+    hour = models.PositiveSmallIntegerField()
+    order_count = models.IntegerField(default=0)
+    revenue = models.DecimalField(max_digits=14, decimal_places=2, default=0)
+
+    class Meta:
+        constraints = [
+            models.UniqueConstraint(fields=['date', 'hour'], name='sales_rollup_date_hour_uniq'),
+        ]
+
+    def __str__(self):
+        return f"{self.date} {self.hour}h : {self.order_count} commandes"
+
+class ItemSalesRollup(models.Model):
+    # Ventes d'un plat sur une journée ; la catégorie est celle du plat au moment de la vente
+    date = models.DateField()
+    menu_item = models.ForeignKey(MenuItem, on_delete=models.CASCADE)
+    category = models.ForeignKey(Category, on_delete=models.CASCADE)
+    quantity = models.IntegerField(default=0)
+    revenue = models.DecimalField(max_digits=14, decimal_places=2, default=0)
+    order_count = models.IntegerField(default=0)
+
+    class Meta:
+        constraints = [
+            models.UniqueConstraint(fields=['date', 'menu_item'], name='item_sales_rollup_date_item_uniq'),
+        ]
+
+    def __str__(self):
+        return f"{self.date} {self.menu_item_id} : {self.quantity}"
+
+class Task(models.Model):
+    # Tâche différée (suppression de fichiers, dérivation d'images...), exécutée
+    # par `manage.py run_tasks` ; voir ecomm.tasks. Supprimée une fois réussie.
+    STATUS_CHOICES = [
+        ('pending', 'En attente'),
+        ('running', 'En cours'),
+        ('failed', 'Échouée'),
+    ]
+
+    name = models.CharField(max_length=100)
+    args = models.JSONField(default=list, blank=True)
+    kwargs = models.JSONField(default=dict, blank=True)
+    status = models.CharField(max_length=10, choices=STATUS_CHOICES, default='pending')
+    attempts = models.PositiveIntegerField(default=0)
+    max_attempts = models.PositiveIntegerField(default=5)
+    run_at = models.DateTimeField(default=timezone.now)
+    locked_at = models.DateTimeField(null=True, blank=True)
+    last_error = models.TextField(blank=True)
+    created_at = models.DateTimeField(auto_now_add=True)
+
+    class Meta:
+        indexes = [
+            models.Index(fields=['run_at'], condition=Q(status='pending'), name='task_pending_run_at_idx'),
+            models.Index(fields=['status', 'locked_at'], name='task_status_locked_idx'),
+        ]
+
+    def __str__(self):
+        return f"{self.name} ({self.get_status_display()})"
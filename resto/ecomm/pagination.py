@@ -0,0 +1,104 @@
+from datetime import date, datetime
+from decimal import Decimal
+
+from django.core import signing
+from django.db.models import Q
+
+# Pagination par curseur (keyset) : au lieu d'un OFFSET qui oblige la base à
+# parcourir toutes les lignes précédentes, chaque page reprend après la clé de
+# tri de la dernière ligne vue. Le coût d'une page ne dépend donc pas de sa
+# position. Le dernier champ du tri doit être unique (en pratique 'id').
+# Le curseur signé contient aussi le tri : rejoué avec un autre tri, il
+# comparerait des valeurs d'un champ à un autre, il est donc refusé.
+
+CURSOR_SALT = 'ecomm.pagination'
+
+
+class InvalidCursor(ValueError):
+    pass
+
+
+class KeysetPage:
+    def __init__(self, items, next_cursor):
+        self.items = items
+        self.next_cursor = next_cursor
+
+    def __iter__(self):
+        return iter(self.items)
+
+    def __len__(self):
+        return len(self.items)
+
+    @property
+    def has_next(self):
+        return self.next_cursor is not None
+
+
+def _serialize(value):
+    if isinstance(value, (datetime, date)):
+        return value.isoformat()
+    if isinstance(value, Decimal):
+        return str(value)
+    return value
+
+
+def encode_cursor(ordering, values):
+    payload = {'o': list(ordering), 'v': [_serialize(v) for v in values]}
+    return signing.dumps(payload, salt=CURSOR_SALT, compress=True)
+
+
+def decode_cursor(token, ordering):
+    try:
+        payload = signing.loads(token, salt=CURSOR_SALT)
+    except signing.BadSignature:
+        raise InvalidCursor("Curseur invalide")
+    if not isinstance(payload, dict) or payload.get('o') != list(ordering):
+        raise InvalidCursor("Curseur invalide pour ce tri")
+    values = payload.get('v')
+    if not isinstance(values, list) or len(values) != len(ordering):
+        raise InvalidCursor("Curseur invalide")
+    return values
+
+
+def _after(ordering, values):
+    # (a, b, id) > (va, vb, vid), en respectant le sens de chaque champ
+    condition = Q()
+    for i in reversed(range(len(ordering))):
+        field = ordering[i].lstrip('-')
+        lookup = 'lt' if ordering[i].startswith('-') else 'gt'
+        strictly_after = Q(**{f'{field}__{lookup}': values[i]})
+        condition = strictly_after if i == len(ordering) - 1 else strictly_after | (Q(**{field: values[i]}) & condition)
+    return condition
+
+
+def _page_queryset(queryset, ordering, cursor, per_page):
+    if cursor:
+        queryset = queryset.filter(_after(ordering, decode_cursor(cursor, ordering)))
+    return queryset.order_by(*ordering)[:per_page + 1]
+
+
+def _make_page(rows, ordering, per_page, key):
+    items = rows[:per_page]
+    next_cursor = None
+    if len(rows) > per_page:
+        last = items[-1]
+        if key is None:
+            values = [getattr(last, field.lstrip('-')) for field in ordering]
+        else:
+            values = key(last)
+        next_cursor = encode_cursor(ordering, values)
+    return KeysetPage(items, next_cursor)
+
+
+def keyset_page(queryset, ordering, cursor=None, per_page=12, key=None):
+    # key(obj) renvoie les valeurs de tri d'un objet ; par défaut les attributs du même nom
+    ordering = list(ordering)
+    rows = list(_page_queryset(queryset, ordering, cursor, per_page))
+    return _make_page(rows, ordering, per_page, key)
+
+
+async def akeyset_page(queryset, ordering, cursor=None, per_page=12, key=None):
+    # Variante asynchrone de keyset_page(), pour les vues async
+    ordering = list(ordering)
+    rows = [row async for row in _page_queryset(queryset, ordering, cursor, per_page)]
+    return _make_page(rows, ordering, per_page, key)
@@ -0,0 +1,170 @@
+from contextlib import contextmanager
+from contextvars import ContextVar
+from functools import wraps
+
+from asgiref.sync import iscoroutinefunction, markcoroutinefunction
+from django.conf import settings
+from django.db import DEFAULT_DB_ALIAS, connections
+
+# Lectures sur réplique (REPLICA_DATABASE). Par défaut, tout passe par la base
+# principale : seules les vues marquées par replica_reads lisent la réplique,
+# et seulement tant que la requête n'a rien écrit ni ouvert de transaction.
+# Un client qui vient d'écrire reçoit un cookie : pendant REPLICA_PIN_SECONDS,
+# ses requêtes relisent la base principale (commande confirmée, historique,
+# tableau de bord après un changement de statut), le temps que la réplique
+# rattrape son retard.
+
+PIN_COOKIE = 'db_primary'
+
+# Modèles toujours lus sur la base principale : une session absente de la
+# réplique (connexion récente) serait prise pour une session expirée, et son
+# cookie effacé
+PRIMARY_MODELS = {'sessions.session'}
+
+_state = ContextVar('database_routing', default=None)
+
+
+class Routing:
+    # État de la requête en cours : base de lecture (None : principale) et écriture faite
+    def __init__(self, pinned=False):
+        self.pinned = pinned
+        self.reads = None
+        self.wrote = False
+
+
+class ReplicaRouter:
+    def db_for_read(self, model, **hints):
+        state = _state.get()
+        if state is None or state.reads is None or state.wrote:
+            return None
+        if model._meta.label_lower in PRIMARY_MODELS:
+            return None
+        # Dans une transaction, on relit ce qu'on a écrit : base principale
+        if connections[DEFAULT_DB_ALIAS].in_atomic_block:
+            return None
+        return state.reads
+
+    def db_for_write(self, model, **hints):
+        state = _state.get()
+        if state is not None:
+            state.wrote = True
+        return DEFAULT_DB_ALIAS
+
+    def allow_relation(self, obj1, obj2, **hints):
+        return True
+
+    def allow_migrate(self, db, app_label, model_name=None, **hints):
+        # La réplique reçoit le schéma de la base principale
+        return db != settings.REPLICA_DATABASE
+
+
+def use_replica():
+    # Les lectures suivantes de la requête en cours passent par la réplique, si possible
+    state = _state.get()
+    if state is not None and not state.pinned and settings.REPLICA_DATABASE:
+        state.reads = settings.REPLICA_DATABASE
+
+
+@contextmanager
+def primary():
+    # Lectures sur la base principale dans le bloc, par exemple pour remplir un
+    # cache partagé : une réplique en retard y laisserait des données périmées
+    token = _state.set(None)
+    try:
+        yield
+    finally:
+        _state.reset(token)
+
+
+def replica_reads(view):
+    """
+    Vue de consultation (sync ou async) : ses lectures passent par la réplique,
+    sauf pour un client qui vient d'écrire ou après une écriture dans la vue.
+    """
+    if iscoroutinefunction(view):
+        @wraps(view)
+        async def wrapper(request, *args, **kwargs):
+            use_replica()
+            return await view(request, *args, **kwargs)
+    else:
+        @wraps(view)
+        def wrapper(request, *args, **kwargs):
+            use_replica()
+            return view(request, *args, **kwargs)
+    return wrapper
+
+
+def _in_context(state, chunks):
+    # Une réponse en flux est produite après la vue : chaque morceau est lu avec l'état de la requête
+    iterator = iter(chunks)
+    while True:
+        token = _state.set(state)
+        try:
+            chunk = next(iterator)
+        except StopIteration:
+            return
+        finally:
+            _state.reset(token)
+        yield chunk
+
+
+async def _ain_context(state, chunks):
+    iterator = aiter(chunks)
+    while True:
+        token = _state.set(state)
+        try:
+            chunk = await anext(iterator)
+        except StopAsyncIteration:
+            return
+        finally:
+            _state.reset(token)
+        yield chunk
+
+
+class ReplicaMiddleware:
+    """
+    Porte l'état de routage de chaque requête et pose le cookie PIN_COOKIE
+    après une écriture. Sans réplique configurée, n'intervient pas.
+    """
+    sync_capable = True
+    async_capable = True
+
+    def __init__(self, get_response):
+        self.get_response = get_response
+        if iscoroutinefunction(get_response):
+            markcoroutinefunction(self)
+
+    def __call__(self, request):
+        if iscoroutinefunction(self):
+            return self.__acall__(request)
+        if not settings.REPLICA_DATABASE:
+            return self.get_response(request)
+        state = Routing(pinned=PIN_COOKIE in request.COOKIES)
+        token = _state.set(state)
+        try:
+            response = self.get_response(request)
+        finally:
+            _state.reset(token)
+        return self.finish(response, state)
+
+    async def __acall__(self, request):
+        if not settings.REPLICA_DATABASE:
+            return await self.get_response(request)
+        state = Routing(pinned=PIN_COOKIE in request.COOKIES)
+        token = _state.set(state)
+        try:
+            response = await self.get_response(request)
+        finally:
+            _state.reset(token)
+        return self.finish(response, state)
+
+    @staticmethod
+    def finish(response, state):
+        if response.streaming:
+            wrap = _ain_context if response.is_async else _in_context
+            response.streaming_content = wrap(state, response.streaming_content)
+        if state.wrote:
+            response.set_cookie(
+                PIN_COOKIE, '1', max_age=settings.REPLICA_PIN_SECONDS, httponly=True, samesite='Lax',
+            )
+        return response
@@ -0,0 +1,220 @@
+import bisect
+import re
+import threading
+import unicodedata
+
+from django.db import connection, transaction
+from django.db.models import Case, IntegerField, When
+
+from . import catalog
+from .models import MenuItem
+
+# Recherche plein texte sur les plats. Les textes sont tokenisés et débarrassés
+# de leurs accents ("braisé" -> "braise"), chaque mot de la requête est traité
+# comme un préfixe et tous doivent être présents ; le nom pèse plus que la
+# description dans le classement.
+#
+# Sur SQLite, l'index est une table virtuelle FTS5 maintenue par les signaux
+# (créée par la migration 0006, avec un classement BM25 aux mêmes poids).
+# Sur les autres bases, un index inversé en mémoire est construit par processus
+# et reconstruit dès que la version du catalogue change.
+FTS_TABLE = 'ecomm_menuitem_fts'
+NAME_WEIGHT = 10
+DESCRIPTION_WEIGHT = 1
+
+_token_re = re.compile(r'\w+')
+
+
+def fold(text):
+    text = unicodedata.normalize('NFKD', text or '')
+    return ''.join(c for c in text if not unicodedata.combining(c)).lower()
+
+
+def tokenize(text):
+    return _token_re.findall(fold(text))
+
+
+def uses_fts():
+    return connection.vendor == 'sqlite'
+
+
+# SQLite FTS5
+
+def fts_query(tokens):
+    return ' '.join(f'"{token}"*' for token in tokens)
+
+
+class MemoryIndex:
+    # Index inversé : mot -> {id du plat: poids}. Le vocabulaire trié permet
+    # de retrouver par bisection tous les mots commençant par un préfixe.
+    def __init__(self):
+        self.postings = {}
+        self.vocabulary = []
+        self.documents = {}
+        self.version = None
+        self.lock = threading.RLock()
+
+    def add(self, item_id, name, description):
+        with self.lock:
+            self.remove(item_id)
+            weights = {}
+            for token in tokenize(description):
+                weights[token] = weights.get(token, 0) + DESCRIPTION_WEIGHT
+            for token in tokenize(name):
+                weights[token] = weights.get(token, 0) + NAME_WEIGHT
+            self.documents[item_id] = weights
+            for token, weight in weights.items():
+                if token not in self.postings:
+                    self.postings[token] = {}
+                    bisect.insort(self.vocabulary, token)
+                self.postings[token][item_id] = weight
+
+    def remove(self, item_id):
+        with self.lock:
+            for token in self.documents.pop(item_id, {}):
+                posting = self.postings[token]
+                posting.pop(item_id, None)
+                if not posting:
+                    del self.postings[token]
+                    del self.vocabulary[bisect.bisect_left(self.vocabulary, token)]
+
+    def clear(self):
+        with self.lock:
+            self.postings, self.vocabulary, self.documents = {}, [], {}
+
+    def _prefix_scores(self, prefix):
+        scores = {}
+        start = bisect.bisect_left(self.vocabulary, prefix)
+        for token in self.vocabulary[start:]:
+            if not token.startswith(prefix):
+                break
+            for item_id, weight in self.postings[token].items():
+                # Un mot complet compte plus qu'un simple préfixe
+                weight *= 2 if token == prefix else 1
+                scores[item_id] = max(scores.get(item_id, 0), weight)
+        return scores
+
+    def search(self, tokens):
+        # Identifiants des plats contenant tous les mots, du plus pertinent au moins pertinent
+        with self.lock:
+            totals = None
+            for token in tokens:
+                scores = self._prefix_scores(token)
+                if totals is None:
+                    totals = scores
+                else:
+                    totals = {i: totals[i] + s for i, s in scores.items() if i in totals}
+                if not totals:
+                    return []
+            return sorted(totals or {}, key=lambda i: (-totals[i], i))
+
+
+memory_index = MemoryIndex()
+
+
+def _memory_index():
+    version = catalog.get_version()
+    if memory_index.version != version:
+        rebuild()
+        memory_index.version = version
+    return memory_index
+
+
+# Maintenance de l'index
+
+def index_item(item):
+    if uses_fts():
+        with connection.cursor() as cursor:
+            cursor.execute(f"DELETE FROM {FTS_TABLE} WHERE rowid = %s", [item.id])
+            cursor.execute(
+                f"INSERT INTO {FTS_TABLE}(rowid, name, description) VALUES (%s, %s, %s)",
+                [item.id, item.name, item.description],
+            )
+    elif memory_index.version is not None:
+        def add():
+            memory_index.add(item.id, item.name, item.description)
+            _follow_version()
+
+        # Après l'incrément de version, enregistré avant par les signaux
+        transaction.on_commit(add)
+
+
+def unindex_item(item_id):
+    if uses_fts():
+        with connection.cursor() as cursor:
+            cursor.execute(f"DELETE FROM {FTS_TABLE} WHERE rowid = %s", [item_id])
+    elif memory_index.version is not None:
+        def remove():
+            memory_index.remove(item_id)
+            _follow_version()
+
+        transaction.on_commit(remove)
+
+
+def _follow_version():
+    # L'index vient d'intégrer la modification qui a incrémenté la version du
+    # catalogue : il reste valide si aucune autre modification n'a eu lieu
+    version = catalog.get_version()
+    if memory_index.version == version - 1:
+        memory_index.version = version
+
+
+def rebuild():
+    # Reconstruit l'index complet, par exemple après un bulk_create
+    rows = MenuItem.objects.values_list('id', 'name', 'description').iterator(chunk_size=2000)
+    if uses_fts():
+        with connection.cursor() as cursor:
+            cursor.execute(f"DELETE FROM {FTS_TABLE}")
+            batch = []
+            for row in rows:
+                batch.append(row)
+                if len(batch) >= 2000:
+                    cursor.executemany(
+                        f"INSERT INTO {FTS_TABLE}(rowid, name, description) VALUES (%s, %s, %s)", batch
+                    )
+                    batch = []
+            if batch:
+                cursor.executemany(
+                    f"INSERT INTO {FTS_TABLE}(rowid, name, description) VALUES (%s, %s, %s)", batch
+                )
+            cursor.execute(f"INSERT INTO {FTS_TABLE}({FTS_TABLE}) VALUES ('optimize')")
+    else:
+        with memory_index.lock:
+            memory_index.clear()
+            for item_id, name, description in rows:
+                memory_index.add(item_id, name, description)
+
+
+# Recherche
+
+def search(queryset, query, rank=True):
+    # Restreint un queryset de MenuItem aux plats correspondant à la requête ;
+    # avec rank=True, les résultats sont triés par pertinence
+    tokens = tokenize(query)
+    if not tokens:
+        return queryset.none()
+
+    if uses_fts():
+        # Jointure avec la table FTS : le moteur part des documents trouvés
+        # par MATCH et lit leur score BM25 sans sous-requête par ligne
+        table = MenuItem._meta.db_table
+        queryset = queryset.extra(
+            tables=[FTS_TABLE],
+            where=[f'{FTS_TABLE}.rowid = {table}.id', f'{FTS_TABLE} MATCH %s'],
+            params=[fts_query(tokens)],
+        )
+        if rank:
+            queryset = queryset.extra(
+                select={'search_rank': f'{FTS_TABLE}.rank'},
+                order_by=['search_rank', 'name'],
+            )
+        return queryset
+
+    ids = _memory_index().search(tokens)
+    queryset = queryset.filter(id__in=ids)
+    if rank and ids:
+        queryset = queryset.annotate(search_rank=Case(
+            *[When(id=item_id, then=position) for position, item_id in enumerate(ids)],
+            output_field=IntegerField(),
+        )).order_by('search_rank')
+    return queryset
@@ -0,0 +1,120 @@
+from django.db.backends.signals import connection_created
+from django.db.models.signals import post_delete, post_init, post_save, pre_delete, pre_save
+from django.db import transaction
+from django.dispatch import receiver
+from . import calendar_feed, catalog, images, instrumentation, search, stats
+from . import cart as cart_ops
+from .models import Cart, Category, MenuItem, Order, Reservation
+
+
+# Les totaux des paniers sont dénormalisés : un changement de prix ou la
+# suppression d'un article doit être répercuté sur les paniers qui le contiennent.
+
+@receiver(post_save, sender=MenuItem)
+def refresh_carts_on_menu_item_save(sender, instance, created, **kwargs):
+    if not created:
+        Cart.objects.filter(cartitem__menu_item=instance).refresh_totals()
+
+@receiver(pre_delete, sender=MenuItem)
+def remember_carts_on_menu_item_delete(sender, instance, **kwargs):
+    instance._affected_carts = dict(
+        Cart.objects.filter(cartitem__menu_item=instance).values_list('id', 'user_id')
+    )
+
+@receiver(post_delete, sender=MenuItem)
+def refresh_carts_on_menu_item_delete(sender, instance, **kwargs):
+    carts = getattr(instance, '_affected_carts', None)
+    if carts:
+        Cart.objects.filter(id__in=list(carts)).refresh_totals()
+        cart_ops.bump_version(*carts.values())  # Compteurs du header
+
+
+# Toute modification du catalogue invalide le cache de lecture, après
+# validation : une lecture concurrente ne peut pas ranger l'ancien catalogue
+# sous la nouvelle version
+
+@receiver(post_save, sender=MenuItem)
+@receiver(post_delete, sender=MenuItem)
+@receiver(post_save, sender=Category)
+@receiver(post_delete, sender=Category)
+def bump_catalog_version(sender, **kwargs):
+    transaction.on_commit(catalog.bump_version)
+
+
+# Miniatures et variantes WebP, dérivées en arrière-plan après chaque nouvel envoi de photo
+
+@receiver(post_save, sender=MenuItem)
+def derive_menu_item_images(sender, instance, **kwargs):
+    if instance.image and not images.is_current(instance):
+        images.schedule(instance)
+
+
+# Index de recherche (l'index en mémoire suit l'incrément de version ci-dessus)
+
+@receiver(post_save, sender=MenuItem)
+def index_menu_item(sender, instance, **kwargs):
+    search.index_item(instance)
+
+@receiver(post_delete, sender=MenuItem)
+def unindex_menu_item(sender, instance, **kwargs):
+    search.unindex_item(instance.id)
+
+
+# Calendrier des réservations : seule la semaine de la réservation est invalidée
+
+@receiver(post_save, sender=Reservation)
+@receiver(post_delete, sender=Reservation)
+def invalidate_calendar_week(sender, instance, **kwargs):
+    calendar_feed.invalidate(instance.date)
+
+
+# Compteurs du tableau de bord (ecomm.stats) : chaque instance garde l'état
+# lu en base, comparé à l'état enregistré. Les vues, l'admin et les
+# suppressions en cascade (client supprimé) passent tous par ici.
+
+@receiver(post_init, sender=Order)
+def remember_order_state(sender, instance, **kwargs):
+    loaded = set(stats.ORDER_STATE_FIELDS) <= instance.__dict__.keys()
+    instance._stats_state = stats.order_state(instance) if loaded else None
+
+@receiver(pre_save, sender=Order)
+def load_order_state(sender, instance, **kwargs):
+    # Instance lue avec des champs différés : l'état est relu avant l'écriture
+    if instance._stats_state is None and instance.pk and not instance._state.adding:
+        instance._stats_state = Order.objects.filter(pk=instance.pk).values_list(*stats.ORDER_STATE_FIELDS).first()
+
+@receiver(post_save, sender=Order)
+def count_saved_order(sender, instance, created, **kwargs):
+    state = stats.order_state(instance)
+    stats.order_changed(None if created else instance._stats_state, state)
+    instance._stats_state = state
+
+@receiver(post_delete, sender=Order)
+def count_deleted_order(sender, instance, **kwargs):
+    stats.order_changed(stats.order_state(instance), None)
+
+@receiver(post_init, sender=Reservation)
+def remember_reservation_status(sender, instance, **kwargs):
+    instance._stats_status = instance.__dict__.get('status')
+
+@receiver(pre_save, sender=Reservation)
+def load_reservation_status(sender, instance, **kwargs):
+    if instance._stats_status is None and instance.pk and not instance._state.adding:
+        instance._stats_status = Reservation.objects.filter(pk=instance.pk).values_list('status', flat=True).first()
+
+@receiver(post_save, sender=Reservation)
+def count_saved_reservation(sender, instance, created, **kwargs):
+    stats.reservation_changed(None if created else instance._stats_status, instance.status)
+    instance._stats_status = instance.status
+
+@receiver(post_delete, sender=Reservation)
+def count_deleted_reservation(sender, instance, **kwargs):
+    stats.reservation_changed(instance.status, None)
+
+
+# Comptage des requêtes SQL des vues mesurées (ecomm.instrumentation), sur
+# toutes les connexions, y compris celles des threads de sync_to_async
+
+@receiver(connection_created)
+def instrument_connection(sender, connection, **kwargs):
+    instrumentation.install(connection)
@@ -0,0 +1 @@
+document.addEventListener('DOMContentLoaded',function(){const form=document.getElementById('orderForm');form.addEventListener('submit',function(e){const requiredFields=form.querySelectorAll('[required]');let isValid=true;requiredFields.forEach(field=>{if(!field.value.trim()){isValid=false;field.classList.add('is-invalid');}else{field.classList.remove('is-invalid');}});if(!isValid){e.preventDefault();alert('Veuillez remplir tous les champs obligatoires');}});});
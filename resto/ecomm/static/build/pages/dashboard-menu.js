@@ -0,0 +1,6 @@
+document.addEventListener('DOMContentLoaded',function(){document.querySelectorAll('.availability-toggle').forEach(toggle=>{toggle.addEventListener('change',function(){const itemId=this.dataset.itemId;const isAvailable=this.checked;fetch(`/dashboard/menu/${itemId}/availability/`,{method:'POST',headers:{'Content-Type':'application/x-www-form-urlencoded','X-CSRFToken':getCookie('csrftoken')},body:`is_available=${isAvailable}`}).then(response=>response.json()).then(data=>{if(data.success){const alert=document.createElement('div');alert.className='alert alert-success alert-dismissible fade show';alert.innerHTML=`
+                        Disponibilité mise à jour avec succès
+                        <button type="button" class="btn-close" data-bs-dismiss="alert" aria-label="Close"></button>
+                    `;document.querySelector('.content-wrapper').insertBefore(alert,document.querySelector('.content-wrapper').firstChild);}}).catch(error=>console.error('Error:',error));});});const categoryFilter=document.getElementById('categoryFilter');const availabilityFilter=document.getElementById('availabilityFilter');const searchInput=document.getElementById('searchInput');const tableRows=document.querySelectorAll('tbody tr');function filterTable(){const category=categoryFilter.value;const availability=availabilityFilter.value;const search=searchInput.value.toLowerCase();tableRows.forEach(row=>{const categoryMatch=!category||row.querySelector('td:nth-child(3)').textContent===categoryFilter.options[categoryFilter.selectedIndex].text;const availabilityMatch=!availability||row.querySelector('.availability-toggle').checked===(availability==='1');const searchMatch=!search||row.querySelector('td:nth-child(2)').textContent.toLowerCase().includes(search);row.style.display=categoryMatch&&availabilityMatch&&searchMatch?'':'none';});}
+categoryFilter.addEventListener('change',filterTable);availabilityFilter.addEventListener('change',filterTable);searchInput.addEventListener('input',filterTable);function getCookie(name){let cookieValue=null;if(document.cookie&&document.cookie!==''){const cookies=document.cookie.split(';');for(let i=0;i<cookies.length;i++){const cookie=cookies[i].trim();if(cookie.substring(0,name.length+1)===(name+'=')){cookieValue=decodeURIComponent(cookie.substring(name.length+1));break;}}}
+return cookieValue;}});
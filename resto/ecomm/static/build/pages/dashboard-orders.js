@@ -0,0 +1,25 @@
+document.addEventListener('DOMContentLoaded',function(){document.querySelectorAll('.status-select').forEach(select=>{select.addEventListener('change',function(){const orderId=this.dataset.orderId;const status=this.value;fetch(`/dashboard/orders/${orderId}/status/`,{method:'POST',headers:{'Content-Type':'application/x-www-form-urlencoded','X-CSRFToken':getCookie('csrftoken')},body:`status=${status}`}).then(response=>response.json()).then(data=>{if(data.success){const alert=document.createElement('div');alert.className='alert alert-success alert-dismissible fade show';alert.innerHTML=`
+                        Statut mis à jour avec succès
+                        <button type="button" class="btn-close" data-bs-dismiss="alert" aria-label="Close"></button>
+                    `;document.querySelector('.content-wrapper').insertBefore(alert,document.querySelector('.content-wrapper').firstChild);}}).catch(error=>console.error('Error:',error));});});function getCookie(name){let cookieValue=null;if(document.cookie&&document.cookie!==''){const cookies=document.cookie.split(';');for(let i=0;i<cookies.length;i++){const cookie=cookies[i].trim();if(cookie.substring(0,name.length+1)===(name+'=')){cookieValue=decodeURIComponent(cookie.substring(name.length+1));break;}}}
+return cookieValue;}
+document.querySelectorAll('.print-order').forEach(button=>{button.addEventListener('click',function(){const orderId=this.dataset.orderId;const modalContent=document.querySelector(`#orderModal${orderId} .modal-body`).cloneNode(true);const printWindow=window.open('','_blank');printWindow.document.write(`
+                <html>
+                <head>
+                    <title>Commande #${orderId}</title>
+                    <link href="https://cdn.jsdelivr.net/npm/bootstrap@5.1.3/dist/css/bootstrap.min.css" rel="stylesheet">
+                    <style>
+                        body { padding: 20px; }
+                        @media print {
+                            .no-print { display: none; }
+                        }
+                    </style>
+                </head>
+                <body>
+                    <div class="container">
+                        <h4 class="mb-4">Commande #${orderId}</h4>
+                        ${modalContent.innerHTML}
+                    </div>
+                </body>
+                </html>
+            `);printWindow.document.close();printWindow.print();});});});
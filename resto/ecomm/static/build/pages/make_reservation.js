@@ -0,0 +1,5 @@
+const availabilityUrl=document.currentScript.dataset.availabilityUrl;document.addEventListener('DOMContentLoaded',function(){const timeSlots=document.querySelectorAll('.time-slot');const timeInput=document.getElementById('time');timeSlots.forEach(slot=>{slot.addEventListener('click',function(){if(!this.classList.contains('disabled')){timeSlots.forEach(s=>s.classList.remove('selected'));this.classList.add('selected');timeInput.value=this.dataset.time;}});});const form=document.getElementById('reservationForm');form.addEventListener('submit',function(e){if(!timeInput.value){e.preventDefault();alert('Veuillez sélectionner un créneau horaire');}});const dateInput=document.getElementById('date');const guestsInput=document.getElementById('guests');function isPast(slot){const selectedDate=new Date(dateInput.value);const today=new Date();if(selectedDate.toDateString()!==today.toDateString()){return false;}
+const[hours,minutes]=slot.dataset.time.split(':').map(Number);return hours<today.getHours()||(hours===today.getHours()&&minutes<=today.getMinutes());}
+function refreshSlots(){if(!dateInput.value){return;}
+const params=new URLSearchParams({date:dateInput.value,guests:guestsInput.value||1});fetch(`${availabilityUrl}?${params}`).then(response=>response.json()).then(data=>{const available={};(data.slots||[]).forEach(slot=>available[slot.time]=slot.available);timeSlots.forEach(slot=>{const disabled=isPast(slot)||available[slot.dataset.time]===false;slot.classList.toggle('disabled',disabled);if(disabled&&slot.classList.contains('selected')){slot.classList.remove('selected');timeInput.value='';}});}).catch(error=>console.error('Error:',error));}
+dateInput.addEventListener('change',refreshSlots);guestsInput.addEventListener('change',refreshSlots);});
@@ -0,0 +1,4 @@
+const csrfToken=document.currentScript.dataset.csrfToken;document.addEventListener('DOMContentLoaded',function(){const forms=document.querySelectorAll('form[action^="/add-to-cart/"]');const notification=document.getElementById('notification');const notificationMessage=document.getElementById('notification-message');const cartCount=document.querySelector('.cart-count');forms.forEach(form=>{form.addEventListener('submit',function(e){e.preventDefault();const button=this.querySelector('.menu__button');const itemId=button.dataset.itemId;button.classList.add('adding');fetch(this.action,{method:'POST',headers:{'Content-Type':'application/x-www-form-urlencoded','X-CSRFToken':csrfToken},body:new URLSearchParams(new FormData(this))}).then(response=>response.json()).then(data=>{if(data.success){if(cartCount){cartCount.textContent=data.cart_count;}
+notificationMessage.textContent=data.message;button.classList.remove('adding');button.classList.add('success');notification.classList.add('show');setTimeout(()=>{notification.classList.remove('show');},2000);setTimeout(()=>{button.classList.remove('success');},1000);}}).catch(error=>{console.error('Error:',error);button.classList.remove('adding');notificationMessage.textContent="Une erreur est survenue";notification.style.backgroundColor='var(--first-color-alt)';notification.classList.add('show');setTimeout(()=>{notification.classList.remove('show');notification.style.backgroundColor='var(--first-color)';},2000);});});});function updateQueryString(key,value){const urlParams=new URLSearchParams(window.location.search);if(value){urlParams.set(key,value);}else{urlParams.delete(key);}
+const newUrl=`${window.location.pathname}?${urlParams.toString()}`;window.history.pushState({path:newUrl},'',newUrl);}
+const categorySelect=document.getElementById('category');categorySelect.addEventListener('change',function(){updateQueryString('category',this.value);document.querySelector('.menu__filters-group').submit();});const sortSelect=document.getElementById('sort');sortSelect.addEventListener('change',function(){updateQueryString('sort',this.value);document.querySelector('.menu__filters-group').submit();});let searchTimeout;const searchInput=document.getElementById('search');searchInput.addEventListener('input',function(){clearTimeout(searchTimeout);searchTimeout=setTimeout(()=>{updateQueryString('search',this.value);document.querySelector('.menu__filters-group').submit();},500);});const urlParams=new URLSearchParams(window.location.search);if(urlParams.has('category'))categorySelect.value=urlParams.get('category');if(urlParams.has('sort'))sortSelect.value=urlParams.get('sort');if(urlParams.has('search'))searchInput.value=urlParams.get('search');});
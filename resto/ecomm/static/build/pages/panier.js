@@ -0,0 +1,4 @@
+const csrfToken=document.currentScript.dataset.csrfToken;function updateQuantity(itemId,action){fetch(`/update-cart-item/${itemId}/`,{method:'POST',headers:{'Content-Type':'application/x-www-form-urlencoded','X-CSRFToken':csrfToken},body:`action=${action}`}).then(response=>response.json()).then(data=>{if(data.removed){const cartItem=document.querySelector(`.cart-item[data-item-id="${itemId}"]`);cartItem.remove();const remainingItems=document.querySelectorAll('.cart-item');if(remainingItems.length===0){location.reload();}}else{const cartItem=document.querySelector(`.cart-item[data-item-id="${itemId}"]`);cartItem.querySelector('.quantity-value').textContent=data.quantity;cartItem.querySelector('.item-total').textContent=`${data.total} F CFA`;document.querySelector('.summary-row.total span:last-child').textContent=`${data.cart_total} F CFA`;document.querySelector('.summary-row:first-child span:last-child').textContent=`${data.cart_total} F CFA`;}
+const cartCount=document.querySelector('.cart-count');if(cartCount&&data.cart_count!==undefined){cartCount.textContent=data.cart_count;}});}
+function removeItem(itemId){fetch(`/update-cart-item/${itemId}/`,{method:'POST',headers:{'Content-Type':'application/x-www-form-urlencoded','X-CSRFToken':csrfToken},body:'action=remove'}).then(response=>response.json()).then(data=>{const cartItem=document.querySelector(`.cart-item[data-item-id="${itemId}"]`);cartItem.remove();const remainingItems=document.querySelectorAll('.cart-item');if(remainingItems.length===0){location.reload();}else{document.querySelector('.summary-row.total span:last-child').textContent=`${data.cart_total} F CFA`;document.querySelector('.summary-row:first-child span:last-child').textContent=`${data.cart_total} F CFA`;}
+const cartCount=document.querySelector('.cart-count');if(cartCount){cartCount.textContent=data.cart_count;}}).catch(error=>{console.error('Error:',error);alert('Une erreur est survenue lors de la suppression de l\'article');});}
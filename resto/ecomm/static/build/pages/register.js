@@ -0,0 +1,4 @@
+document.getElementById('registerForm').addEventListener('submit',function(e){let valid=true;document.getElementById('usernameError').textContent='';document.getElementById('emailError').textContent='';document.getElementById('passwordError').textContent='';const username=document.getElementById('username').value.trim();if(username.length<3){document.getElementById('usernameError').textContent="Le nom d'utilisateur doit contenir au moins 3 caractères.";valid=false;}
+const email=document.getElementById('email').value.trim();const emailPattern=/^[^\s@]+@[^\s@]+\.[^\s@]+$/;if(!emailPattern.test(email)){document.getElementById('emailError').textContent="Veuillez entrer une adresse email valide.";valid=false;}
+const password=document.getElementById('password').value;if(password.length<6){document.getElementById('passwordError').textContent="Le mot de passe doit contenir au moins 6 caractères.";valid=false;}
+if(!valid){e.preventDefault();}});
@@ -0,0 +1,164 @@
+from decimal import Decimal
+
+from django.db import IntegrityError, transaction
+from django.db.models import Count, F, Sum
+from django.db.models.functions import Greatest, TruncDate
+from django.utils import timezone
+
+from .models import DailyStat, Order, Reservation, StatCounter
+
+# Statistiques du tableau de bord tenues à jour incrémentalement : chaque
+# création, modification ou suppression d'une commande ou d'une réservation
+# ajuste quelques compteurs dans la même transaction (signaux de ecomm.signals :
+# vues, admin, shell et suppressions en cascade), et le tableau de bord les lit
+# en une requête, quelle que soit la taille des tables. Les écritures en masse
+# (bulk_create, update()) ne passent pas par les signaux : rebuild() recalcule
+# alors tout depuis les tables, et check() signale les écarts.
+
+ORDERS_TOTAL = 'orders:total'
+DELIVERED = 'delivered'
+
+
+def order_key(status):
+    return f'orders:{status}'
+
+
+def reservation_key(status):
+    return f'reservations:{status}'
+
+
+def _upsert(model, lookup, **increments):
+    # Jamais en dessous de zéro : une ligne insérée en masse (bulk_create), donc
+    # jamais comptée, peut être supprimée ensuite ; check() signale l'écart
+    expressions = {field: Greatest(F(field) + value, 0) for field, value in increments.items()}
+    if model.objects.filter(**lookup).update(**expressions):
+        return
+    try:
+        with transaction.atomic():
+            model.objects.create(**lookup, **{field: max(value, 0) for field, value in increments.items()})
+    except IntegrityError:
+        # Créé entre-temps par une autre requête
+        model.objects.filter(**lookup).update(**expressions)
+
+
+def _bump(key, count=0, amount=Decimal('0')):
+    _upsert(StatCounter, {'key': key}, count=count, amount=amount)
+
+
+def _bump_day(day, order_count=0, revenue=Decimal('0')):
+    _upsert(DailyStat, {'date': day}, order_count=order_count, revenue=revenue)
+
+
+# Champs qui déterminent la contribution d'une commande aux compteurs
+ORDER_STATE_FIELDS = ('status', 'total_amount', 'created_at')
+
+
+def order_state(order):
+    return tuple(getattr(order, field) for field in ORDER_STATE_FIELDS)
+
+
+def order_changed(old, new):
+    # old, new : order_state() avant et après l'écriture ; None pour une création ou une suppression
+    counters, days = {}, {}
+    for state, sign in ((old, -1), (new, 1)):
+        if state is None:
+            continue
+        status, amount, created_at = state
+        for key in (ORDERS_TOTAL, order_key(status)):
+            count, total = counters.get(key, (0, Decimal('0')))
+            counters[key] = (count + sign, total + sign * amount)
+        # Même découpage que TruncDate dans compute() : jour dans le fuseau courant
+        day = timezone.localdate(created_at)
+        count, revenue = days.get(day, (0, Decimal('0')))
+        days[day] = (count + sign, revenue + (sign * amount if status == DELIVERED else 0))
+    # Ordre fixe des écritures : deux transitions concurrentes ne peuvent pas s'interbloquer
+    for key, (count, amount) in sorted(counters.items()):
+        if count or amount:
+            _bump(key, count, amount)
+    for day, (count, revenue) in sorted(days.items()):
+        if count or revenue:
+            _bump_day(day, order_count=count, revenue=revenue)
+
+
+def reservation_changed(old_status, new_status):
+    # Statuts avant et après l'écriture ; None pour une création ou une suppression
+    if old_status == new_status:
+        return
+    changes = {reservation_key(status): sign for status, sign in ((old_status, -1), (new_status, 1)) if status}
+    for key, sign in sorted(changes.items()):
+        _bump(key, sign)
+
+
+def get_counters():
+    return {counter.key: counter for counter in StatCounter.objects.all()}
+
+
+def dashboard_stats():
+    counters = get_counters()
+
+    def count(key):
+        return counters[key].count if key in counters else 0
+
+    delivered = counters.get(order_key(DELIVERED))
+    return {
+        'total_orders': count(ORDERS_TOTAL),
+        'total_revenue': delivered.amount if delivered else 0,
+        'pending_orders': count(order_key('pending')),
+        'pending_reservations': count(reservation_key('pending')),
+    }
+
+
+def compute():
+    # Valeurs attendues, recalculées à partir des tables
+    # Tous les statuts sont présents, même à zéro : les mises à jour
+    # incrémentales n'ont alors jamais à créer de compteur
+    counters = {order_key(status): (0, Decimal('0')) for status, _ in Order.STATUS_CHOICES}
+    counters.update(
+        (reservation_key(status), (0, Decimal('0'))) for status, _ in Reservation.STATUS_CHOICES
+    )
+    totals = Order.objects.aggregate(count=Count('id'), amount=Sum('total_amount'))
+    counters[ORDERS_TOTAL] = (totals['count'], totals['amount'] or Decimal('0'))
+    for row in Order.objects.order_by().values('status').annotate(count=Count('id'), amount=Sum('total_amount')):
+        counters[order_key(row['status'])] = (row['count'], row['amount'] or Decimal('0'))
+    for row in Reservation.objects.order_by().values('status').annotate(count=Count('id')):
+        counters[reservation_key(row['status'])] = (row['count'], Decimal('0'))
+
+    days = {}
+    for row in Order.objects.order_by().annotate(day=TruncDate('created_at')).values('day').annotate(count=Count('id')):
+        days[row['day']] = (row['count'], Decimal('0'))
+    delivered = Order.objects.filter(status=DELIVERED).order_by().annotate(day=TruncDate('created_at'))
+    for row in delivered.values('day').annotate(revenue=Sum('total_amount')):
+        days[row['day']] = (days[row['day']][0], row['revenue'] or Decimal('0'))
+    return counters, days
+
+
+def rebuild():
+    # Calcul et remplacement dans la même transaction, compteurs verrouillés :
+    # une commande validée pendant le calcul n'est pas perdue
+    with transaction.atomic():
+        list(StatCounter.objects.select_for_update().order_by('key').values_list('id', flat=True))
+        counters, days = compute()
+        StatCounter.objects.all().delete()
+        DailyStat.objects.all().delete()
+        StatCounter.objects.bulk_create(
+            StatCounter(key=key, count=count, amount=amount) for key, (count, amount) in counters.items()
+        )
+        DailyStat.objects.bulk_create(
+            DailyStat(date=day, order_count=count, revenue=revenue) for day, (count, revenue) in days.items()
+        )
+    return len(counters), len(days)
+
+
+def check():
+    # Liste des écarts (clé, valeur stockée, valeur attendue) ; vide si tout est cohérent
+    expected_counters, expected_days = compute()
+    problems = []
+    stored = {c.key: (c.count, c.amount) for c in StatCounter.objects.all()}
+    for key in sorted(set(stored) | set(expected_counters)):
+        if stored.get(key, (0, Decimal('0'))) != expected_counters.get(key, (0, Decimal('0'))):
+            problems.append((key, stored.get(key), expected_counters.get(key)))
+    stored_days = {d.date: (d.order_count, d.revenue) for d in DailyStat.objects.all()}
+    for day in sorted(set(stored_days) | set(expected_days)):
+        if stored_days.get(day, (0, Decimal('0'))) != expected_days.get(day, (0, Decimal('0'))):
+            problems.append((str(day), stored_days.get(day), expected_days.get(day)))
+    return problems
@@ -0,0 +1,15 @@
+from whitenoise.storage import CompressedManifestStaticFilesStorage
+
+
+class StaticStorage(CompressedManifestStaticFilesStorage):
+    """
+    Noms à empreinte et fichiers précompressés (gzip, Brotli) produits par
+    collectstatic. Tant que collectstatic n'a pas été lancé (tests, bancs
+    d'essai, développement), les pages gardent les noms d'origine, servis
+    depuis les dossiers static des applications.
+    """
+
+    def stored_name(self, name):
+        if not self.hashed_files and not self.manifest_strict:
+            return name
+        return super().stored_name(name)
@@ -0,0 +1,114 @@
+import logging
+import random
+import traceback
+from datetime import timedelta
+
+from django.conf import settings
+from django.core.files.storage import default_storage
+from django.db import close_old_connections, transaction
+from django.db.models import F
+from django.utils import timezone
+
+from .db import update_returning
+from .models import Task
+
+logger = logging.getLogger(__name__)
+
+# File de tâches en base : les vues enregistrent une ligne Task dans leur
+# propre transaction (rien n'est perdu si elle échoue, rien ne part si elle
+# est annulée) et `manage.py run_tasks` les exécute hors des requêtes.
+
+RETRY_BASE_SECONDS = 10
+RETRY_MAX_SECONDS = 60 * 60
+LOCK_TIMEOUT = timedelta(minutes=10)  # Au-delà, une tâche « en cours » est réputée abandonnée
+
+# Registre des tâches exécutables par le worker
+TASKS = {}
+
+
+def task(name, max_attempts=5):
+    def register(func):
+        func.task_name = name
+        func.max_attempts = max_attempts
+        TASKS[name] = func
+        return func
+    return register
+
+
+def enqueue(name, *args, **kwargs):
+    func = TASKS[name]
+    if getattr(settings, 'TASKS_EAGER', False):
+        # Mode synchrone (tests, développement sans worker) : exécution après commit
+        transaction.on_commit(lambda: func(*args, **kwargs))
+        return None
+    return Task.objects.create(name=name, args=list(args), kwargs=kwargs, max_attempts=func.max_attempts)
+
+
+def retry_delay(attempts):
+    # Attente exponentielle, avec une part aléatoire pour étaler les reprises
+    delay = min(RETRY_BASE_SECONDS * 2 ** (attempts - 1), RETRY_MAX_SECONDS)
+    return timedelta(seconds=delay * random.uniform(1, 1.5))
+
+
+def claim(limit):
+    # Réserve jusqu'à `limit` tâches prêtes. La condition sur le statut rend la
+    # réservation sûre entre workers concurrents : une tâche n'est prise qu'une fois.
+    now = timezone.now()
+    with transaction.atomic():
+        Task.objects.filter(status='running', locked_at__lt=now - LOCK_TIMEOUT).update(status='pending')
+        ids = list(
+            Task.objects.filter(status='pending', run_at__lte=now)
+            .order_by('run_at').values_list('id', flat=True)[:limit]
+        )
+        if not ids:
+            return []
+        claimed = update_returning(
+            Task.objects.filter(id__in=ids, status='pending'), ['id'],
+            status='running', locked_at=now, attempts=F('attempts') + 1,
+        )
+    return list(Task.objects.filter(id__in=[row['id'] for row in claimed]).order_by('run_at'))
+
+
+def execute(task):
+    try:
+        func = TASKS[task.name]
+        func(*task.args, **task.kwargs)
+    except Exception:
+        error = traceback.format_exc()
+        if task.attempts < task.max_attempts:
+            logger.warning("Tâche %s #%s échouée (essai %s), nouvel essai prévu", task.name, task.id, task.attempts)
+            Task.objects.filter(id=task.id).update(
+                status='pending', locked_at=None, last_error=error,
+                run_at=timezone.now() + retry_delay(task.attempts),
+            )
+        else:
+            logger.error("Tâche %s #%s abandonnée après %s essais", task.name, task.id, task.attempts)
+            Task.objects.filter(id=task.id).update(status='failed', locked_at=None, last_error=error)
+        return False
+    Task.objects.filter(id=task.id).delete()
+    return True
+
+
+def _execute_in_thread(task):
+    try:
+        return execute(task)
+    finally:
+        close_old_connections()
+
+
+def run_pending(limit=100, executor=None):
+    # Exécute les tâches prêtes, dans ce thread ou dans le pool `executor` ;
+    # renvoie le nombre de tâches traitées. Sert aussi de worker dans les tests.
+    tasks = claim(limit)
+    if executor is None:
+        for task in tasks:
+            execute(task)
+    else:
+        list(executor.map(_execute_in_thread, tasks))
+    return len(tasks)
+
+
+@task('delete_files')
+def delete_files(names):
+    for name in names:
+        default_storage.delete(name)
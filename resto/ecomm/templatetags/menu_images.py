@@ -0,0 +1,38 @@
+from django import template
+from django.core.files.storage import default_storage
+from django.utils.html import format_html, format_html_join
+
+from .. import images
+
+register = template.Library()
+
+
+def _srcset(variants):
+    return format_html_join(', ', '{} {}w', ((default_storage.url(path), width) for width, path in variants))
+
+
+@register.simple_tag
+def menu_picture(item, sizes='100vw', css_class='', loading='lazy'):
+    """
+    Photo d'un plat en <picture> : WebP avec repli JPEG, en plusieurs largeurs.
+    Tant que les variantes ne sont pas prêtes, sert l'original. Le rendu
+    n'écrit rien : la dérivation est demandée à l'enregistrement du plat
+    (signal post_save) ou par `manage.py derive_menu_images`.
+    """
+    if not item.image:
+        return ''
+    if not images.is_current(item):
+        return format_html(
+            '<img src="{}" alt="{}" class="{}" loading="{}" decoding="async">',
+            item.image.url, item.name, css_class, loading,
+        )
+    variants = item.image_variants
+    fallback = variants['jpeg'][len(variants['jpeg']) // 2][1]
+    return format_html(
+        '<picture><source type="image/webp" srcset="{}" sizes="{}">'
+        '<img src="{}" srcset="{}" sizes="{}" width="{}" height="{}" alt="{}" class="{}" loading="{}" decoding="async">'
+        '</picture>',
+        _srcset(variants['webp']), sizes,
+        default_storage.url(fallback), _srcset(variants['jpeg']), sizes,
+        variants['width'], variants['height'], item.name, css_class, loading,
+    )
@@ -1,3 +1,1788 @@
-from django.test import TestCase
+import asyncio
+import csv
+import io
+import json
+import os
+import re
+import shutil
+import tempfile
+import tracemalloc
+from concurrent.futures import ThreadPoolExecutor
+from datetime import date, time, timedelta
+from decimal import Decimal
+from unittest import mock, skipUnless
+from urllib.parse import parse_qs, urlsplit
 
-# Create your tests here.
+from asgiref.sync import async_to_sync, sync_to_async
+from django.contrib.auth.models import User
+from django.contrib.sessions.models import Session
+from django.core.cache import cache
+from django.core.exceptions import ValidationError
+from django.core.files.storage import default_storage
+from django.core.files.uploadedfile import SimpleUploadedFile
+from django.core.management import call_command
+from django.db import IntegrityError, OperationalError, close_old_connections, connection, router, transaction
+from django.http import HttpResponse, StreamingHttpResponse
+from django.template import Context, Template, engines
+from django.template.loaders.cached import Loader as CachedLoader
+from django.test import RequestFactory
+from django.conf import settings
+from django.test import Client, SimpleTestCase, TestCase, TransactionTestCase, override_settings
+from django.test.utils import CaptureQueriesContext
+from django.urls import reverse
+from django.utils import timezone
+from PIL import Image
+from whitenoise.middleware import WhiteNoiseMiddleware
+
+from . import cart as cart_ops
+from . import analytics, bundles, calendar_feed, capacity, catalog, events, exports, images, instrumentation, routers, search, stats, tasks
+from . import urls as ecomm_urls
+from .models import (
+    Cart, CartItem, Category, Contact, DiningTable, ItemSalesRollup, MenuItem, Order, OrderItem, Reservation, SalesRollup,
+    SlotOccupancy, StatCounter, Task,
+)
+from .storage import StaticStorage
+
+
+def make_menu(count, category=None, price='1500'):
+    category = category or Category.objects.create(name='Plats')
+    return [
+        MenuItem.objects.create(
+            name=f'Plat {i}', description='Délicieux', price=Decimal(price), category=category
+        )
+        for i in range(count)
+    ]
+
+
+class CartTotalsTests(TestCase):
+    def setUp(self):
+        self.user = User.objects.create_user('client', password='secret-pass')
+        self.client.force_login(self.user)
+        self.items = make_menu(30)
+
+    def fill_cart(self, size):
+        cart, _ = Cart.objects.get_or_create(user=self.user)
+        CartItem.objects.filter(cart=cart).delete()
+        CartItem.objects.bulk_create(
+            CartItem(cart=cart, menu_item=item, quantity=2) for item in self.items[:size]
+        )
+        cart.refresh_totals()
+        return cart
+
+    def count_queries(self, url):
+        with CaptureQueriesContext(connection) as ctx:
+            response = self.client.get(url)
+        self.assertEqual(response.status_code, 200)
+        return len(ctx)
+
+    def test_compute_totals_uses_single_query(self):
+        cart = self.fill_cart(5)
+        with self.assertNumQueries(1):
+            subtotal, total_items = cart.compute_totals()
+        self.assertEqual(subtotal, Decimal('15000'))
+        self.assertEqual(total_items, 10)
+
+    def test_add_and_update_keep_totals_in_sync(self):
+        item = self.items[0]
+        self.client.post(reverse('add_to_cart', args=[item.id]))
+        response = self.client.post(reverse('add_to_cart', args=[item.id]))
+        self.assertEqual(response.json()['cart_count'], 2)
+
+        cart_item = CartItem.objects.get(cart__user=self.user, menu_item=item)
+        response = self.client.post(
+            reverse('update_cart_item', args=[cart_item.id]), {'action': 'increase'}
+        )
+        self.assertEqual(response.json()['cart_total'], 4500.0)
+        self.assertEqual(response.json()['cart_count'], 3)
+
+        response = self.client.post(
+            reverse('update_cart_item', args=[cart_item.id]), {'action': 'remove'}
+        )
+        self.assertTrue(response.json()['removed'])
+        cart = Cart.objects.get(user=self.user)
+        self.assertEqual((cart.total_amount, cart.total_items), (Decimal('0'), 0))
+
+    def test_price_change_refreshes_cart_totals(self):
+        cart = self.fill_cart(3)
+        item = self.items[0]
+        item.price = Decimal('2500')
+        item.save()
+        cart.refresh_from_db()
+        self.assertEqual(cart.total_amount, Decimal('11000'))
+
+        item.delete()
+        cart.refresh_from_db()
+        self.assertEqual((cart.total_amount, cart.total_items), (Decimal('6000'), 4))
+
+    def test_cart_page_query_count_is_constant(self):
+        self.fill_cart(1)
+        small = self.count_queries(reverse('panier'))
+        self.fill_cart(30)
+        large = self.count_queries(reverse('panier'))
+        self.assertEqual(small, large)
+
+    def test_header_badge_query_count_is_constant(self):
+        self.fill_cart(1)
+        small = self.count_queries(reverse('contact'))
+        self.fill_cart(30)
+        large = self.count_queries(reverse('contact'))
+        self.assertEqual(small, large)
+
+
+class CheckoutTests(TestCase):
+    def setUp(self):
+        self.user = User.objects.create_user('client', password='secret-pass')
+        self.client.force_login(self.user)
+        self.items = make_menu(20)
+
+    def fill_cart(self, size):
+        cart, _ = Cart.objects.get_or_create(user=self.user)
+        CartItem.objects.bulk_create(
+            CartItem(cart=cart, menu_item=item, quantity=3) for item in self.items[:size]
+        )
+        cart.refresh_totals()
+        return cart
+
+    def post_checkout(self, token=''):
+        return self.client.post(reverse('checkout'), {
+            'address': 'Rue des Palmiers', 'phone': '0612345678', 'checkout_token': token,
+        })
+
+    def test_checkout_snapshots_lines_and_clears_cart(self):
+        cart = self.fill_cart(4)
+        response = self.post_checkout('a' * 32)
+        order = Order.objects.get(user=self.user)
+        self.assertRedirects(response, reverse('order_confirmation', args=[order.id]))
+        self.assertEqual(order.total_amount, Decimal('18000'))
+        self.assertEqual(order.orderitem_set.count(), 4)
+        cart.refresh_from_db()
+        self.assertEqual((cart.total_items, cart.cartitem_set.count()), (0, 0))
+
+    def test_checkout_query_count_is_constant(self):
+        self.fill_cart(1)
+        self.post_checkout()  # Crée les compteurs du jour
+        counts = []
+        for size in (1, 20):
+            self.fill_cart(size)
+            with CaptureQueriesContext(connection) as ctx:
+                self.post_checkout()
+            counts.append(len(ctx))
+        self.assertEqual(counts[0], counts[1])
+        self.assertEqual(OrderItem.objects.count(), 22)
+
+    def test_double_submit_reuses_existing_order(self):
+        self.fill_cart(2)
+        first = self.post_checkout('b' * 32)
+        second = self.post_checkout('b' * 32)
+        self.assertEqual(Order.objects.count(), 1)
+        self.assertEqual(first['Location'], second['Location'])
+
+    def test_tokens_are_scoped_to_the_customer_and_validated(self):
+        other = User.objects.create_user('voisin')
+        Order.objects.create(user=other, total_amount=Decimal('1500'), phone_number='0600000000', checkout_token='c' * 32)
+        self.fill_cart(1)
+        response = self.post_checkout('c' * 32)
+        order = Order.objects.get(user=self.user)
+        self.assertRedirects(response, reverse('order_confirmation', args=[order.id]))
+        self.assertEqual(order.checkout_token, 'c' * 32)
+
+        for token in ('d' * 64, 'é' * 32, 'C' * 32):
+            self.fill_cart(1)
+            self.post_checkout(token)
+        tokens = Order.objects.filter(user=self.user).order_by('id').values_list('checkout_token', flat=True)
+        self.assertEqual(list(tokens), ['c' * 32] + [None] * 3)
+
+    def test_empty_cart_does_not_create_order(self):
+        self.fill_cart(0)
+        response = self.post_checkout()
+        self.assertRedirects(response, reverse('panier'))
+        self.assertFalse(Order.objects.exists())
+
+
+class CatalogCacheTests(TestCase):
+    def setUp(self):
+        cache.clear()
+        catalog.reset_stats()
+        self.items = make_menu(15)
+
+    def test_repeated_anonymous_renders_hit_no_database(self):
+        for url in (reverse('index'), reverse('menu'), reverse('menu') + '?sort=-price&page=2'):
+            self.client.get(url)
+            with self.assertNumQueries(0):
+                response = self.client.get(url)
+            self.assertEqual(response.status_code, 200)
+        self.assertGreater(catalog.get_stats()['hits'], 0)
+
+    def test_menu_item_save_invalidates_catalog(self):
+        self.client.get(reverse('menu'))
+        item = self.items[0]
+        item.name = 'Alloco braisé'
+        with self.captureOnCommitCallbacks(execute=True):
+            item.save()
+        response = self.client.get(reverse('menu'))
+        self.assertContains(response, 'Alloco braisé')
+
+        item.is_available = False
+        with self.captureOnCommitCallbacks(execute=True):
+            item.save()
+        response = self.client.get(reverse('menu'))
+        self.assertNotContains(response, 'Alloco braisé')
+
+    def test_catalog_version_changes_after_commit(self):
+        # Avant validation, une lecture concurrente relirait l'ancien catalogue :
+        # il ne doit pas être rangé sous la nouvelle version
+        version = catalog.get_version()
+        with self.captureOnCommitCallbacks() as callbacks:
+            self.items[0].save()
+            self.assertEqual(catalog.get_version(), version)
+        for callback in callbacks:
+            callback()
+        self.assertNotEqual(catalog.get_version(), version)
+
+    def test_category_filter_and_sort_are_cached_separately(self):
+        other = Category.objects.create(name='Desserts')
+        make_menu(1, category=other, price='300')
+        cached = catalog.get_menu_items(str(other.id), 'price')
+        self.assertEqual([item.category_id for item in cached], [other.id])
+        self.assertEqual(catalog.get_menu_items('abc'), [])
+        self.assertEqual(catalog.get_menu_items(None, '-price')[-1].price, Decimal('300'))
+
+    @override_settings(CATALOG_VERSION_TIMEOUT=300)
+    def test_local_memory_version_expires_with_the_data(self):
+        # Cache propre à chaque worker : un incrément fait ailleurs n'y arrive
+        # pas, la version (et l'ETag de l'API) doit donc expirer d'elle-même
+        version = catalog.get_version()
+        later = timezone.now().timestamp() + 301
+        with mock.patch('time.time', return_value=later):
+            self.assertNotEqual(catalog.get_version(), version)
+
+
+class MenuSearchTests(TestCase):
+    def setUp(self):
+        cache.clear()
+        category = Category.objects.create(name='Plats')
+        self.poulet = MenuItem.objects.create(
+            name='Poulet braisé', description='Poulet mariné grillé au feu de bois',
+            price=Decimal('3500'), category=category
+        )
+        self.poisson = MenuItem.objects.create(
+            name='Poisson braisé', description='Accompagné de poulet frit',
+            price=Decimal('4000'), category=category
+        )
+        self.ndole = MenuItem.objects.create(
+            name='Ndolé', description='Feuilles amères et arachides',
+            price=Decimal('3000'), category=category
+        )
+
+    def names(self, query, queryset=None):
+        queryset = queryset if queryset is not None else MenuItem.objects.all()
+        return [item.name for item in search.search(queryset, query)]
+
+    def test_accent_folding_and_prefix_matching(self):
+        self.assertEqual(set(self.names('braise')), {'Poulet braisé', 'Poisson braisé'})
+        self.assertEqual(self.names('NDOLE'), ['Ndolé'])
+        self.assertEqual(self.names('arach'), ['Ndolé'])
+        self.assertEqual(self.names('poul brai'), ['Poulet braisé', 'Poisson braisé'])
+        self.assertEqual(self.names('!!'), [])
+
+    def test_name_matches_rank_before_description_matches(self):
+        self.assertEqual(self.names('poulet'), ['Poulet braisé', 'Poisson braisé'])
+
+    def test_index_is_updated_on_save_and_delete(self):
+        self.ndole.name = 'Eru'
+        self.ndole.save()
+        self.assertEqual(self.names('ndole'), [])
+        self.assertEqual(self.names('eru'), ['Eru'])
+        self.ndole.delete()
+        self.assertEqual(self.names('eru'), [])
+
+    def test_memory_index_matches_fts_behaviour(self):
+        index = search.MemoryIndex()
+        for item in MenuItem.objects.all():
+            index.add(item.id, item.name, item.description)
+        self.assertEqual(index.search(['poulet']), [self.poulet.id, self.poisson.id])
+        self.assertEqual(index.search(['brai', 'poi']), [self.poisson.id])
+        index.remove(self.poisson.id)
+        self.assertEqual(index.search(['brai']), [self.poulet.id])
+        self.assertNotIn('poisson', index.vocabulary)
+
+    def test_menu_view_uses_search_with_explicit_sort(self):
+        response = self.client.get(reverse('menu'), {'search': 'braise', 'sort': '-price'})
+        self.assertEqual(
+            [item.name for item in response.context['items']], ['Poisson braisé', 'Poulet braisé']
+        )
+
+    def test_menu_view_builds_the_memory_index_without_fts(self):
+        # MySQL : l'index en mémoire est construit à la première recherche, hors de la boucle d'événements
+        with mock.patch.object(search, 'uses_fts', return_value=False), \
+                mock.patch.object(search.memory_index, 'version', None):
+            response = self.client.get(reverse('menu'), {'search': 'braise', 'sort': 'price'})
+        self.assertEqual(
+            [item.name for item in response.context['items']], ['Poulet braisé', 'Poisson braisé']
+        )
+
+
+class MenuApiTests(TestCase):
+    def setUp(self):
+        cache.clear()
+        self.items = make_menu(25)
+
+    def fetch_all(self, **params):
+        results, url = [], reverse('menu_api')
+        while url:
+            response = self.client.get(url, params)
+            self.assertEqual(response.status_code, 200)
+            data = response.json()
+            results.extend(data['results'])
+            url, params = data['next'], {}
+        return results
+
+    def test_cursor_pagination_walks_every_item_once(self):
+        MenuItem.objects.filter(id__in=[i.id for i in self.items[:10]]).update(price=Decimal('900'))
+        results = self.fetch_all(sort='-price', limit=7)
+        self.assertEqual(len(results), 25)
+        self.assertEqual(len({r['id'] for r in results}), 25)
+        prices = [Decimal(r['price']) for r in results]
+        self.assertEqual(prices, sorted(prices, reverse=True))
+
+    def test_filters_and_invalid_parameters(self):
+        self.assertEqual(len(self.fetch_all(search='plat 1')), 11)
+        self.assertEqual(self.client.get(reverse('menu_api'), {'sort': 'id'}).status_code, 400)
+        self.assertEqual(self.client.get(reverse('menu_api'), {'cursor': 'abc'}).status_code, 400)
+        self.assertEqual(self.client.get(reverse('menu_api'), {'category': 'x'}).status_code, 400)
+
+    def test_cursor_is_bound_to_its_ordering(self):
+        next_url = self.client.get(reverse('menu_api'), {'sort': 'name', 'limit': 5}).json()['next']
+        cursor = parse_qs(urlsplit(next_url).query)['cursor'][0]
+        response = self.client.get(reverse('menu_api'), {'sort': 'price', 'limit': 5, 'cursor': cursor})
+        self.assertEqual(response.status_code, 400)
+        response = self.client.get(reverse('menu_api'), {'sort': 'name', 'limit': 5, 'cursor': cursor})
+        self.assertEqual(len(response.json()['results']), 5)
+
+    def test_etag_revalidation(self):
+        response = self.client.get(reverse('menu_api'))
+        etag = response['ETag']
+        self.assertFalse(etag.startswith('W/'))
+        with self.assertNumQueries(0):
+            response = self.client.get(reverse('menu_api'), HTTP_IF_NONE_MATCH=etag)
+        self.assertEqual(response.status_code, 304)
+
+        with self.captureOnCommitCallbacks(execute=True):
+            self.items[0].save()
+        response = self.client.get(reverse('menu_api'), HTTP_IF_NONE_MATCH=etag)
+        self.assertEqual(response.status_code, 200)
+        self.assertNotEqual(response['ETag'], etag)
+
+    def test_categories_endpoint(self):
+        response = self.client.get(reverse('categories_api'))
+        self.assertEqual(response.json()['results'][0]['name'], 'Plats')
+
+
+class DashboardStatsTests(TestCase):
+    def setUp(self):
+        self.staff = User.objects.create_user('chef', password='secret-pass', is_staff=True)
+        self.customer = User.objects.create_user('client', password='secret-pass')
+        self.items = make_menu(3)
+
+    def place_order(self):
+        self.client.force_login(self.customer)
+        cart, _ = Cart.objects.get_or_create(user=self.customer)
+        CartItem.objects.create(cart=cart, menu_item=self.items[0], quantity=2)
+        cart.refresh_totals()
+        self.client.post(reverse('checkout'), {'address': 'Rue 1', 'phone': '0600000000'})
+        return Order.objects.latest('id')
+
+    def test_counters_follow_checkout_status_changes_and_reservations(self):
+        orders = [self.place_order() for _ in range(3)]
+        self.client.post(reverse('make_reservation'), {
+            'date': '2026-11-01', 'time': '19:30', 'guests': 4, 'phone': '0600000000',
+        })
+        self.client.force_login(self.staff)
+        self.client.post(reverse('update_order_status', args=[orders[0].id]), {'status': 'delivered'})
+        self.client.post(reverse('update_order_status', args=[orders[1].id]), {'status': 'delivered'})
+        self.client.post(reverse('update_order_status', args=[orders[1].id]), {'status': 'cancelled'})
+        reservation = Reservation.objects.get()
+        self.client.post(reverse('update_reservation_status', args=[reservation.id]), {'status': 'confirmed'})
+
+        self.assertEqual(stats.dashboard_stats(), {
+            'total_orders': 3,
+            'total_revenue': Decimal('3000'),
+            'pending_orders': 1,
+            'pending_reservations': 0,
+        })
+        self.assertEqual(stats.check(), [])
+
+    def test_counters_follow_saves_and_deletes_outside_the_views(self):
+        orders = [self.place_order() for _ in range(2)]
+        order = Order.objects.only('id').get(pk=orders[0].pk)  # Champs différés : état relu avant l'écriture
+        order.status = 'delivered'
+        order.save()
+        reservation = Reservation.objects.create(
+            user=self.customer, date=date(2026, 11, 1), time=time(19, 30), number_of_guests=2, phone_number='0',
+        )
+        reservation.status = 'confirmed'
+        reservation.save()
+        self.assertEqual(stats.dashboard_stats(), {
+            'total_orders': 2, 'total_revenue': Decimal('3000'), 'pending_orders': 1, 'pending_reservations': 0,
+        })
+        self.assertEqual(stats.check(), [])
+
+        self.customer.delete()  # Commandes et réservations supprimées en cascade
+        self.assertEqual(stats.dashboard_stats(), {
+            'total_orders': 0, 'total_revenue': Decimal('0'), 'pending_orders': 0, 'pending_reservations': 0,
+        })
+        self.assertEqual(stats.check(), [])
+
+    def test_dashboard_query_count_is_constant(self):
+        self.place_order()
+        self.client.force_login(self.staff)
+        with CaptureQueriesContext(connection) as small:
+            self.client.get(reverse('admin_dashboard'))
+        Order.objects.bulk_create(
+            Order(user=self.customer, total_amount=Decimal('100'), phone_number='0') for _ in range(200)
+        )
+        stats.rebuild()
+        with CaptureQueriesContext(connection) as large:
+            response = self.client.get(reverse('admin_dashboard'))
+        self.assertEqual(len(small), len(large))
+        self.assertEqual(response.context['total_orders'], 201)
+
+    def test_orders_pagination_links_are_elided(self):
+        Order.objects.bulk_create(
+            Order(user=self.customer, total_amount=Decimal('100'), phone_number='0') for _ in range(1000)
+        )
+        self.client.force_login(self.staff)
+        response = self.client.get(reverse('admin_orders'), {'page': 50})
+        self.assertEqual(response.context['orders'].number, 50)
+        self.assertContains(response, 'href="?page=', count=9)  # 1, 48-52, 100, précédent, suivant
+        self.assertContains(response, '…', count=2)
+
+    def test_check_reports_drift_and_rebuild_fixes_it(self):
+        self.place_order()
+        StatCounter.objects.filter(key='orders:pending').update(count=42)
+        self.assertEqual(stats.check()[0][0], 'orders:pending')
+        stats.rebuild()
+        self.assertEqual(stats.check(), [])
+
+
+class AnalyticsTests(TestCase):
+    def setUp(self):
+        self.staff = User.objects.create_user('chef', is_staff=True)
+        self.customer = User.objects.create_user('client')
+        self.items = make_menu(2) + make_menu(1, Category.objects.create(name='Desserts'), price='500')
+
+    def place_order(self, quantities):
+        self.client.force_login(self.customer)
+        cart, _ = Cart.objects.get_or_create(user=self.customer)
+        CartItem.objects.bulk_create(
+            CartItem(cart=cart, menu_item=item, quantity=quantity) for item, quantity in zip(self.items, quantities)
+        )
+        cart.refresh_totals()
+        self.client.post(reverse('checkout'), {'address': 'Rue 1', 'phone': '0600000000'})
+        return Order.objects.latest('id')
+
+    def set_status(self, order, status):
+        self.client.force_login(self.staff)
+        self.client.post(reverse('update_order_status', args=[order.id]), {'status': status})
+
+    def test_rollups_follow_checkout_and_cancellation(self):
+        first = self.place_order([2, 0, 1])
+        self.place_order([1, 1, 0])
+        today, hour = analytics._slot(first)
+        self.assertEqual(
+            list(SalesRollup.objects.values_list('date', 'hour', 'order_count', 'revenue')),
+            [(today, hour, 2, Decimal('6500'))],
+        )
+        top = analytics.top_items(today, today)
+        self.assertEqual([(row['menu_item_id'], row['quantity'], row['revenue']) for row in top], [
+            (self.items[0].id, 3, Decimal('4500')), (self.items[1].id, 1, Decimal('1500')), (self.items[2].id, 1, Decimal('500')),
+        ])
+
+        self.set_status(first, 'cancelled')
+        self.assertEqual(SalesRollup.objects.get().revenue, Decimal('3000'))
+        self.assertEqual(
+            [(row['category__name'], row['revenue']) for row in analytics.sales_by_category(today, today)],
+            [('Plats', Decimal('3000'))],
+        )
+        self.assertEqual(analytics.check(), [])
+
+        self.set_status(first, 'pending')
+        self.set_status(first, 'delivered')
+        self.assertEqual(SalesRollup.objects.get().order_count, 2)
+        self.assertEqual(analytics.check(), [])
+
+    def test_rebuild_matches_incremental_rollups(self):
+        self.place_order([1, 2, 3])
+        cancelled = self.place_order([1, 0, 0])
+        self.set_status(cancelled, 'cancelled')
+        incremental = sorted(ItemSalesRollup.objects.exclude(order_count=0).values_list(
+            'date', 'menu_item', 'quantity', 'revenue', 'order_count',
+        ))
+        ItemSalesRollup.objects.update(quantity=99)
+        self.assertNotEqual(analytics.check(), [])
+        out = io.StringIO()
+        call_command('rebuild_analytics', stdout=out)
+        self.assertEqual(sorted(ItemSalesRollup.objects.values_list(
+            'date', 'menu_item', 'quantity', 'revenue', 'order_count',
+        )), incremental)
+        call_command('rebuild_analytics', '--check', stdout=out)
+        self.assertIn('cohérents', out.getvalue())
+
+    def test_report_page_reads_only_rollups(self):
+        self.place_order([1, 1, 1])
+        self.client.force_login(self.staff)
+        with CaptureQueriesContext(connection) as ctx:
+            response = self.client.get(reverse('admin_analytics'), {'days': 7})
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual((response.context['days'], response.context['total_orders']), (7, 1))
+        self.assertEqual(response.context['total_revenue'], Decimal('3500'))
+        self.assertEqual(response.context['charts']['categories']['labels'], ['Plats', 'Desserts'])
+        tables = ' '.join(query['sql'] for query in ctx.captured_queries)
+        self.assertNotIn('"ecomm_order"', tables)
+        self.assertNotIn('"ecomm_orderitem"', tables)
+
+
+@override_settings(INSTRUMENTATION_SAMPLE_RATE=1.0, INSTRUMENTATION_SERVER_TIMING=True, METRICS_TOKEN='jeton')
+class InstrumentationTests(TestCase):
+    def setUp(self):
+        instrumentation.registry.reset()
+        self.items = make_menu(3)
+
+    def n_plus_one(self, request):
+        for item in self.items:
+            MenuItem.objects.filter(id=item.id).exists()
+        return HttpResponse()
+
+    def test_counts_queries_and_repeated_statements(self):
+        middleware = instrumentation.InstrumentationMiddleware(self.n_plus_one)
+        request = RequestFactory().get('/')
+        with self.assertLogs('ecomm.instrumentation', 'WARNING') as logs:
+            with override_settings(QUERY_BUDGETS={instrumentation.UNRESOLVED: 2}):
+                response = middleware(request)
+        self.assertEqual((request.instrumentation.queries, request.instrumentation.duplicates), (3, 2))
+        self.assertRegex(response['Server-Timing'], r'^app;dur=[\d.]+, db;dur=[\d.]+;desc="3 queries, 2 repeated"$')
+        self.assertIn('3 requêtes SQL pour un budget de 2', logs.output[0])
+        metrics = instrumentation.registry.render()
+        self.assertIn('ecomm_view_queries_bucket{view="<unresolved>",le="5"} 1', metrics)
+        self.assertIn('ecomm_view_duplicate_queries_total{view="<unresolved>"} 2', metrics)
+        self.assertIn('ecomm_view_query_budget_exceeded_total{view="<unresolved>"} 1', metrics)
+
+    @override_settings(INSTRUMENTATION_SAMPLE_RATE=0)
+    def test_unsampled_requests_are_not_measured(self):
+        request = RequestFactory().get('/')
+        response = instrumentation.InstrumentationMiddleware(self.n_plus_one)(request)
+        self.assertFalse(hasattr(request, 'instrumentation'))
+        self.assertNotIn('Server-Timing', response)
+        self.assertNotIn('ecomm_view_responses_total{', instrumentation.registry.render())
+
+    async def test_async_views_are_measured(self):
+        user = await User.objects.acreate(username='client')
+        await self.async_client.aforce_login(user)
+        response = await self.async_client.get(reverse('my_orders'))
+        # Session, utilisateur, commandes (et leurs lignes) : lus dans les threads de sync_to_async
+        self.assertGreaterEqual(response.asgi_request.instrumentation.queries, 3)
+        self.assertIn('db;dur=', response['Server-Timing'])
+
+    def test_metrics_endpoint_is_restricted(self):
+        self.client.get(reverse('menu'))
+        url = reverse('admin_metrics')
+        self.assertEqual(self.client.get(url).status_code, 403)
+        self.assertEqual(self.client.get(url, headers={'Authorization': 'Bearer autre'}).status_code, 403)
+        response = self.client.get(url, headers={'Authorization': 'Bearer jeton'})
+        self.assertEqual(response['Content-Type'], 'text/plain; version=0.0.4; charset=utf-8')
+        self.assertIn('ecomm_view_responses_total{view="menu",method="GET",status="200"} 1', response.content.decode())
+        self.client.force_login(User.objects.create_user('chef', is_staff=True))
+        self.assertEqual(self.client.get(url).status_code, 200)
+
+
+@override_settings(INSTRUMENTATION_SAMPLE_RATE=1.0)
+class QueryBudgetTests(TestCase):
+    # Chaque vue, sur un jeu de données où un N+1 dépasserait son budget
+    # (settings.QUERY_BUDGETS). Pour les réponses en flux (exports), seule la
+    # préparation de la réponse est comptée.
+    def setUp(self):
+        cache.clear()
+        self.staff = User.objects.create_user('chef', is_staff=True)
+        self.customer = User.objects.create_user('client', password='secret-pass')
+        self.items = make_menu(10) + make_menu(10, Category.objects.create(name='Desserts'), price='500')
+        cart = Cart.objects.create(user=self.customer)
+        CartItem.objects.bulk_create(CartItem(cart=cart, menu_item=item, quantity=2) for item in self.items[:10])
+        cart.refresh_totals()
+        self.orders = []
+        for i in range(5):
+            order = Order.objects.create(user=self.customer, total_amount=Decimal('4500'), phone_number='0600000000')
+            OrderItem.objects.bulk_create(
+                OrderItem(order=order, menu_item=item, quantity=1, price=Decimal('1500')) for item in self.items[i:i + 3]
+            )
+            self.orders.append(order)
+        today = timezone.localdate()
+        self.reservations = [
+            Reservation.objects.create(
+                user=self.customer, date=today, time=slot, number_of_guests=2, phone_number='0600000000',
+            )
+            for slot in capacity.slots()[:5]
+        ]
+        capacity.rebuild()
+
+    def requests(self):
+        # (nom d'URL, utilisateur, méthode, arguments, données)
+        customer, staff, item, order = self.customer, self.staff, self.items[0], self.orders[0]
+        today = str(timezone.localdate())
+        return [
+            ('index', None, 'get', [], {}),
+            ('menu', None, 'get', [], {'search': 'plat'}),
+            ('panier', customer, 'get', [], {}),
+            ('add_to_cart', customer, 'post', [item.id], {}),
+            ('update_cart_item', customer, 'post', [item.id], {'action': 'increase'}),
+            ('checkout', customer, 'post', [], {'address': 'Rue 1', 'phone': '0600000000'}),
+            ('order_confirmation', customer, 'get', [order.id], {}),
+            ('my_orders', customer, 'get', [], {}),
+            ('make_reservation', customer, 'get', [], {}),
+            ('make_reservation', customer, 'post', [], {
+                'date': today, 'time': '20:00', 'guests': 2, 'phone': '0600000000',
+            }),
+            ('reservation_availability', None, 'get', [], {'date': today, 'guests': 2}),
+            ('my_reservations', customer, 'get', [], {}),
+            ('register', None, 'get', [], {}),
+            ('login', None, 'post', [], {'username': 'client', 'password': 'secret-pass'}),
+            ('logout', customer, 'post', [], {}),
+            ('contact', None, 'post', [], {
+                'name': 'Awa', 'email': 'awa@example.com', 'subject': 'Bonjour', 'message': 'Merci',
+            }),
+            ('menu_api', None, 'get', [], {}),
+            ('categories_api', None, 'get', [], {}),
+            ('event_stream', customer, 'get', [], {}),
+            ('admin_dashboard', staff, 'get', [], {}),
+            ('admin_analytics', staff, 'get', [], {}),
+            ('admin_orders', staff, 'get', [], {}),
+            ('update_order_status', staff, 'post', [order.id], {'status': 'cancelled'}),
+            ('admin_reservations', staff, 'get', [], {}),
+            ('admin_reservation_events', staff, 'get', [], {'start': today, 'end': str(timezone.localdate() + timedelta(days=7))}),
+            ('update_reservation_status', staff, 'post', [self.reservations[0].id], {'status': 'confirmed'}),
+            ('admin_export', staff, 'get', ['orders'], {}),
+            ('admin_metrics', staff, 'get', [], {}),
+            ('admin_menu', staff, 'get', [], {}),
+            ('admin_menu_add', staff, 'post', [], {
+                'name': 'Nouveau', 'description': 'Délicieux', 'price': '2000', 'category': self.items[0].category_id,
+            }),
+            ('admin_menu_edit', staff, 'post', [item.id], {
+                'name': 'Renommé', 'description': 'Délicieux', 'price': '1800', 'category': item.category_id,
+            }),
+            ('admin_menu_availability', staff, 'post', [item.id], {}),
+            ('admin_menu_delete', staff, 'post', [self.items[-1].id], {}),
+        ]
+
+    def test_every_route_has_a_budget(self):
+        names = {pattern.name for pattern in ecomm_urls.urlpatterns}
+        self.assertEqual(sorted(names - set(settings.QUERY_BUDGETS)), [])
+        self.assertEqual(names - {name for name, *_ in self.requests()}, set())
+
+    def test_views_stay_within_budget(self):
+        for name, user, method, args, data in self.requests():
+            with self.subTest(view=name, method=method):
+                self.client.logout()
+                if user is not None:
+                    self.client.force_login(user)
+                response = getattr(self.client, method)(reverse(name, args=args), data)
+                self.assertWithinBudget(name, response)
+
+    def assertWithinBudget(self, name, response):
+        self.assertLess(response.status_code, 400)
+        self.assertLessEqual(response.wsgi_request.instrumentation.queries, settings.QUERY_BUDGETS[name])
+
+    def test_costliest_paths_stay_within_budget(self):
+        # Chemins les plus coûteux, pour lesquels les budgets sont fixés :
+        # connexion avec fusion du panier du cookie (dans un panier existant,
+        # puis dans un panier à créer), premier ajout d'un client sans panier,
+        # commande puis livraison
+        User.objects.create_user('sans-panier', password='secret-pass')
+        for username in ('client', 'sans-panier'):
+            self.client.logout()
+            for item in self.items[:3] + self.items[15:17]:
+                self.client.post(reverse('add_to_cart', args=[item.id]))
+            response = self.client.post(reverse('login'), {'username': username, 'password': 'secret-pass'})
+            self.assertWithinBudget('login', response)
+
+        newcomer = User.objects.create_user('nouveau')
+        self.client.force_login(newcomer)
+        self.assertWithinBudget('add_to_cart', self.client.post(reverse('add_to_cart', args=[self.items[0].id])))
+        response = self.client.post(reverse('checkout'), {
+            'address': 'Rue 1', 'phone': '0600000000', 'checkout_token': 'e' * 32,
+        })
+        self.assertWithinBudget('checkout', response)
+        self.client.force_login(self.staff)
+        order = Order.objects.filter(user=newcomer).get()
+        response = self.client.post(reverse('update_order_status', args=[order.id]), {'status': 'delivered'})
+        self.assertWithinBudget('update_order_status', response)
+
+
+class BenchmarkCompareTests(TestCase):
+    def test_regressions_against_baseline(self):
+        from .management.commands.benchmark import regressions
+
+        baseline = {'flow': {
+            'menu': {'queries': 3, 'median_ms': 10.0, 'p95_ms': 12.0, 'p99_ms': 15.0},
+            'load all': {'requests': 100, 'errors': 0, 'rps': 50.0, 'p50_ms': 20.0, 'p95_ms': 40.0, 'p99_ms': 60.0},
+        }}
+        same = {'flow': {
+            'menu': {'queries': 3, 'median_ms': 11.0, 'p95_ms': 14.0, 'p99_ms': 18.0},
+            'load all': {'requests': 100, 'errors': 0, 'rps': 45.0, 'p50_ms': 22.0, 'p95_ms': 44.0, 'p99_ms': 70.0},
+            'nouveau cas': {'queries': 50, 'median_ms': 100.0},
+        }}
+        self.assertEqual(regressions(baseline, same, 0.25), [])
+        worse = {'flow': {
+            'menu': {'queries': 4, 'median_ms': 10.0, 'p95_ms': 20.0, 'p99_ms': 15.0},
+            'load all': {'requests': 100, 'errors': 2, 'rps': 30.0, 'p50_ms': 20.0, 'p95_ms': 40.0, 'p99_ms': 60.0},
+        }}
+        self.assertEqual(regressions(baseline, worse, 0.25), [
+            'flow / menu : 3 -> 4 requêtes SQL',
+            'flow / menu : p95_ms 12.0 -> 20.0',
+            'flow / load all : rps 50.0 -> 30.0',
+            'flow / load all : 0 -> 2 erreurs',
+        ])
+
+
+def session_writes(queries):
+    return [
+        query['sql'] for query in queries
+        if 'django_session' in query['sql'] and query['sql'].startswith(('INSERT', 'UPDATE', 'DELETE'))
+    ]
+
+
+class SessionStorageTests(TestCase):
+    CONTACT = {'name': 'Awa', 'email': 'awa@example.com', 'subject': 'Bonjour', 'message': 'Merci'}
+
+    def post_contact(self):
+        with CaptureQueriesContext(connection) as ctx:
+            response = self.client.post(reverse('contact'), self.CONTACT, follow=True)
+        self.assertContains(response, 'Votre message a été envoyé')
+        return ctx.captured_queries
+
+    @override_settings(MESSAGE_STORAGE='django.contrib.messages.storage.cookie.CookieStorage')
+    def test_cookie_messages_never_write_the_session(self):
+        self.assertEqual(session_writes(self.post_contact()), [])
+        self.assertEqual(Contact.objects.count(), 1)
+
+    @override_settings(MESSAGE_STORAGE='django.contrib.messages.storage.session.SessionStorage')
+    def test_session_messages_write_the_session(self):
+        self.assertEqual(len(session_writes(self.post_contact())), 2)  # Création, puis message consommé
+
+    @override_settings(SESSION_ENGINE='django.contrib.sessions.backends.cached_db')
+    def test_cached_db_sessions_skip_the_session_table_on_reads(self):
+        cache.clear()
+        self.client.force_login(User.objects.create_user('client'))
+        self.client.get(reverse('my_reservations'))
+        with CaptureQueriesContext(connection) as ctx:
+            self.assertEqual(self.client.get(reverse('my_reservations')).status_code, 200)
+        self.assertFalse([query for query in ctx.captured_queries if 'django_session' in query['sql']])
+
+    def test_purge_sessions_deletes_expired_rows_in_batches(self):
+        now = timezone.now()
+        Session.objects.bulk_create(
+            Session(session_key=f'expired{i}', session_data='', expire_date=now - timedelta(days=1)) for i in range(7)
+        )
+        Session.objects.create(session_key='valid', session_data='', expire_date=now + timedelta(days=1))
+        out = io.StringIO()
+        with CaptureQueriesContext(connection) as ctx:
+            call_command('purge_sessions', batch=3, stdout=out)
+        self.assertEqual(list(Session.objects.values_list('session_key', flat=True)), ['valid'])
+        self.assertEqual(len([query for query in ctx.captured_queries if query['sql'].startswith('DELETE')]), 3)
+        self.assertIn('7 session(s)', out.getvalue())
+
+
+@skipUnless(connection.vendor == 'sqlite' and settings.SQLITE_TUNING, "Réglages SQLite désactivés")
+class DatabaseProfileTests(TransactionTestCase):
+    def test_sqlite_transactions_take_the_write_lock_at_begin(self):
+        self.assertEqual(connection.transaction_mode, 'IMMEDIATE')
+        with CaptureQueriesContext(connection) as ctx:
+            with transaction.atomic():
+                Contact.objects.count()
+        self.assertEqual(ctx.captured_queries[0]['sql'], 'BEGIN IMMEDIATE')
+
+    def test_sqlite_connections_wait_for_the_lock(self):
+        with connection.cursor() as cursor:
+            self.assertEqual(cursor.execute('PRAGMA busy_timeout').fetchone()[0], settings.SQLITE_BUSY_TIMEOUT)
+            self.assertEqual(cursor.execute('PRAGMA synchronous').fetchone()[0], 1)  # NORMAL
+
+
+@override_settings(REPLICA_DATABASE='replica')
+class ReplicaRoutingTests(SimpleTestCase):
+    # Le routeur ne fait que choisir un alias : aucune requête n'est exécutée
+    def serve(self, view, cookies=None):
+        request = RequestFactory().get('/')
+        request.COOKIES.update(cookies or {})
+        return routers.ReplicaMiddleware(view)(request)
+
+    def test_replica_views_read_from_the_replica_until_they_write(self):
+        seen = []
+
+        @routers.replica_reads
+        def view(request):
+            seen.append(router.db_for_read(MenuItem))
+            router.db_for_write(Order)
+            seen.append(router.db_for_read(MenuItem))
+            return HttpResponse()
+
+        response = self.serve(view)
+        self.assertEqual(seen, ['replica', 'default'])
+        self.assertNotIn(routers.PIN_COOKIE, self.serve(routers.replica_reads(
+            lambda request: seen.append(router.db_for_read(Session)) or HttpResponse()
+        )).cookies)
+        self.assertEqual(seen[-1], 'default')  # Sessions toujours lues sur la base principale
+        self.assertEqual(response.cookies[routers.PIN_COOKIE]['max-age'], settings.REPLICA_PIN_SECONDS)
+
+    def test_recent_writers_and_other_views_read_from_the_primary(self):
+        seen = []
+        replica_view = routers.replica_reads(lambda request: seen.append(router.db_for_read(MenuItem)) or HttpResponse())
+        self.serve(replica_view, {routers.PIN_COOKIE: '1'})
+        response = self.serve(lambda request: seen.append(router.db_for_read(MenuItem)) or HttpResponse())
+        self.assertEqual(seen, ['default', 'default'])
+        self.assertNotIn(routers.PIN_COOKIE, response.cookies)
+
+    def test_streamed_responses_keep_reading_from_the_replica(self):
+        def chunks():
+            yield router.db_for_read(Order)
+            with routers.primary():
+                yield router.db_for_read(Order)
+
+        response = self.serve(routers.replica_reads(lambda request: StreamingHttpResponse(chunks())))
+        self.assertEqual(b''.join(response.streaming_content), b'replicadefault')
+        self.assertEqual(router.db_for_read(Order), 'default')
+
+    @override_settings(REPLICA_DATABASE=None)
+    def test_without_replica_everything_uses_the_primary(self):
+        seen = []
+        self.serve(routers.replica_reads(lambda request: seen.append(router.db_for_read(MenuItem)) or HttpResponse()))
+        self.assertEqual(seen, ['default'])
+
+
+class StaticAssetsTests(SimpleTestCase):
+    def test_built_assets_match_their_sources(self):
+        call_command('build_assets', check=True, stdout=io.StringIO())
+
+    def test_purge_keeps_used_and_safelisted_rules(self):
+        css = (
+            '.card{color:red}.unused,.card .title{margin:0}.ghost:hover{color:blue}'
+            '@media (max-width:600px){.ghost{display:none}.card{padding:0}}'
+            '@media print{.ghost{color:black}}.status-pending{color:orange}[type=text]{border:0}'
+        )
+        purged = bundles.purge(css, {'card', 'title'})
+        self.assertIn('.card{color:red}', purged)
+        self.assertIn('.card .title{margin:0}', purged)
+        self.assertIn('@media (max-width:600px){.card{padding:0}}', purged)
+        self.assertIn('.status-pending', purged)  # Composée à l'exécution (`status-{{ order.status }}`)
+        self.assertIn('[type=text]', purged)
+        self.assertNotIn('ghost', purged)
+        self.assertNotIn('unused', purged)
+        self.assertNotIn('@media print', purged)
+
+    def test_collected_assets_are_fingerprinted_precompressed_and_cached(self):
+        static_root = tempfile.mkdtemp()
+        self.addCleanup(shutil.rmtree, static_root)
+        with override_settings(STATIC_ROOT=static_root):
+            call_command('collectstatic', interactive=False, verbosity=0)
+            url = StaticStorage().url('build/site.css')
+            self.assertRegex(url, r'^/static/build/site\.[0-9a-f]{12}\.css$')
+            self.assertTrue(os.path.exists(os.path.join(static_root, url.removeprefix('/static/') + '.br')))
+            self.assertTrue(os.path.exists(os.path.join(static_root, url.removeprefix('/static/') + '.gz')))
+            middleware = WhiteNoiseMiddleware(lambda request: HttpResponse(status=404))
+            response = middleware(RequestFactory().get(url, HTTP_ACCEPT_ENCODING='gzip, br'))
+        self.assertEqual(response['Content-Encoding'], 'br')
+        self.assertIn('immutable', response['Cache-Control'])
+        self.assertIn('max-age=315360000', response['Cache-Control'])
+
+    def test_pages_use_original_names_before_collectstatic(self):
+        static_root = tempfile.mkdtemp()
+        self.addCleanup(shutil.rmtree, static_root)
+        with override_settings(STATIC_ROOT=static_root):
+            self.assertEqual(StaticStorage().url('build/site.css'), '/static/build/site.css')
+
+
+SHARED_CART_CACHE = {
+    **settings.CACHES, 'carts': {'BACKEND': 'django.core.cache.backends.locmem.LocMemCache', 'LOCATION': 'test-carts'},
+}
+
+
+class TemplateCacheTests(TestCase):
+    def setUp(self):
+        cache.clear()
+        self.items = make_menu(3)
+        self.user = User.objects.create_user('client')
+
+    def test_templates_are_compiled_once(self):
+        loader = engines['django'].engine.template_loaders[0]
+        self.assertIsInstance(loader, CachedLoader)
+
+    def test_menu_fragments_follow_the_catalog_version(self):
+        self.assertContains(self.client.get(reverse('menu')), 'Plat 0')
+        MenuItem.objects.filter(pk=self.items[0].pk).update(name='Renommé')  # Sans signal : version inchangée
+        self.assertContains(self.client.get(reverse('menu')), 'Plat 0')
+        self.assertContains(self.client.get(reverse('menu'), {'sort': '-name'}), 'Plat 0')  # Même carte en cache
+        catalog.bump_version()
+        self.assertContains(self.client.get(reverse('menu')), 'Renommé')
+
+    def test_cached_cards_do_not_share_csrf_tokens(self):
+        self.client.get(reverse('menu'))
+        client = Client(enforce_csrf_checks=True)
+        html = client.get(reverse('menu')).content.decode()
+        token = re.search(r'name="csrfmiddlewaretoken" value="([^"]+)"', html).group(1)
+        response = client.post(reverse('add_to_cart', args=[self.items[0].id]), {'csrfmiddlewaretoken': token})
+        self.assertEqual(response.json()['cart_count'], 1)
+        token = re.search(r'data-csrf-token="([^"]+)"', html).group(1)
+        response = client.post(reverse('add_to_cart', args=[self.items[1].id]), HTTP_X_CSRFTOKEN=token)
+        self.assertEqual(response.json()['cart_count'], 2)
+
+    def test_query_string_does_not_grow_the_fragment_cache(self):
+        self.client.get(reverse('menu'))
+        size = len(cache._cache)
+        for junk in range(5):
+            self.client.get(reverse('menu'), {'x': junk, 'category': f'x{junk}'})
+        self.assertEqual(len(cache._cache), size)
+
+    @override_settings(CACHES=SHARED_CART_CACHE)
+    def test_header_badge_reads_the_cart_once_per_change(self):
+        self.client.force_login(self.user)
+        with self.captureOnCommitCallbacks(execute=True):
+            self.client.post(reverse('add_to_cart', args=[self.items[0].id]))
+        self.client.get(reverse('contact'))
+        with CaptureQueriesContext(connection) as ctx:
+            response = self.client.get(reverse('contact'))
+        self.assertContains(response, '<span class="cart-count">1</span>')
+        self.assertFalse([query for query in ctx.captured_queries if 'ecomm_cart' in query['sql']])
+        with self.captureOnCommitCallbacks(execute=True):
+            self.client.post(reverse('add_to_cart', args=[self.items[1].id]))
+        self.assertContains(self.client.get(reverse('contact')), '<span class="cart-count">2</span>')
+
+    @override_settings(CACHES=SHARED_CART_CACHE)
+    def test_cart_fragment_follows_the_cart_version(self):
+        self.client.force_login(self.user)
+        with self.captureOnCommitCallbacks(execute=True):
+            cart_ops.add_item(self.user, self.items[0])
+        self.client.get(reverse('panier'))
+        with CaptureQueriesContext(connection) as ctx:
+            self.assertContains(self.client.get(reverse('panier')), 'Plat 0')
+        self.assertFalse([query for query in ctx.captured_queries if 'ecomm_cartitem' in query['sql']])
+        with self.captureOnCommitCallbacks(execute=True):
+            cart_ops.add_item(self.user, self.items[1])
+        self.assertContains(self.client.get(reverse('panier')), 'Plat 1')
+
+
+class QueryPlanTests(TestCase):
+    # Vérifie avec EXPLAIN que les requêtes des vues utilisent un index
+    # plutôt qu'un parcours complet de table suivi d'un tri
+    def setUp(self):
+        if connection.vendor != 'sqlite':
+            self.skipTest("Plans d'exécution propres à SQLite")
+        self.user = User.objects.create_user('client')
+        self.category = Category.objects.create(name='Plats')
+
+    def assertUsesIndex(self, queryset, table):
+        plan = queryset.explain()
+        lines = [line for line in plan.splitlines() if f' {table} ' in f'{line} ']
+        self.assertTrue(lines, plan)
+        for line in lines:
+            self.assertIn(' USING ', line, plan)
+        self.assertNotIn('TEMP B-TREE', plan)
+
+    def test_order_queries(self):
+        self.assertUsesIndex(
+            Order.objects.filter(user=self.user).order_by('-created_at'), 'ecomm_order'
+        )
+        self.assertUsesIndex(Order.objects.order_by('-created_at')[:10], 'ecomm_order')
+        self.assertUsesIndex(Order.objects.filter(status='pending'), 'ecomm_order')
+
+    def test_reservation_queries(self):
+        self.assertUsesIndex(Reservation.objects.order_by('-date', '-time')[:10], 'ecomm_reservation')
+        self.assertUsesIndex(
+            Reservation.objects.filter(date='2026-01-01').order_by('time'), 'ecomm_reservation'
+        )
+        self.assertUsesIndex(
+            Reservation.objects.filter(date__range=['2026-01-01', '2026-02-01']), 'ecomm_reservation'
+        )
+        self.assertUsesIndex(
+            Reservation.objects.filter(user=self.user).order_by('-date'), 'ecomm_reservation'
+        )
+        self.assertUsesIndex(Reservation.objects.filter(status='pending'), 'ecomm_reservation')
+
+    def test_menu_queries(self):
+        for sort in catalog.MENU_SORTS:
+            self.assertUsesIndex(catalog.available_items(None, sort), 'ecomm_menuitem')
+            self.assertUsesIndex(catalog.available_items(self.category.id, sort), 'ecomm_menuitem')
+
+    def test_cart_item_lookup_uses_unique_index(self):
+        cart = Cart.objects.create(user=self.user)
+        item = make_menu(1, self.category)[0]
+        self.assertUsesIndex(CartItem.objects.filter(cart=cart, menu_item=item), 'ecomm_cartitem')
+        CartItem.objects.create(cart=cart, menu_item=item)
+        with self.assertRaises(IntegrityError):
+            CartItem.objects.create(cart=cart, menu_item=item)
+
+
+class OrderHistoryTests(TestCase):
+    def setUp(self):
+        self.user = User.objects.create_user('client', password='secret-pass')
+        self.client.force_login(self.user)
+        self.items = make_menu(3)
+
+    def create_orders(self, count, lines=3):
+        orders = Order.objects.bulk_create(
+            Order(user=self.user, total_amount=Decimal('4500'), phone_number='0600000000')
+            for _ in range(count)
+        )
+        OrderItem.objects.bulk_create(
+            OrderItem(order=order, menu_item=item, quantity=1, price=item.price)
+            for order in orders for item in self.items[:lines]
+        )
+        return orders
+
+    def count_queries(self, url):
+        with CaptureQueriesContext(connection) as ctx:
+            response = self.client.get(url)
+        self.assertEqual(response.status_code, 200)
+        return len(ctx)
+
+    def test_my_orders_query_count_is_constant(self):
+        self.create_orders(1)
+        small = self.count_queries(reverse('my_orders'))
+        self.create_orders(499)
+        large = self.count_queries(reverse('my_orders'))
+        self.assertEqual(small, large)
+
+    def test_my_orders_cursor_walks_all_orders(self):
+        orders = self.create_orders(25, lines=1)
+        seen, url = [], reverse('my_orders')
+        while url:
+            response = self.client.get(url)
+            page = response.context['orders']
+            seen.extend(order.id for order in page)
+            self.assertEqual(page.items[0].orderitem_set.all()[0].line_total, Decimal('1500'))
+            url = f"{reverse('my_orders')}?cursor={page.next_cursor}" if page.has_next else None
+        self.assertEqual(sorted(seen), sorted(order.id for order in orders))
+        self.assertEqual(len(seen), 25)
+        self.assertRedirects(self.client.get(reverse('my_orders'), {'cursor': 'x'}), reverse('my_orders'))
+
+    def test_order_confirmation_query_count_is_constant(self):
+        small_order = self.create_orders(1, lines=1)[0]
+        large_order = self.create_orders(1, lines=3)[0]
+        self.assertEqual(
+            self.count_queries(reverse('order_confirmation', args=[small_order.id])),
+            self.count_queries(reverse('order_confirmation', args=[large_order.id])),
+        )
+
+
+class AsyncReadViewTests(TestCase):
+    def setUp(self):
+        cache.clear()
+
+    async def test_read_views_serve_under_asgi(self):
+        await sync_to_async(make_menu)(3)
+        staff = await User.objects.acreate(username='chef', is_staff=True)
+        await Order.objects.acreate(user=staff, total_amount=Decimal('1500'), phone_number='0600000000')
+        await Reservation.objects.acreate(
+            user=staff, date=date(2026, 11, 2), time=time(19, 30), number_of_guests=2, phone_number='0600000000',
+        )
+        await self.async_client.aforce_login(staff)
+        for url in (reverse('index'), reverse('menu'), reverse('menu') + '?search=plat', reverse('my_orders')):
+            response = await self.async_client.get(url)
+            self.assertEqual(response.status_code, 200, url)
+        self.assertEqual(len(response.context['orders']), 1)
+
+        response = await self.async_client.get(
+            reverse('admin_reservation_events'), {'start': '2026-11-01', 'end': '2026-11-30'}
+        )
+        self.assertEqual([event['title'] for event in response.json()], ['chef - 2 pers.'])
+
+
+class CalendarFeedTests(TestCase):
+    def setUp(self):
+        cache.clear()
+        self.staff = User.objects.create_user('chef', is_staff=True)
+        for day, start in ((date(2026, 11, 2), time(19, 30)), (date(2026, 11, 4), time(12, 0)), (date(2026, 11, 9), time(20, 0))):
+            Reservation.objects.create(
+                user=self.staff, date=day, time=start, number_of_guests=2, phone_number='0600000000',
+            )
+
+    async def get(self, start, end, **headers):
+        await self.async_client.aforce_login(self.staff)
+        return await self.async_client.get(
+            reverse('admin_reservation_events'), {'start': start, 'end': end}, headers=headers,
+        )
+
+    async def test_range_is_filtered_by_day_with_exclusive_end(self):
+        response = await self.get('2026-11-04T00:00:00+01:00', '2026-11-09T00:00:00+01:00')
+        self.assertEqual(response.json(), [{
+            'id': (await Reservation.objects.aget(date=date(2026, 11, 4))).id,
+            'title': 'chef - 2 pers.',
+            'start': '2026-11-04T12:00:00',
+            'className': 'bg-pending',
+        }])
+        self.assertEqual((await self.get('2026-12-01', '2026-12-08')).json(), [])
+
+    async def test_invalid_ranges_are_rejected(self):
+        for start, end in (('', '2026-11-08'), ('hier', '2026-11-08'), ('2026-11-08', '2026-11-01'), ('2026-01-01', '2027-06-01')):
+            self.assertEqual((await self.get(start, end)).status_code, 400, (start, end))
+
+    def test_cached_weeks_and_etag_revalidation(self):
+        self.client.force_login(self.staff)
+        url = reverse('admin_reservation_events')
+        weeks = {'start': '2026-11-02', 'end': '2026-11-16'}
+        first = self.client.get(url, weeks)
+        self.assertEqual(len(first.json()), 3)
+        with CaptureQueriesContext(connection) as queries:
+            cached = self.client.get(url, weeks, headers={'if-none-match': first['ETag']})
+        self.assertEqual(cached.status_code, 304)
+        self.assertEqual(cached['ETag'], first['ETag'])
+        self.assertFalse([q for q in queries if 'ecomm_reservation' in q['sql']])
+
+        # Une réservation d'une autre semaine ne change ni l'ETag ni le cache de cette plage
+        with self.captureOnCommitCallbacks(execute=True):
+            Reservation.objects.create(
+                user=self.staff, date=date(2026, 12, 1), time=time(12, 0), number_of_guests=4, phone_number='0',
+            )
+        self.assertEqual(self.client.get(url, weeks, headers={'if-none-match': first['ETag']}).status_code, 304)
+
+        reservation = Reservation.objects.get(date=date(2026, 11, 9))
+        self.client.force_login(User.objects.create_user('manager', is_staff=True))
+        with self.captureOnCommitCallbacks(execute=True):
+            self.client.post(reverse('update_reservation_status', args=[reservation.id]), {'status': 'confirmed'})
+        changed = self.client.get(url, weeks, headers={'if-none-match': first['ETag']})
+        self.assertEqual(changed.status_code, 200)
+        self.assertEqual(changed.json()[-1]['className'], 'bg-confirmed')
+
+    async def test_year_view_is_streamed(self):
+        response = await self.get('2026-01-01', '2027-01-01')
+        self.assertTrue(response.streaming)
+        body = b''.join([chunk async for chunk in response.streaming_content])
+        self.assertEqual([event['start'][:10] for event in json.loads(body)], ['2026-11-02', '2026-11-04', '2026-11-09'])
+
+    @override_settings(CALENDAR_VERSION_TIMEOUT=60)
+    def test_local_memory_week_versions_expire(self):
+        # Une réservation validée sur un autre worker n'incrémente pas la
+        # version de celui-ci : elle expire, et l'ETag avec elle
+        weeks = [date(2026, 11, 2)]
+        versions = async_to_sync(calendar_feed.aweek_versions)(weeks)
+        later = timezone.now().timestamp() + 61
+        with mock.patch('time.time', return_value=later):
+            self.assertNotEqual(async_to_sync(calendar_feed.aweek_versions)(weeks), versions)
+
+
+class ExportTests(TestCase):
+    def setUp(self):
+        self.staff = User.objects.create_user('chef', is_staff=True)
+        self.customer = User.objects.create_user('client')
+        self.items = make_menu(2)
+        self.order = Order.objects.create(
+            user=self.customer, total_amount=Decimal('4500'), delivery_address='Rue 1, Dakar', phone_number='0600000000',
+        )
+        OrderItem.objects.create(order=self.order, menu_item=self.items[0], quantity=2, price=Decimal('1500'))
+        OrderItem.objects.create(order=self.order, menu_item=self.items[1], quantity=1, price=Decimal('1500'))
+        self.empty_order = Order.objects.create(
+            user=self.customer, total_amount=Decimal('0'), status='cancelled', phone_number='0600000000',
+        )
+
+    def export(self, dataset, **params):
+        self.client.force_login(self.staff)
+        response = self.client.get(reverse('admin_export', args=[dataset]), params)
+        if response.status_code != 200:
+            return response, None
+        return response, b''.join(response.streaming_content).decode()
+
+    def test_orders_csv_has_one_row_per_line(self):
+        response, body = self.export('orders')
+        self.assertEqual(response['Content-Type'], 'text/csv; charset=utf-8')
+        self.assertIn('attachment; filename="orders-', response['Content-Disposition'])
+        rows = list(csv.reader(io.StringIO(body)))
+        self.assertEqual(rows[0], list(exports.ORDER_COLUMNS + exports.ORDER_ITEM_COLUMNS))
+        self.assertEqual([row[0] for row in rows[1:]], [str(self.order.id)] * 2 + [str(self.empty_order.id)])
+        self.assertEqual(rows[1][2:5] + rows[1][7:], ['client', 'pending', '4500.00', 'Plat 0', '2', '1500.00', '3000.00'])
+        self.assertEqual(rows[3][7:], ['', '', '', ''])
+
+    def test_jsonl_with_status_and_date_filters(self):
+        _, body = self.export('orders', format='jsonl', status='pending')
+        records = [json.loads(line) for line in body.splitlines()]
+        self.assertEqual([record['id'] for record in records], [self.order.id])
+        self.assertEqual(records[0]['items'][1], {
+            'item': 'Plat 1', 'quantity': 1, 'unit_price': '1500.00', 'line_total': '1500.00',
+        })
+        today = timezone.localdate()
+        _, body = self.export('orders', format='jsonl', since=str(today + timedelta(days=1)))
+        self.assertEqual(body, '')
+        _, body = self.export('orders', format='jsonl', since=str(today), until=str(today))
+        self.assertEqual(len(body.splitlines()), 2)
+
+        Reservation.objects.create(user=self.customer, date=date(2026, 11, 2), time=time(19, 0), number_of_guests=2)
+        Reservation.objects.create(user=self.customer, date=date(2026, 12, 2), time=time(19, 0), number_of_guests=3)
+        _, body = self.export('reservations', format='jsonl', until='2026-11-30')
+        self.assertEqual([json.loads(line)['date'] for line in body.splitlines()], ['2026-11-02'])
+
+    def test_invalid_parameters_are_rejected(self):
+        self.assertEqual(self.export('orders', status='inconnu')[0].status_code, 400)
+        self.assertEqual(self.export('orders', since='hier')[0].status_code, 400)
+        self.assertEqual(self.export('orders', format='xlsx')[0].status_code, 400)
+        self.assertEqual(self.export('contacts', status='pending')[0].status_code, 400)
+        self.assertEqual(self.export('clients')[0].status_code, 404)
+        self.client.force_login(self.customer)
+        self.assertEqual(self.client.get(reverse('admin_export', args=['orders'])).status_code, 302)
+
+    def test_management_command_writes_file(self):
+        Contact.objects.create(name='Awa', email='awa@example.com', subject='Allergies', message='Sans arachide')
+        with tempfile.TemporaryDirectory() as directory:
+            path = os.path.join(directory, 'contacts.csv')
+            call_command('export_data', 'contacts', output=path, stderr=io.StringIO())
+            with open(path, encoding='utf-8', newline='') as f:
+                rows = list(csv.reader(f))
+        self.assertEqual(rows[1][2:], ['Awa', 'awa@example.com', 'Allergies', 'Sans arachide'])
+
+    def test_csv_neutralises_formulas_in_customer_text(self):
+        Order.objects.filter(pk=self.order.pk).update(delivery_address='=HYPERLINK("http://x.test")')
+        Reservation.objects.create(
+            user=self.customer, date=date(2026, 11, 2), time=time(19, 0), number_of_guests=2,
+            special_requests='+33 table en terrasse',
+        )
+        Contact.objects.create(name='Awa', email='awa@example.com', subject='@commande', message='-1 plat')
+        _, body = self.export('orders')
+        rows = list(csv.reader(io.StringIO(body)))
+        self.assertEqual(rows[1][5], '\'=HYPERLINK("http://x.test")')
+        self.assertEqual(rows[1][4], '4500.00')
+        _, body = self.export('reservations')
+        self.assertEqual(list(csv.reader(io.StringIO(body)))[1][7], "'+33 table en terrasse")
+        _, body = self.export('contacts')
+        self.assertEqual(list(csv.reader(io.StringIO(body)))[1][2:], ['Awa', 'awa@example.com', "'@commande", "'-1 plat"])
+        _, body = self.export('contacts', format='jsonl')
+        self.assertEqual(json.loads(body)['subject'], '@commande')
+
+    def test_csv_neutralises_formulas_in_phone_numbers(self):
+        Order.objects.filter(pk=self.order.pk).update(phone_number='-2+3')
+        Order.objects.filter(pk=self.empty_order.pk).update(phone_number='+33 6 12 34 56 78')
+        Reservation.objects.create(
+            user=self.customer, date=date(2026, 11, 2), time=time(19, 0), number_of_guests=2,
+            phone_number='=HYPERLINK("x")',
+        )
+        _, body = self.export('orders')
+        rows = list(csv.reader(io.StringIO(body)))
+        self.assertEqual([row[6] for row in rows[1:]], ["'-2+3", "'-2+3", '+33 6 12 34 56 78'])
+        _, body = self.export('reservations')
+        self.assertEqual(list(csv.reader(io.StringIO(body)))[1][6], '\'=HYPERLINK("x")')
+
+    def test_memory_does_not_grow_with_export_size(self):
+        def peak(count):
+            Order.objects.filter(id__gt=self.empty_order.id).delete()
+            orders = Order.objects.bulk_create(
+                Order(user=self.customer, total_amount=Decimal('1500'), phone_number='0600000000')
+                for _ in range(count)
+            )
+            OrderItem.objects.bulk_create(
+                OrderItem(order=order, menu_item=self.items[0], quantity=1, price=Decimal('1500')) for order in orders
+            )
+            size = 0
+            tracemalloc.start()
+            for chunk in exports.export('orders', 'csv'):
+                size += len(chunk)
+            peak = tracemalloc.get_traced_memory()[1]
+            tracemalloc.stop()
+            return peak, size
+
+        small_peak, small_size = peak(2 * exports.BATCH_SIZE)
+        large_peak, large_size = peak(8 * exports.BATCH_SIZE)
+        self.assertGreater(large_size, 3 * small_size)
+        self.assertLess(large_peak, small_peak * 1.5)
+
+
+class CartMutationTests(TestCase):
+    def setUp(self):
+        self.user = User.objects.create_user('client')
+        self.items = make_menu(2)
+
+    def test_add_and_update_return_new_values(self):
+        quantity, totals = cart_ops.add_item(self.user, self.items[0])
+        self.assertEqual((quantity, totals['total_items']), (1, 1))
+        quantity, totals = cart_ops.add_item(self.user, self.items[0], quantity=2)
+        self.assertEqual((quantity, totals['total_items'], totals['total_amount']), (3, 3, Decimal('4500')))
+
+        line = CartItem.objects.get()
+        result = cart_ops.update_item(self.user, line.id, 'decrease')
+        self.assertEqual((result['quantity'], result['line_total'], result['cart_count']), (2, Decimal('3000'), 2))
+        result = cart_ops.update_item(self.user, line.id, 'remove')
+        self.assertEqual((result['quantity'], result['cart_count'], result['cart_total']), (0, 0, Decimal('0')))
+        self.assertFalse(CartItem.objects.exists())
+
+    def test_other_users_lines_are_untouched(self):
+        cart_ops.add_item(self.user, self.items[0])
+        intruder = User.objects.create_user('intrus')
+        with self.assertRaises(CartItem.DoesNotExist):
+            cart_ops.update_item(intruder, CartItem.objects.get().id, 'remove')
+        self.assertTrue(CartItem.objects.exists())
+
+    def test_add_to_existing_line_is_two_statements(self):
+        cart_ops.add_item(self.user, self.items[0])
+        with CaptureQueriesContext(connection) as ctx:
+            cart_ops.add_item(self.user, self.items[0])
+        statements = [q['sql'] for q in ctx if 'SAVEPOINT' not in q['sql']]
+        self.assertEqual(len(statements), 2, statements)
+
+    def test_fallback_without_returning(self):
+        with mock.patch('ecomm.db.supports_returning', return_value=False):
+            cart_ops.add_item(self.user, self.items[0])
+            quantity, totals = cart_ops.add_item(self.user, self.items[0])
+            result = cart_ops.update_item(self.user, CartItem.objects.get().id, 'decrease')
+        self.assertEqual((quantity, totals['total_items'], result['quantity']), (2, 2, 1))
+
+
+class SessionCartTests(TestCase):
+    def setUp(self):
+        self.items = make_menu(2)
+
+    def add(self, item):
+        return self.client.post(reverse('add_to_cart', args=[item.id]))
+
+    def test_anonymous_add_writes_nothing(self):
+        with CaptureQueriesContext(connection) as ctx:
+            response = self.add(self.items[0])
+            self.add(self.items[0])
+        writes = [q['sql'] for q in ctx.captured_queries if not q['sql'].startswith(('SELECT', 'SAVEPOINT', 'RELEASE'))]
+        self.assertEqual(writes, [])
+        self.assertEqual(response.json()['cart_count'], 1)
+        self.assertFalse(Cart.objects.exists())
+        self.assertIn(cart_ops.SESSION_CART_COOKIE, self.client.cookies)
+
+    def test_anonymous_cart_page_and_update(self):
+        self.add(self.items[0])
+        self.add(self.items[0])
+        response = self.client.get(reverse('panier'))
+        self.assertContains(response, self.items[0].name)
+        self.assertEqual(response.context['total'], Decimal('3000'))
+        data = self.client.post(
+            reverse('update_cart_item', args=[self.items[0].id]), {'action': 'decrease'}
+        ).json()
+        self.assertEqual((data['quantity'], data['cart_count']), (1, 1))
+        data = self.client.post(
+            reverse('update_cart_item', args=[self.items[0].id]), {'action': 'remove'}
+        ).json()
+        self.assertTrue(data['removed'])
+        self.assertEqual(self.client.get(reverse('panier')).context['cart_items'], [])
+
+    def test_tampered_cookie_is_ignored(self):
+        self.add(self.items[0])
+        value = self.client.cookies[cart_ops.SESSION_CART_COOKIE].value
+        self.client.cookies[cart_ops.SESSION_CART_COOKIE] = value.replace(':1', ':9', 1)
+        response = self.client.get(reverse('panier'))
+        self.assertEqual(response.context['cart_items'], [])
+
+    def test_login_merges_into_existing_cart(self):
+        user = User.objects.create_user('client', password='secret-pass')
+        cart_ops.add_item(user, self.items[0])
+        self.add(self.items[0])
+        self.add(self.items[1])
+        self.add(self.items[1])
+        response = self.client.post(reverse('login'), {'username': 'client', 'password': 'secret-pass'})
+        self.assertRedirects(response, reverse('menu'), fetch_redirect_response=False)
+        self.assertEqual(response.cookies[cart_ops.SESSION_CART_COOKIE].value, '')
+        cart = Cart.objects.get(user=user)
+        self.assertEqual(
+            dict(cart.cartitem_set.values_list('menu_item_id', 'quantity')),
+            {self.items[0].id: 2, self.items[1].id: 2},
+        )
+        self.assertEqual((cart.total_items, cart.total_amount), (4, Decimal('6000')))
+
+    def test_merge_caps_existing_lines(self):
+        user = User.objects.create_user('client')
+        cart_ops.add_item(user, self.items[0], quantity=cart_ops.MAX_LINE_QUANTITY - 1)
+        cart_ops.merge_session_cart(user, {self.items[0].id: 5, self.items[1].id: 500})
+        cart = Cart.objects.get(user=user)
+        self.assertEqual(
+            dict(cart.cartitem_set.values_list('menu_item_id', 'quantity')),
+            {self.items[0].id: cart_ops.MAX_LINE_QUANTITY, self.items[1].id: cart_ops.MAX_LINE_QUANTITY},
+        )
+        self.assertEqual(cart.total_items, 2 * cart_ops.MAX_LINE_QUANTITY)
+
+
+class MenuImageTests(TestCase):
+    def setUp(self):
+        cache.clear()
+        self.media_root = tempfile.mkdtemp()
+        self.addCleanup(shutil.rmtree, self.media_root)
+        settings = override_settings(MEDIA_ROOT=self.media_root, TASKS_EAGER=True)
+        settings.enable()
+        self.addCleanup(settings.disable)
+        self.item = make_menu(1)[0]
+
+    def upload(self, name='plat.png', size=(1200, 800)):
+        buffer = io.BytesIO()
+        Image.new('RGBA', size, (200, 80, 40, 128)).save(buffer, 'PNG')
+        return SimpleUploadedFile(name, buffer.getvalue(), content_type='image/png')
+
+    def attach_image(self, **kwargs):
+        with self.captureOnCommitCallbacks(execute=True):
+            self.item.image = self.upload(**kwargs)
+            self.item.save()
+        self.item.refresh_from_db()
+
+    def render(self):
+        return Template('{% load menu_images %}{% menu_picture item sizes="50vw" %}').render(
+            Context({'item': self.item})
+        )
+
+    def test_upload_derives_hashed_variants(self):
+        self.attach_image()
+        variants = self.item.image_variants
+        self.assertEqual(variants['source'], self.item.image.name)
+        self.assertEqual([width for width, _ in variants['webp']], [320, 640, 960])
+        for width, path in variants['jpeg']:
+            self.assertIn(variants['hash'], path)
+            with default_storage.open(path) as f, Image.open(f) as image:
+                self.assertEqual((image.format, image.mode, image.width), ('JPEG', 'RGB', width))
+
+    def test_small_source_is_not_upscaled(self):
+        self.attach_image(size=(200, 100))
+        self.assertEqual([width for width, _ in self.item.image_variants['webp']], [200])
+
+    def test_template_tag_emits_srcset(self):
+        with mock.patch.object(images, 'schedule') as schedule:
+            self.item.image = self.upload()
+            self.item.save()
+        schedule.assert_called_once()  # Par le signal post_save
+        with mock.patch.object(images, 'schedule') as schedule, self.assertNumQueries(0):
+            html = self.render()
+        schedule.assert_not_called()  # Le rendu (vues sur réplique, fragments en cache) n'écrit rien
+        self.assertIn(self.item.image.url, html)
+        self.assertNotIn('srcset', html)
+
+        images.derive_item(self.item.pk)
+        self.item.refresh_from_db()
+        html = self.render()
+        self.assertIn('<source type="image/webp" srcset="/media/menu_items/derived/', html)
+        self.assertIn('-960w.webp 960w"', html)
+        self.assertIn('sizes="50vw"', html)
+
+    def test_replacing_image_removes_old_variants(self):
+        self.attach_image()
+        old_paths = [path for _, path in self.item.image_variants['webp']]
+        staff = User.objects.create_user('chef', password='secret-pass', is_staff=True)
+        self.client.force_login(staff)
+        with self.captureOnCommitCallbacks(execute=True):
+            self.client.post(reverse('admin_menu_edit', args=[self.item.id]), {
+                'name': 'Plat', 'description': 'Nouveau', 'price': '1500',
+                'category': self.item.category_id, 'image': self.upload(name='autre.png', size=(900, 900)),
+            })
+        self.item.refresh_from_db()
+        self.assertTrue(images.is_current(self.item))
+        self.assertFalse(any(default_storage.exists(path) for path in old_paths))
+        self.assertTrue(os.path.exists(os.path.join(self.media_root, self.item.image_variants['webp'][0][1])))
+
+
+calls = []
+
+
+@tasks.task('tests.flaky', max_attempts=2)
+def flaky(fail=True):
+    calls.append(fail)
+    if fail:
+        raise RuntimeError("indisponible")
+
+
+class TaskQueueTests(TestCase):
+    def setUp(self):
+        calls.clear()
+
+    def test_menu_delete_defers_file_removal(self):
+        media_root = tempfile.mkdtemp()
+        self.addCleanup(shutil.rmtree, media_root)
+        item = make_menu(1)[0]
+        staff = User.objects.create_user('chef', password='secret-pass', is_staff=True)
+        self.client.force_login(staff)
+        with override_settings(MEDIA_ROOT=media_root):
+            MenuItem.objects.filter(pk=item.pk).update(image=default_storage.save('menu_items/plat.jpg', io.BytesIO(b'x')))
+            self.client.post(reverse('admin_menu_delete', args=[item.id]))
+            self.assertTrue(default_storage.exists('menu_items/plat.jpg'))
+            self.assertEqual(Task.objects.get().name, 'delete_files')
+
+            self.assertEqual(tasks.run_pending(), 1)
+            self.assertFalse(default_storage.exists('menu_items/plat.jpg'))
+        self.assertFalse(Task.objects.exists())
+
+    def test_failed_edit_keeps_current_image(self):
+        media_root = tempfile.mkdtemp()
+        self.addCleanup(shutil.rmtree, media_root)
+        item = make_menu(1)[0]
+        self.client.force_login(User.objects.create_user('chef', is_staff=True))
+        with override_settings(MEDIA_ROOT=media_root):
+            MenuItem.objects.filter(pk=item.pk).update(image=default_storage.save('menu_items/plat.jpg', io.BytesIO(b'x')))
+            with self.assertRaises(ValidationError):
+                self.client.post(reverse('admin_menu_edit', args=[item.id]), {
+                    'name': 'Plat', 'description': 'Nouveau', 'price': 'gratuit', 'category': item.category_id,
+                    'image': SimpleUploadedFile('autre.jpg', b'y', content_type='image/jpeg'),
+                })
+        self.assertFalse(Task.objects.exists())
+        item.refresh_from_db()
+        self.assertEqual(item.image.name, 'menu_items/plat.jpg')
+
+    def test_failures_are_retried_with_backoff_then_abandoned(self):
+        tasks.enqueue('tests.flaky')
+        with self.assertLogs('ecomm.tasks', 'WARNING'):
+            tasks.run_pending()
+        task = Task.objects.get()
+        self.assertEqual((task.status, task.attempts), ('pending', 1))
+        self.assertIn('RuntimeError', task.last_error)
+        self.assertGreaterEqual(task.run_at, timezone.now() + timedelta(seconds=tasks.RETRY_BASE_SECONDS - 1))
+        self.assertEqual(tasks.run_pending(), 0)  # Pas avant le délai
+
+        Task.objects.update(run_at=timezone.now())
+        with self.assertLogs('ecomm.tasks', 'ERROR'):
+            tasks.run_pending()
+        task.refresh_from_db()
+        self.assertEqual((task.status, task.attempts, len(calls)), ('failed', 2, 2))
+
+    def test_claim_is_exclusive_and_recovers_stale_tasks(self):
+        tasks.enqueue('tests.flaky', fail=False)
+        self.assertEqual(len(tasks.claim(10)), 1)
+        self.assertEqual(tasks.claim(10), [])
+
+        Task.objects.update(locked_at=timezone.now() - tasks.LOCK_TIMEOUT - timedelta(seconds=1))
+        self.assertEqual(tasks.run_pending(), 1)
+        self.assertEqual(calls, [False])
+        self.assertFalse(Task.objects.exists())
+
+    def test_eager_mode_runs_after_commit(self):
+        with override_settings(TASKS_EAGER=True), self.captureOnCommitCallbacks(execute=True):
+            tasks.enqueue('tests.flaky', fail=False)
+            self.assertEqual(calls, [])
+        self.assertEqual(calls, [False])
+        self.assertFalse(Task.objects.exists())
+
+
+class TaskWorkerCommandTests(TransactionTestCase):
+    def test_run_tasks_drains_queue(self):
+        for _ in range(5):
+            tasks.enqueue('tests.flaky', fail=False)
+        call_command('run_tasks', '--once', '--workers', '1', '--batch', '2', stdout=io.StringIO())
+        self.assertEqual(len(calls), 5)
+        self.assertFalse(Task.objects.exists())
+
+    def test_run_tasks_survives_database_errors(self):
+        out = io.StringIO()
+        with mock.patch.object(tasks, 'run_pending', side_effect=[OperationalError('database is locked'), 3, 0]), \
+                mock.patch('time.sleep') as sleep, self.assertLogs('ecomm.tasks', 'ERROR'):
+            call_command('run_tasks', '--once', stdout=out)
+        self.assertEqual(sleep.call_count, 1)
+        self.assertIn('3 tâche(s)', out.getvalue())
+
+
+class StatusEventTests(TestCase):
+    def setUp(self):
+        self.staff = User.objects.create_user('chef', is_staff=True)
+        self.customer = User.objects.create_user('client')
+        self.other = User.objects.create_user('autre')
+        self.order = Order.objects.create(user=self.customer, total_amount=Decimal('2000'), phone_number='0600000000')
+
+    def listen(self, user):
+        loop = asyncio.new_event_loop()
+        self.addCleanup(loop.close)
+
+        async def open_subscription():
+            return events.Subscription(events.channels_for(user))
+
+        subscription = loop.run_until_complete(open_subscription())
+        events.get_broker().add(subscription)
+        self.addCleanup(events.get_broker().remove, subscription)
+        return loop, subscription
+
+    def received(self, loop, subscription):
+        loop.run_until_complete(asyncio.sleep(0))
+        messages = []
+        while not subscription.queue.empty():
+            messages.append(subscription.queue.get_nowait())
+        return messages
+
+    def test_status_change_reaches_staff_and_owner_after_commit(self):
+        listeners = {user: self.listen(user) for user in (self.staff, self.customer, self.other)}
+        self.client.force_login(self.staff)
+        with self.captureOnCommitCallbacks(execute=True) as callbacks:
+            self.client.post(reverse('update_order_status', args=[self.order.id]), {'status': 'preparing'})
+            self.assertEqual(self.received(*listeners[self.customer]), [])
+        self.assertEqual(len(callbacks), 1)
+
+        expected = events.encode('order', {
+            'id': self.order.id, 'status': 'preparing', 'label': 'En préparation', 'created': False,
+        })
+        self.assertEqual(self.received(*listeners[self.staff]), [expected])
+        self.assertEqual(self.received(*listeners[self.customer]), [expected])
+        self.assertEqual(self.received(*listeners[self.other]), [])
+
+    def test_slow_subscriber_drops_oldest_messages(self):
+        loop, subscription = self.listen(self.customer)
+        for i in range(events.QUEUE_SIZE + 5):
+            events.get_broker().publish(f'user:{self.customer.pk}', str(i).encode())
+        messages = self.received(loop, subscription)
+        self.assertEqual((len(messages), messages[0], subscription.dropped), (events.QUEUE_SIZE, b'5', 5))
+
+    def test_stream_requires_login_and_asgi(self):
+        self.assertEqual(self.client.get(reverse('event_stream')).status_code, 403)
+        self.client.force_login(self.customer)
+        self.assertEqual(self.client.get(reverse('event_stream')).status_code, 204)
+
+    async def test_stream_under_asgi(self):
+        await self.async_client.aforce_login(self.customer)
+        response = await self.async_client.get(reverse('event_stream'))
+        self.assertEqual(response['Content-Type'], 'text/event-stream')
+        chunks = aiter(response.streaming_content)
+        self.assertEqual(await anext(chunks), b'retry: 5000\n\n')
+        message = events.encode('order', {'id': self.order.id})
+        events.get_broker().publish(f'user:{self.customer.pk}', message)
+        self.assertEqual(await anext(chunks), message)
+        await chunks.aclose()
+
+
+class ReservationCapacityTests(TestCase):
+    DAY = date(2026, 11, 20)
+
+    def setUp(self):
+        self.staff = User.objects.create_user('chef', is_staff=True)
+        self.customer = User.objects.create_user('client')
+        DiningTable.objects.create(name='T1', seats=4)
+        DiningTable.objects.create(name='T2', seats=6)
+        DiningTable.objects.create(name='Terrasse', seats=8, is_active=False)
+
+    def book(self, start='19:00', guests=4):
+        self.client.force_login(self.customer)
+        return self.client.post(reverse('make_reservation'), {
+            'date': self.DAY.isoformat(), 'time': start, 'guests': guests, 'phone': '0600000000',
+        })
+
+    def remaining(self, guests=1):
+        return {slot['time'].strftime('%H:%M'): slot['remaining'] for slot in capacity.availability(self.DAY, guests)}
+
+    def test_booking_occupies_every_slot_of_the_meal(self):
+        self.book('19:00', 4)
+        remaining = self.remaining()
+        # Repas de 90 minutes : 19:00, 19:30 et 20:00 sont occupés
+        self.assertEqual([remaining[t] for t in ('19:00', '19:30', '20:00', '20:30')], [6, 6, 6, 10])
+        self.assertEqual(remaining['12:00'], 10)
+
+    def test_full_slot_is_refused_and_nothing_is_written(self):
+        self.book('19:00', 8)
+        response = self.book('19:30', 4)
+        self.assertRedirects(response, reverse('make_reservation'))
+        self.assertEqual(Reservation.objects.count(), 1)
+        self.assertEqual(capacity.check(), [])
+        self.assertEqual(self.book('20:30', 4).status_code, 302)
+        self.assertEqual(Reservation.objects.count(), 2)
+
+    def test_invalid_or_unknown_slot_is_refused(self):
+        self.assertRedirects(self.book('18:45', 2), reverse('make_reservation'))
+        self.assertRedirects(self.book('demain', 2), reverse('make_reservation'))
+        self.assertFalse(Reservation.objects.exists())
+
+    def test_cancel_releases_seats_and_restore_requires_room(self):
+        self.book('19:00', 8)
+        reservation = Reservation.objects.get()
+        self.client.force_login(self.staff)
+        url = reverse('update_reservation_status', args=[reservation.id])
+        self.client.post(url, {'status': 'cancelled'})
+        self.assertEqual(self.remaining()['19:30'], 10)
+
+        self.book('19:30', 6)
+        self.client.force_login(self.staff)
+        response = self.client.post(url, {'status': 'confirmed'})
+        self.assertEqual(response.status_code, 409)
+        reservation.refresh_from_db()
+        self.assertEqual(reservation.status, 'cancelled')
+        self.assertEqual(capacity.check(), [])
+
+    def test_availability_endpoint_and_constant_query_count(self):
+        self.book('19:00', 8)
+        response = self.client.get(reverse('reservation_availability'), {'date': self.DAY.isoformat(), 'guests': 4})
+        slots = {slot['time']: slot['available'] for slot in response.json()['slots']}
+        self.assertFalse(slots['19:30'])
+        self.assertTrue(slots['20:30'])
+        self.assertEqual(self.client.get(reverse('reservation_availability'), {'date': 'x'}).status_code, 400)
+
+        Reservation.objects.bulk_create(
+            Reservation(user=self.customer, date=self.DAY, time=time(12, 0), number_of_guests=1, phone_number='0')
+            for _ in range(50)
+        )
+        with CaptureQueriesContext(connection) as queries:
+            capacity.availability(self.DAY, 2)
+        self.assertEqual(len(queries), 2)
+
+    def test_off_slot_reservation_can_change_status(self):
+        # Réservation antérieure aux créneaux, jamais comptée dans l'occupation
+        reservation = Reservation.objects.create(
+            user=self.customer, date=self.DAY, time=time(18, 45), number_of_guests=4, phone_number='0', status='cancelled',
+        )
+        self.client.force_login(self.staff)
+        url = reverse('update_reservation_status', args=[reservation.id])
+        self.assertEqual(self.client.post(url, {'status': 'confirmed'}).status_code, 200)
+        self.assertEqual(self.remaining()['19:00'], 6)
+        SlotOccupancy.objects.update(seats=1)
+        self.assertEqual(self.client.post(url, {'status': 'cancelled'}).status_code, 200)
+        self.assertEqual(set(SlotOccupancy.objects.values_list('seats', flat=True)), {0})
+
+    def test_rebuild_restores_occupancy(self):
+        self.book('12:00', 3)
+        self.book('12:30', 2)
+        SlotOccupancy.objects.update(seats=0)
+        self.assertEqual(len(capacity.check()), 4)  # 12:00 à 13:30
+        call_command('rebuild_occupancy', stdout=io.StringIO())
+        self.assertEqual(capacity.check(), [])
+        self.assertEqual(self.remaining()['12:30'], 5)
+
+
+class ConcurrentCartTests(TransactionTestCase):
+    WORKERS = 8
+    ADDS_PER_WORKER = 25
+
+    def setUp(self):
+        self.user = User.objects.create_user('client')
+        self.item = make_menu(1)[0]
+
+    def hammer(self, add):
+        def worker(_):
+            done = 0
+            try:
+                while done < self.ADDS_PER_WORKER:
+                    try:
+                        add()
+                        done += 1
+                    except OperationalError:
+                        pass  # Base SQLite verrouillée : on réessaie
+            finally:
+                close_old_connections()
+
+        with ThreadPoolExecutor(self.WORKERS) as pool:
+            list(pool.map(worker, range(self.WORKERS)))
+
+    def test_concurrent_adds_lose_no_updates(self):
+        self.hammer(lambda: cart_ops.add_item(self.user, self.item))
+        expected = self.WORKERS * self.ADDS_PER_WORKER
+        cart = Cart.objects.get(user=self.user)
+        self.assertEqual(CartItem.objects.get().quantity, expected)
+        self.assertEqual(cart.total_items, expected)
+        self.assertEqual(cart.total_amount, self.item.price * expected)
+
+
+class ConcurrentReservationTests(TransactionTestCase):
+    WORKERS = 8
+
+    def test_concurrent_bookings_never_overfill_a_slot(self):
+        DiningTable.objects.create(name='T1', seats=10)
+        day, start = date(2026, 11, 20), time(20, 0)
+        booked = []
+
+        def worker(_):
+            try:
+                while True:
+                    try:
+                        capacity.reserve(day, start, 3)
+                        booked.append(1)
+                        return
+                    except capacity.SlotUnavailable:
+                        return
+                    except OperationalError:
+                        pass  # Base SQLite verrouillée : on réessaie
+            finally:
+                close_old_connections()
+
+        with ThreadPoolExecutor(self.WORKERS) as pool:
+            list(pool.map(worker, range(self.WORKERS)))
+        self.assertEqual(len(booked), 3)
+        self.assertEqual(SlotOccupancy.objects.get(date=day, time=start).seats, 9)
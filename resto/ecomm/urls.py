@@ -14,19 +14,30 @@ urlpatterns = [
     path('order-confirmation/<int:order_id>/', views.order_confirmation, name='order_confirmation'),
     path('my-orders/', views.my_orders, name='my_orders'),
     path('make-reservation/', views.make_reservation, name='make_reservation'),
+    path('make-reservation/availability/', views.reservation_availability, name='reservation_availability'),
     path('my-reservations/', views.my_reservations, name='my_reservations'),
     path('register/', views.register, name='register'),
     path('login/', views.login_view, name='login'),
     path('logout/', auth_views.LogoutView.as_view(next_page='index'), name='logout'),
     path('contact/', views.contact, name='contact'),
 
+    # API JSON du menu
+    path('api/menu/', views.menu_api, name='menu_api'),
+    path('api/categories/', views.categories_api, name='categories_api'),
+
+    # Changements de statut en temps réel (server-sent events, servis par ASGI)
+    path('events/', views.event_stream, name='event_stream'),
+
     # URLs du tableau de bord administrateur
     path('dashboard/', views.admin_dashboard, name='admin_dashboard'),
+    path('dashboard/analytics/', views.admin_analytics, name='admin_analytics'),
     path('dashboard/orders/', views.admin_orders, name='admin_orders'),
     path('dashboard/orders/<int:order_id>/status/', views.update_order_status, name='update_order_status'),
     path('dashboard/reservations/', views.admin_reservations, name='admin_reservations'),
     path('dashboard/reservations/events/', views.admin_reservation_events, name='admin_reservation_events'),
     path('dashboard/reservations/<int:reservation_id>/status/', views.update_reservation_status, name='update_reservation_status'),
+    path('dashboard/export/<str:dataset>/', views.admin_export, name='admin_export'),
+    path('dashboard/metrics/', views.admin_metrics, name='admin_metrics'),
     path('dashboard/menu/', views.admin_menu, name='admin_menu'),
     path('dashboard/menu/add/', views.admin_menu_add, name='admin_menu_add'),
     path('dashboard/menu/<int:item_id>/edit/', views.admin_menu_edit, name='admin_menu_edit'),
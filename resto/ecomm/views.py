@@ -1,17 +1,31 @@
+from asgiref.sync import sync_to_async
+from django.conf import settings
 from django.shortcuts import render, redirect, get_object_or_404
 from django.contrib.auth.decorators import login_required, user_passes_test
-from django.contrib.auth import login, authenticate, logout
+from django.contrib.auth import login, logout
 from django.contrib import messages
 from .models import MenuItem, Category, Cart, CartItem, Contact, Order, OrderItem, Reservation
 from django.contrib.auth.forms import UserCreationForm, AuthenticationForm
-from django.db.models import Q, Sum
+from django.db import transaction
+from django.db.models import DecimalField, ExpressionWrapper, F, Prefetch
 from datetime import datetime, timedelta
-from django.http import JsonResponse
-from django.views.decorators.http import require_POST
+from django.core.handlers.asgi import ASGIRequest
+from django.http import Http404, HttpResponse, JsonResponse, StreamingHttpResponse
+from django.views.decorators.http import condition, require_GET, require_POST
+from django.utils.cache import get_conditional_response, patch_cache_control
+from django.core.exceptions import PermissionDenied
 from django.core.paginator import Paginator
-from django.core.files.storage import default_storage
+from django.utils.crypto import constant_time_compare
+from django.utils.functional import SimpleLazyObject
 from .decorators import anonymous_required
+from .routers import replica_reads
+from . import analytics, calendar_feed, capacity, catalog, events, exports, images, instrumentation, search, stats, tasks
+from . import cart as cart_ops
+from .pagination import InvalidCursor, akeyset_page, keyset_page
+import hashlib
 import json
+import re
+import uuid
 
 @anonymous_required
 def login_view(request):
@@ -19,12 +33,18 @@ def login_view(request):
         form = AuthenticationForm(request, data=request.POST)
         if form.is_valid():
             username = form.cleaned_data.get('username')
-            password = form.cleaned_data.get('password')
-            user = authenticate(username=username, password=password)
+            # Utilisateur déjà authentifié par le formulaire : pas de second hachage du mot de passe
+            user = form.get_user()
             if user is not None:
+                # Récupérer le panier constitué avant la connexion
+                session_cart = cart_ops.read_session_cart(request)
                 login(request, user)
+                cart_ops.merge_session_cart(user, session_cart)
                 messages.success(request, f"Bienvenue {username} !")
-                return redirect('menu')
+                response = redirect('menu')
+                if session_cart:
+                    cart_ops.write_session_cart(request, response, {})
+                return response
             else:
                 messages.error(request, "Nom d'utilisateur ou mot de passe incorrect.")
     else:
@@ -43,166 +63,383 @@ def register(request):
         form = UserCreationForm()
     return render(request, 'registration/register.html', {'form': form})
 
-def index(request):
-    categories = Category.objects.all()
-    featured_items = MenuItem.objects.filter(is_available=True)[:6]
+# Vues de lecture asynchrones : sous ASGI, une requête lente ne bloque pas un
+# worker entier. Le rendu se fait dans un thread, car les gabarits et context
+# processors (utilisateur, session, panier) accèdent à la base de façon synchrone.
+
+async def arender(request, template_name, context=None):
+    return await sync_to_async(render)(request, template_name, context)
+
+@replica_reads
+async def index(request):
     context = {
-        'categories': categories,
-        'featured_items': featured_items,
+        'categories': await catalog.aget_categories(),
+        'featured_items': await catalog.aget_featured_items(),
+        'catalog_version': await catalog.aget_version(),
     }
-    return render(request, 'index.html', context)
+    return await arender(request, 'index.html', context)
 
-@login_required
-def menu(request):
-    # Récupérer tous les articles disponibles
-    items = MenuItem.objects.filter(is_available=True)
-    categories = Category.objects.all()
+def paginate_menu(items, number):
+    # Page de 12 plats, évaluée ici plutôt que pendant le rendu
+    page = Paginator(items, 12).get_page(number)
+    page.object_list = list(page.object_list)
+    return page
+
+@replica_reads
+async def menu(request):
+    category_id = request.GET.get('category')
+    search_query = request.GET.get('search')
+    sort = request.GET.get('sort', 'name')  # Par défaut, tri par nom
+    page = request.GET.get('page')
+    
+    if search_query:
+        # Recherche plein texte : triée par pertinence, sauf tri explicite.
+        # Dans un thread : sans FTS, l'index en mémoire se reconstruit depuis la base
+        def search_page():
+            items = MenuItem.objects.filter(is_available=True)
+            if category_id:
+                items = items.filter(category_id=category_id)
+            items = search.search(items, search_query)
+            if request.GET.get('sort') in catalog.MENU_SORTS:
+                items = items.order_by(sort)
+            return paginate_menu(items, page)
+
+        items = await sync_to_async(search_page)()
+    else:
+        # Articles disponibles filtrés et triés, servis depuis le cache du catalogue
+        items = paginate_menu(await catalog.aget_menu_items(category_id or None, sort), page)
+    
+    context = {
+        'categories': await catalog.aget_categories(),
+        'items': items,
+        'catalog_version': await catalog.aget_version(),
+        # Catégorie sélectionnée, normalisée : elle entre dans la clé du fragment en cache
+        'category_id': category_id if category_id and category_id.isdigit() else '',
+    }
+    return await arender(request, 'menu.html', context)
+
+# API JSON du menu (lecture seule)
+
+API_PAGE_SIZE = 12
+API_MAX_PAGE_SIZE = 100
+
+def catalog_etag(request, *args, **kwargs):
+    # ETag fort : version du catalogue + paramètres de la requête
+    params = hashlib.md5(request.GET.urlencode().encode()).hexdigest()[:12]
+    return f"{catalog.get_version()}-{params}"
+
+def serialize_menu_item(item):
+    return {
+        'id': item.id,
+        'name': item.name,
+        'description': item.description,
+        'price': str(item.price),
+        'image': item.image.url if item.image else None,
+        'category': {'id': item.category_id, 'name': item.category.name},
+    }
+
+@replica_reads
+@require_GET
+@condition(etag_func=catalog_etag)
+def menu_api(request):
+    items = MenuItem.objects.filter(is_available=True).select_related('category')
     
-    # Filtrage par catégorie
     category_id = request.GET.get('category')
     if category_id:
+        if not category_id.isdigit():
+            return JsonResponse({'error': "Catégorie invalide"}, status=400)
         items = items.filter(category_id=category_id)
     
-    # Recherche
     search_query = request.GET.get('search')
     if search_query:
-        items = items.filter(
-            Q(name__icontains=search_query) |
-            Q(description__icontains=search_query)
-        )
+        items = search.search(items, search_query, rank=False)
     
-    # Tri
-    sort = request.GET.get('sort', 'name')  # Par défaut, tri par nom
-    if sort in ['name', '-name', 'price', '-price']:
-        items = items.order_by(sort)
+    sort = request.GET.get('sort', 'name')
+    if sort not in catalog.MENU_SORTS:
+        return JsonResponse({'error': "Tri invalide"}, status=400)
     
-    # Pagination
-    paginator = Paginator(items, 12)  # 12 items par page
-    page = request.GET.get('page')
-    items = paginator.get_page(page)
+    try:
+        limit = min(int(request.GET.get('limit', API_PAGE_SIZE)), API_MAX_PAGE_SIZE)
+    except ValueError:
+        return JsonResponse({'error': "Limite invalide"}, status=400)
     
-    context = {
-        'categories': categories,
-        'items': items,
-    }
-    return render(request, 'menu.html', context)
+    # Le sens de l'id suit celui du tri pour que la clé (tri, id) soit unique et monotone
+    ordering = [sort, '-id' if sort.startswith('-') else 'id']
+    try:
+        page = keyset_page(items, ordering, request.GET.get('cursor'), max(limit, 1))
+    except InvalidCursor as e:
+        return JsonResponse({'error': str(e)}, status=400)
+    
+    next_url = None
+    if page.has_next:
+        params = request.GET.copy()
+        params['cursor'] = page.next_cursor
+        next_url = f"{request.path}?{params.urlencode()}"
+    
+    return JsonResponse({
+        'results': [serialize_menu_item(item) for item in page],
+        'next': next_url,
+    }, json_dumps_params={'ensure_ascii': False})
+
+@replica_reads
+@require_GET
+@condition(etag_func=catalog_etag)
+def categories_api(request):
+    categories = [
+        {'id': category.id, 'name': category.name, 'description': category.description}
+        for category in catalog.get_categories()
+    ]
+    return JsonResponse({'results': categories}, json_dumps_params={'ensure_ascii': False})
 
-@login_required
 def panier(request):
-    cart, created = Cart.objects.get_or_create(user=request.user)
-    items = cart.cartitem_set.all()
-    total = cart.get_total()
+    # Panier lu seulement si le fragment des lignes (clé : versions du panier
+    # et du catalogue) n'est pas en cache
+    if request.user.is_authenticated:
+        cart = SimpleLazyObject(lambda: Cart.objects.get_or_create(user=request.user)[0])
+        items = CartItem.objects.filter(cart__user=request.user).select_related('menu_item')
+    else:
+        lines = cart_ops.read_session_cart(request)
+        cart = SimpleLazyObject(lambda: cart_ops.SessionCart(lines))
+        items = SimpleLazyObject(lambda: cart.items)
     context = {
+        'cart': cart,
         'cart_items': items,
-        'total': total,
+        'total': SimpleLazyObject(lambda: cart.get_total()),
+        'cart_version': cart_ops.fragment_version(request),
+        'catalog_version': catalog.get_version(),
     }
     return render(request, 'panier.html', context)
 
-@login_required
 def add_to_cart(request, item_id):
     if request.method == 'POST':
         menu_item = get_object_or_404(MenuItem, id=item_id)
-        cart, created = Cart.objects.get_or_create(user=request.user)
-        cart_item, created = CartItem.objects.get_or_create(cart=cart, menu_item=menu_item)
-        
-        if not created:
-            cart_item.quantity += 1
-            cart_item.save()
+        session_lines = None
+        if request.user.is_authenticated:
+            line_quantity, totals = cart_ops.add_item(request.user, menu_item)
+            cart_count = totals['total_items']
+        else:
+            # Visiteur : panier dans un cookie signé, aucune écriture en base
+            try:
+                session_lines = cart_ops.add_session_item(request, menu_item)
+            except cart_ops.SessionCartFull:
+                return JsonResponse({'success': False, 'message': "Votre panier est plein."}, status=400)
+            line_quantity = session_lines[menu_item.id]
+            cart_count = sum(session_lines.values())
         
         # Encodage correct du message avec les caractères spéciaux
         message = "{} ajouté au panier!".format(menu_item.name)
         
-        return JsonResponse({
+        response = JsonResponse({
             'success': True,
-            'cart_count': cart.get_total_items(),
+            'quantity': line_quantity,
+            'cart_count': cart_count,
             'message': message
         }, json_dumps_params={'ensure_ascii': False})
+        if session_lines is not None:
+            cart_ops.write_session_cart(request, response, session_lines)
+        return response
     
     return JsonResponse({'success': False}, status=400)
 
-@login_required
 @require_POST
 def update_cart_item(request, item_id):
-    cart_item = get_object_or_404(CartItem, id=item_id, cart__user=request.user)
     action = request.POST.get('action')
+    if action not in ('increase', 'decrease', 'remove'):
+        return JsonResponse({'success': False}, status=400)
     
-    if action == 'increase':
-        cart_item.quantity += 1
-    elif action == 'decrease':
-        if cart_item.quantity > 1:
-            cart_item.quantity -= 1
-        else:
-            cart_item.delete()
-            return JsonResponse({'removed': True})
-    elif action == 'remove':
-        cart_item.delete()
-        cart_total = cart_item.cart.get_total()
+    if not request.user.is_authenticated:
+        return update_session_cart_item(request, item_id, action)
+    
+    try:
+        result = cart_ops.update_item(request.user, item_id, action)
+    except CartItem.DoesNotExist:
+        raise Http404("Article introuvable dans le panier")
+    
+    if not result['quantity']:
         return JsonResponse({
             'removed': True,
-            'cart_total': float(cart_total)
+            'cart_total': float(result['cart_total']),
+            'cart_count': result['cart_count']
         })
-    
-    cart_item.save()
     return JsonResponse({
-        'quantity': cart_item.quantity,
-        'total': float(cart_item.get_total()),
-        'cart_total': float(cart_item.cart.get_total())
+        'quantity': result['quantity'],
+        'total': float(result['line_total']),
+        'cart_total': float(result['cart_total']),
+        'cart_count': result['cart_count']
     })
 
+def update_session_cart_item(request, item_id, action):
+    # Pour un visiteur, item_id est l'id du plat
+    try:
+        lines = cart_ops.update_session_item(request, item_id, action)
+    except CartItem.DoesNotExist:
+        raise Http404("Article introuvable dans le panier")
+    
+    cart = cart_ops.SessionCart(lines)
+    data = {
+        'cart_total': float(cart.get_total()),
+        'cart_count': cart.get_total_items()
+    }
+    line = next((item for item in cart.items if item.id == item_id), None)
+    if line is None:
+        data['removed'] = True
+    else:
+        data['quantity'] = line.quantity
+        data['total'] = float(line.get_total())
+    response = JsonResponse(data)
+    cart_ops.write_session_cart(request, response, lines)
+    return response
+
 @login_required
 def checkout(request):
-    cart = get_object_or_404(Cart, user=request.user)
     if request.method == 'POST':
-        # Créer la commande
-        order = Order.objects.create(
-            user=request.user,
-            total_amount=cart.get_total(),
-            delivery_address=request.POST.get('address'),
-            phone_number=request.POST.get('phone')
-        )
-        
-        # Créer les éléments de la commande
-        for item in cart.cartitem_set.all():
-            OrderItem.objects.create(
-                order=order,
-                menu_item=item.menu_item,
-                quantity=item.quantity,
-                price=item.menu_item.price
+        # Jeton émis par le formulaire (uuid4 en hexadécimal) ; toute autre valeur est ignorée
+        checkout_token = request.POST.get('checkout_token', '')
+        if not re.fullmatch(r'[0-9a-f]{32}', checkout_token):
+            checkout_token = None
+        with transaction.atomic():
+            # Verrouiller le panier : les soumissions simultanées sont sérialisées
+            cart = get_object_or_404(Cart.objects.select_for_update(), user=request.user)
+            
+            # Double soumission : renvoyer la commande déjà créée avec ce jeton
+            if checkout_token:
+                order = Order.objects.filter(user=request.user, checkout_token=checkout_token).first()
+                if order is not None:
+                    return redirect('order_confirmation', order_id=order.id)
+            
+            # Lire les lignes une seule fois ; le total est calculé sur ce même instantané
+            lines = list(cart.cartitem_set.select_related('menu_item'))
+            if not lines:
+                messages.error(request, "Votre panier est vide.")
+                return redirect('panier')
+            
+            # Créer la commande
+            order = Order.objects.create(
+                user=request.user,
+                total_amount=sum(line.get_total() for line in lines),
+                delivery_address=request.POST.get('address'),
+                phone_number=request.POST.get('phone'),
+                checkout_token=checkout_token
             )
-        
-        # Vider le panier
-        cart.cartitem_set.all().delete()
+            
+            # Créer les éléments de la commande en une seule requête
+            items = OrderItem.objects.bulk_create([
+                OrderItem(
+                    order=order,
+                    menu_item=line.menu_item,
+                    quantity=line.quantity,
+                    price=line.menu_item.price
+                )
+                for line in lines
+            ])
+            
+            # Vider le panier
+            cart.clear()
+            cart_ops.bump_version(request.user.id)
+            analytics.order_created(order, items)
+            events.order_changed(order, created=True)
         
         messages.success(request, "Votre commande a été passée avec succès!")
         return redirect('order_confirmation', order_id=order.id)
     
-    return render(request, 'checkout.html', {'cart': cart})
+    cart = get_object_or_404(Cart, user=request.user)
+    context = {
+        'cart': cart,
+        'cart_items': cart.cartitem_set.select_related('menu_item'),
+        'checkout_token': uuid.uuid4().hex,
+    }
+    return render(request, 'checkout.html', context)
+
+ORDERS_PAGE_SIZE = 10
+
+def with_order_lines(orders):
+    # Lignes de commande chargées en une requête pour toutes les commandes,
+    # avec leur plat et leur montant calculé en SQL
+    lines = OrderItem.objects.select_related('menu_item').annotate(
+        line_total=ExpressionWrapper(
+            F('price') * F('quantity'),
+            output_field=DecimalField(max_digits=10, decimal_places=2)
+        )
+    ).order_by('id')
+    return orders.prefetch_related(Prefetch('orderitem_set', queryset=lines))
 
 @login_required
 def order_confirmation(request, order_id):
-    order = get_object_or_404(Order, id=order_id, user=request.user)
+    order = get_object_or_404(with_order_lines(Order.objects), id=order_id, user=request.user)
     return render(request, 'order_confirmation.html', {'order': order})
 
 @login_required
-def my_orders(request):
-    orders = Order.objects.filter(user=request.user).order_by('-created_at')
-    return render(request, 'my_orders.html', {'orders': orders})
+async def my_orders(request):
+    user = await request.auser()
+    orders = with_order_lines(Order.objects.filter(user=user))
+    cursor = request.GET.get('cursor')
+    try:
+        page = await akeyset_page(orders, ['-created_at', '-id'], cursor, ORDERS_PAGE_SIZE)
+    except InvalidCursor:
+        return redirect('my_orders')
+    context = {
+        'orders': page,
+        'is_first_page': not cursor,
+    }
+    return await arender(request, 'my_orders.html', context)
+
+def parse_reservation_request(data):
+    # (date, heure, nombre de personnes) ; ValueError si la saisie est invalide
+    day = datetime.strptime(data.get('date', ''), '%Y-%m-%d').date()
+    start = datetime.strptime(data.get('time', ''), '%H:%M').time()
+    guests = int(data.get('guests', ''))
+    if guests < 1:
+        raise ValueError(guests)
+    return day, start, guests
 
 @login_required
 def make_reservation(request):
     if request.method == 'POST':
-        reservation = Reservation.objects.create(
-            user=request.user,
-            date=request.POST.get('date'),
-            time=request.POST.get('time'),
-            number_of_guests=request.POST.get('guests'),
-            special_requests=request.POST.get('requests'),
-            phone_number=request.POST.get('phone')
-        )
+        try:
+            day, start, guests = parse_reservation_request(request.POST)
+        except ValueError:
+            messages.error(request, "Date, heure ou nombre de personnes invalide.")
+            return redirect('make_reservation')
+        try:
+            with transaction.atomic():
+                # Places prises avant la création : un créneau plein annule tout
+                capacity.reserve(day, start, guests)
+                reservation = Reservation.objects.create(
+                    user=request.user,
+                    date=day,
+                    time=start,
+                    number_of_guests=guests,
+                    special_requests=request.POST.get('requests', ''),
+                    phone_number=request.POST.get('phone')
+                )
+                events.reservation_changed(reservation, created=True)
+        except capacity.SlotUnavailable as exc:
+            messages.error(request, f"{exc} Choisissez un autre créneau.")
+            return redirect('make_reservation')
         messages.success(request, "Votre réservation a été enregistrée!")
         return redirect('my_reservations')
     
-    return render(request, 'make_reservation.html')
+    return render(request, 'make_reservation.html', {
+        'today': datetime.today(),
+        'slots': capacity.slots(),
+    })
+
+@require_GET
+def reservation_availability(request):
+    # Créneaux encore ouverts pour une date et une taille de groupe (formulaire de réservation)
+    try:
+        day = datetime.strptime(request.GET.get('date', ''), '%Y-%m-%d').date()
+        guests = int(request.GET.get('guests') or 1)
+    except ValueError:
+        return JsonResponse({'error': "Paramètres invalides"}, status=400)
+    return JsonResponse({
+        'date': day.isoformat(),
+        'guests': guests,
+        'slots': [
+            {'time': slot['time'].strftime('%H:%M'), 'remaining': slot['remaining'], 'available': slot['available']}
+            for slot in capacity.availability(day, guests)
+        ],
+    })
 
 @login_required
 def my_reservations(request):
@@ -232,69 +469,145 @@ def contact(request):
 def is_staff(user):
     return user.is_staff
 
+@replica_reads
 @user_passes_test(is_staff)
 def admin_dashboard(request):
-    # Statistiques générales
-    total_orders = Order.objects.count()
-    total_revenue = Order.objects.filter(status='delivered').aggregate(Sum('total_amount'))['total_amount__sum'] or 0
-    pending_orders = Order.objects.filter(status='pending').count()
-    pending_reservations = Reservation.objects.filter(status='pending').count()
+    # Statistiques générales, lues depuis les compteurs dénormalisés
+    context = stats.dashboard_stats()
     
     # Commandes récentes
-    recent_orders = Order.objects.order_by('-created_at')[:5]
+    context['recent_orders'] = Order.objects.select_related('user').order_by('-created_at')[:5]
     
     # Réservations du jour
-    today_reservations = Reservation.objects.filter(date=datetime.today()).order_by('time')
+    context['today_reservations'] = Reservation.objects.filter(
+        date=datetime.today()
+    ).select_related('user').order_by('time')
     
+    return render(request, 'dashboard/dashboard.html', context)
+
+ANALYTICS_PERIODS = (7, 30, 90, 365)
+
+@replica_reads
+@user_passes_test(is_staff)
+def admin_analytics(request):
+    # Rapports de ventes, lus uniquement dans les cumuls journaliers (ecomm.analytics)
+    days = request.GET.get('days', '30')
+    days = int(days) if days.isdigit() and int(days) in ANALYTICS_PERIODS else 30
+    since, until = analytics.period(days)
+    by_day = analytics.revenue_by_day(since, until)
+    by_hour = {row['hour']: row for row in analytics.revenue_by_hour(since, until)}
+    top_items = analytics.top_items(since, until)
+    categories = analytics.sales_by_category(since, until)
+    charts = {
+        'days': {
+            'labels': [row['date'].strftime('%d/%m') for row in by_day],
+            'revenue': [float(row['revenue']) for row in by_day],
+            'orders': [row['order_count'] for row in by_day],
+        },
+        'hours': {
+            'labels': [f'{hour}h' for hour in range(24)],
+            'revenue': [float(by_hour[hour]['revenue']) if hour in by_hour else 0 for hour in range(24)],
+        },
+        'items': {
+            'labels': [row['menu_item__name'] for row in top_items],
+            'quantity': [row['quantity'] for row in top_items],
+        },
+        'categories': {
+            'labels': [row['category__name'] for row in categories],
+            'revenue': [float(row['revenue']) for row in categories],
+        },
+    }
     context = {
-        'total_orders': total_orders,
-        'total_revenue': total_revenue,
-        'pending_orders': pending_orders,
-        'pending_reservations': pending_reservations,
-        'recent_orders': recent_orders,
-        'today_reservations': today_reservations,
+        'days': days,
+        'periods': ANALYTICS_PERIODS,
+        'since': since,
+        'until': until,
+        'total_revenue': sum(row['revenue'] for row in by_day),
+        'total_orders': sum(row['order_count'] for row in by_day),
+        'top_items': top_items,
+        'charts': charts,
     }
-    return render(request, 'dashboard/dashboard.html', context)
+    return render(request, 'dashboard/analytics.html', context)
 
+@replica_reads
 @user_passes_test(is_staff)
 def admin_orders(request):
-    orders = Order.objects.all().order_by('-created_at')
+    # Client et lignes (avec leur plat) chargés pour toute la page en deux requêtes
+    orders = with_order_lines(Order.objects.select_related('user').order_by('-created_at'))
     paginator = Paginator(orders, 10)
     page = request.GET.get('page')
     orders = paginator.get_page(page)
-    return render(request, 'dashboard/orders.html', {'orders': orders})
+    # Liens vers les pages voisines et les extrémités seulement : une page par
+    # commande rendrait des milliers de liens
+    page_range = paginator.get_elided_page_range(orders.number, on_each_side=2, on_ends=1)
+    return render(request, 'dashboard/orders.html', {'orders': orders, 'page_range': page_range})
 
+@replica_reads
 @user_passes_test(is_staff)
 def admin_reservations(request):
-    reservations = Reservation.objects.all().order_by('-date', '-time')
+    reservations = Reservation.objects.select_related('user').order_by('-date', '-time')
     paginator = Paginator(reservations, 10)
     page = request.GET.get('page')
     reservations = paginator.get_page(page)
     return render(request, 'dashboard/reservations.html', {'reservations': reservations})
 
 @user_passes_test(is_staff)
-def admin_reservation_events(request):
-    start = request.GET.get('start')
-    end = request.GET.get('end')
-    
-    reservations = Reservation.objects.filter(
-        date__range=[start, end]
-    ).select_related('user')
-    
-    events = []
-    for reservation in reservations:
-        events.append({
-            'id': reservation.id,
-            'title': f"{reservation.user.username} - {reservation.number_of_guests} pers.",
-            'start': f"{reservation.date}T{reservation.time}",
-            'className': f"bg-{reservation.status}",
-        })
-    
-    return JsonResponse(events, safe=False)
+@require_GET
+async def admin_reservation_events(request):
+    try:
+        start, end = calendar_feed.parse_range(request.GET.get('start'), request.GET.get('end'))
+    except ValueError:
+        return JsonResponse({'error': "Paramètres start/end invalides"}, status=400)
+
+    versions = await calendar_feed.aweek_versions(calendar_feed.weeks_between(start, end))
+    etag = calendar_feed.etag(start, end, versions)
+    response = get_conditional_response(request, etag=etag)
+    if response is None:
+        feed = calendar_feed.afeed(start, end, versions)
+        if len(versions) > calendar_feed.STREAM_MIN_WEEKS:
+            # Vue annuelle : diffusée semaine par semaine, sans tout garder en mémoire
+            response = StreamingHttpResponse(feed, content_type='application/json')
+        else:
+            response = HttpResponse(b''.join([chunk async for chunk in feed]), content_type='application/json')
+    response['ETag'] = etag
+    patch_cache_control(response, private=True, no_cache=True)
+    return response
+
+@replica_reads
+@user_passes_test(is_staff)
+@require_GET
+def admin_export(request, dataset):
+    # Export comptable diffusé en flux (CSV ou JSONL), filtrable par dates et statut
+    if dataset not in exports.DATASETS:
+        raise Http404("Export inconnu")
+    fmt = request.GET.get('format', 'csv')
+    try:
+        chunks = exports.export(
+            dataset, fmt,
+            since=exports.parse_date(request.GET.get('since')),
+            until=exports.parse_date(request.GET.get('until')),
+            status=request.GET.get('status') or None,
+        )
+    except ValueError as exc:
+        return JsonResponse({'error': str(exc)}, status=400)
+    response = StreamingHttpResponse(chunks, content_type=exports.CONTENT_TYPES[fmt])
+    response['Content-Disposition'] = f'attachment; filename="{dataset}-{datetime.now():%Y%m%d}.{fmt}"'
+    return response
+
+@require_GET
+def admin_metrics(request):
+    # Métriques des vues au format Prometheus : personnel connecté, ou scraper
+    # muni du jeton METRICS_TOKEN (en-tête Authorization: Bearer <jeton>)
+    token = settings.METRICS_TOKEN
+    scraper = token and constant_time_compare(request.headers.get('Authorization', ''), f'Bearer {token}')
+    if not (scraper or request.user.is_staff):
+        raise PermissionDenied
+    return HttpResponse(instrumentation.registry.render(), content_type='text/plain; version=0.0.4; charset=utf-8')
 
+@replica_reads
 @user_passes_test(is_staff)
 def admin_menu(request):
-    items = MenuItem.objects.all().order_by('category', 'name')
+    items = MenuItem.objects.select_related('category').order_by('category', 'name')
     categories = Category.objects.all()
     return render(request, 'dashboard/menu.html', {'items': items, 'categories': categories})
 
@@ -330,12 +643,17 @@ def admin_menu_edit(request, item_id):
     item.price = request.POST.get('price')
     item.category_id = request.POST.get('category')
     
-    if 'image' in request.FILES:
-        if item.image:
-            default_storage.delete(item.image.path)
-        item.image = request.FILES['image']
-    
-    item.save()
+    # Tâche et modification dans la même transaction : si l'enregistrement
+    # échoue, les fichiers de la photo actuelle ne sont pas supprimés
+    with transaction.atomic():
+        if 'image' in request.FILES:
+            if item.image:
+                # Suppression des fichiers par le worker, hors de la requête
+                tasks.enqueue('delete_files', [item.image.name, *images.variant_paths(item)])
+            item.image = request.FILES['image']
+            item.image_variants = {}
+        
+        item.save()
     
     messages.success(request, "Article modifié avec succès!")
     return redirect('admin_menu')
@@ -345,10 +663,11 @@ def admin_menu_edit(request, item_id):
 def admin_menu_delete(request, item_id):
     item = get_object_or_404(MenuItem, id=item_id)
     
-    if item.image:
-        default_storage.delete(item.image.path)
-    
-    item.delete()
+    with transaction.atomic():
+        if item.image:
+            tasks.enqueue('delete_files', [item.image.name, *images.variant_paths(item)])
+        
+        item.delete()
     
     messages.success(request, "Article supprimé avec succès!")
     return redirect('admin_menu')
@@ -367,21 +686,60 @@ def admin_menu_availability(request, item_id):
 @user_passes_test(is_staff)
 @require_POST
 def update_order_status(request, order_id):
-    order = get_object_or_404(Order, id=order_id)
     status = request.POST.get('status')
     if status in dict(Order.STATUS_CHOICES):
-        order.status = status
-        order.save()
+        with transaction.atomic():
+            order = get_object_or_404(Order.objects.select_for_update(), id=order_id)
+            old_status = order.status
+            order.status = status
+            order.save()
+            analytics.order_status_changed(order, old_status)
+            events.order_changed(order)
         return JsonResponse({'success': True})
     return JsonResponse({'success': False}, status=400)
 
 @user_passes_test(is_staff)
 @require_POST
 def update_reservation_status(request, reservation_id):
-    reservation = get_object_or_404(Reservation, id=reservation_id)
     status = request.POST.get('status')
     if status in dict(Reservation.STATUS_CHOICES):
-        reservation.status = status
-        reservation.save()
+        try:
+            with transaction.atomic():
+                reservation = get_object_or_404(Reservation.objects.select_for_update(), id=reservation_id)
+                old_status = reservation.status
+                reservation.status = status
+                # Annulation : places libérées ; rétablissement : places reprises si le créneau le permet
+                capacity.status_changed(reservation, old_status)
+                reservation.save()
+                events.reservation_changed(reservation)
+        except capacity.SlotUnavailable as exc:
+            return JsonResponse({'success': False, 'message': str(exc)}, status=409)
         return JsonResponse({'success': True})
     return JsonResponse({'success': False}, status=400)
+
+# Flux temps réel des changements de statut (server-sent events)
+
+EVENTS_HEARTBEAT = 15  # secondes ; garde la connexion ouverte derrière les proxys
+
+async def event_stream(request):
+    user = await request.auser()
+    if not user.is_authenticated:
+        return HttpResponse(status=403)
+    if not isinstance(request, ASGIRequest):
+        # Sous WSGI, une connexion longue bloquerait un worker : 204 indique
+        # au navigateur de ne pas se reconnecter (la page reste à recharger)
+        return HttpResponse(status=204)
+
+    async def stream():
+        async with events.Subscription(events.channels_for(user)) as subscription:
+            yield b'retry: 5000\n\n'
+            while True:
+                try:
+                    yield await subscription.get(timeout=EVENTS_HEARTBEAT)
+                except TimeoutError:
+                    yield b': ping\n\n'
+
+    response = StreamingHttpResponse(stream(), content_type='text/event-stream')
+    response['Cache-Control'] = 'no-cache'
+    response['X-Accel-Buffering'] = 'no'
+    return response
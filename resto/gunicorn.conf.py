@@ -0,0 +1,16 @@
+import os
+
+# Configuration gunicorn (Procfile). SERVER_MODE choisit le type de workers :
+#   wsgi : workers synchrones, une requête à la fois par processus (défaut)
+#   asgi : workers uvicorn ; les vues async et le flux /events/ partagent
+#          une boucle d'événements, beaucoup de connexions par processus
+SERVER_MODE = os.environ.get('SERVER_MODE', 'wsgi')
+
+bind = f"0.0.0.0:{os.environ.get('PORT', '8000')}"
+workers = int(os.environ.get('WEB_CONCURRENCY', 2))
+
+if SERVER_MODE == 'asgi':
+    wsgi_app = 'resto.asgi:application'
+    worker_class = 'uvicorn_worker.UvicornWorker'
+else:
+    wsgi_app = 'resto.wsgi:application'
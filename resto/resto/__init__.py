@@ -1,4 +1,5 @@
 import pymysql
 
-# Use PyMySQL as a drop-in replacement for MySQLdb
+# Use PyMySQL as a drop-in replacement for MySQLdb. PyMySQL >= 1.1 announces
+# the mysqlclient API level Django 5.1 checks for (>= 1.4.3).
 pymysql.install_as_MySQLdb()